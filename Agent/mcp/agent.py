@@ -2,10 +2,20 @@
 AI Agent - 使用OpenAI + MCP实现智能工具调用
 """
 import json
-from typing import List, Dict, Any
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import List, Dict, Any, Optional
 from openai import OpenAI
 from mcp_client.client import MCPClient
-from config import OPENAI_API_KEY, OPENAI_MODEL, OPENAI_BASE_URL
+from config import (
+    OPENAI_API_KEY,
+    OPENAI_MODEL,
+    OPENAI_BASE_URL,
+    TOOL_MAX_WORKERS,
+    TOOL_TIMEOUT,
+    TOOL_CONCURRENCY,
+)
 
 
 class MCPAgent:
@@ -14,8 +24,30 @@ class MCPAgent:
     整合了OpenAI的Function Calling能力和MCP的工具调用能力
     """
     
-    def __init__(self, mcp_client: MCPClient):
+    def __init__(
+        self,
+        mcp_client: MCPClient,
+        max_workers: int = TOOL_MAX_WORKERS,
+        tool_timeout: float = TOOL_TIMEOUT,
+        tool_concurrency: int = TOOL_CONCURRENCY,
+        tool_timeouts: Optional[Dict[str, float]] = None,
+        tool_limits: Optional[Dict[str, int]] = None,
+    ):
         self.mcp_client = mcp_client
+
+        # 工具执行：同一轮的多个工具调用提交到线程池并发执行（max_workers=1 时逐个执行），
+        # tool_timeouts / tool_limits 可按工具名覆盖默认的超时时间和并发上限；
+        # 逐个执行时线程池仍保留 tool_concurrency 个线程：超时的调用在后台继续占用线程，
+        # 只有一个线程时，一个卡住的调用会让之后的调用都无法开始
+        self.parallel_tools = max_workers > 1
+        workers = max_workers if self.parallel_tools else max(1, tool_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="mcp-tool")
+        self.tool_timeout = tool_timeout
+        self.tool_timeouts = tool_timeouts or {}
+        self.tool_concurrency = tool_concurrency
+        self.tool_limits = tool_limits or {}
+        self._tool_semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._semaphores_lock = threading.Lock()
         
         # 初始化OpenAI客户端
         if OPENAI_BASE_URL:
@@ -79,20 +111,9 @@ class MCPAgent:
                     ]
                 })
                 
-                # 执行所有工具调用
-                for tool_call in assistant_message.tool_calls:
-                    function_name = tool_call.function.name
-                    function_args = json.loads(tool_call.function.arguments)
-                    
-                    print(f"\n🤖 [Agent] 决定调用工具: {function_name}")
-                    
-                    # 通过MCP客户端调用工具
-                    tool_result = self.mcp_client.call_tool(
-                        function_name,
-                        function_args
-                    )
-                    
-                    # 添加工具结果到历史
+                # 执行所有工具调用，结果按 tool_call_id 的原始顺序添加到历史
+                tool_results = self._execute_tool_calls(assistant_message.tool_calls)
+                for tool_call, tool_result in zip(assistant_message.tool_calls, tool_results):
                     self.conversation_history.append({
                         "role": "tool",
                         "tool_call_id": tool_call.id,
@@ -114,6 +135,73 @@ class MCPAgent:
         
         return "抱歉，达到最大迭代次数，无法完成任务。"
     
+    def _semaphore(self, tool_name: str) -> threading.BoundedSemaphore:
+        """每个工具一个信号量，限制同一工具同时执行的调用数"""
+        with self._semaphores_lock:
+            semaphore = self._tool_semaphores.get(tool_name)
+            if semaphore is None:
+                limit = self.tool_limits.get(tool_name, self.tool_concurrency)
+                semaphore = self._tool_semaphores[tool_name] = threading.BoundedSemaphore(limit)
+            return semaphore
+
+    def _run_tool(self, tool_name: str, arguments: Dict[str, Any], call: Dict[str, Any]) -> Dict[str, Any]:
+        with self._semaphore(tool_name):
+            with call["lock"]:
+                if call["abandoned"]:
+                    return {}  # 排队期间已超时，调用方不再等待结果
+                call["started_at"] = time.monotonic()
+            call["started"].set()
+            return self.mcp_client.call_tool(tool_name, arguments)
+
+    def _execute_tool_calls(self, tool_calls) -> List[Dict[str, Any]]:
+        """
+        执行一轮中的全部工具调用，返回与 tool_calls 一一对应的结果
+        并发模式下总耗时约为最慢的一个调用；超时或异常的调用返回错误结果，不影响其他调用
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(tool_calls)
+        pending = []
+        for i, tool_call in enumerate(tool_calls):
+            function_name = tool_call.function.name
+            print(f"\n🤖 [Agent] 决定调用工具: {function_name}")
+            try:
+                function_args = json.loads(tool_call.function.arguments or "{}")
+            except json.JSONDecodeError as e:
+                results[i] = {"error": True, "message": f"工具参数不是合法的 JSON: {e}"}
+                continue
+            call = {"lock": threading.Lock(), "started": threading.Event(), "started_at": None,
+                    "abandoned": False, "submitted_at": time.monotonic()}
+            future = self._executor.submit(self._run_tool, function_name, function_args, call)
+            if self.parallel_tools:
+                pending.append((i, function_name, future, call))
+            else:
+                results[i] = self._wait_tool(function_name, future, call)
+
+        for i, function_name, future, call in pending:
+            results[i] = self._wait_tool(function_name, future, call)
+        return results
+
+    def _wait_tool(self, tool_name: str, future, call: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        超时从调用开始执行时算起，不含在线程池和并发名额上的排队；
+        排队另外最多等待一个超时时长（从提交算起），仍未开始的调用不再执行
+        """
+        timeout = self.tool_timeouts.get(tool_name, self.tool_timeout)
+        if not call["started"].wait(max(0.0, call["submitted_at"] + timeout - time.monotonic())):
+            with call["lock"]:
+                call["abandoned"] = call["started_at"] is None
+            if call["abandoned"]:
+                future.cancel()
+                print(f"⏱️ [Agent] 工具调用排队超时: {tool_name} ({timeout}s)")
+                return {"error": True, "message": f"工具调用排队超时: {tool_name} 等待 {timeout} 秒仍未开始执行"}
+        try:
+            return future.result(timeout=max(0.0, call["started_at"] + timeout - time.monotonic()))
+        except FutureTimeoutError:
+            # 线程无法强制终止，超时的调用在后台继续执行完毕后释放并发名额
+            print(f"⏱️ [Agent] 工具调用超时: {tool_name} ({timeout}s)")
+            return {"error": True, "message": f"工具调用超时: {tool_name} 超过 {timeout} 秒未返回"}
+        except Exception as e:
+            return {"error": True, "message": f"工具调用异常: {tool_name}: {e}"}
+
     def reset(self):
         """重置对话历史"""
         self.conversation_history = []
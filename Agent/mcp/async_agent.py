@@ -0,0 +1,251 @@
+"""
+异步 AI Agent - 基于 AsyncOpenAI 的流式对话 + MCP 工具调用
+- 模型输出的 token 边到达边交给调用方
+- 流式增量拼接 tool_calls：某个调用的参数一旦完整（出现下一个调用、参数已是完整 JSON、或流结束），
+  立即开始执行该工具，不必等整个响应结束
+- 多个对话（多个 AsyncMCPAgent）可在同一个事件循环中并发，共享一个 AsyncOpenAI 客户端及其连接池
+"""
+import asyncio
+import json
+import threading
+from concurrent.futures import Executor
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+from mcp_client.client import MCPClient
+from config import (
+    OPENAI_API_KEY,
+    OPENAI_MODEL,
+    OPENAI_BASE_URL,
+    TOOL_TIMEOUT,
+    TOOL_CONCURRENCY,
+    LLM_MAX_CONNECTIONS,
+)
+
+MAX_ITERATIONS_MESSAGE = "抱歉，达到最大迭代次数，无法完成任务。"
+
+
+def create_openai_client(max_connections: int = LLM_MAX_CONNECTIONS) -> AsyncOpenAI:
+    """创建可在多个 AsyncMCPAgent 之间共享的客户端（一个连接池，keep-alive 复用连接）"""
+    http_client = DefaultAsyncHttpxClient(
+        limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+    )
+    if OPENAI_BASE_URL:
+        return AsyncOpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL, http_client=http_client)
+    return AsyncOpenAI(api_key=OPENAI_API_KEY, http_client=http_client)
+
+
+class AsyncMCPAgent:
+    """
+    MCPAgent 的异步流式版本
+    每个实例保存一个对话的历史；openai_client 传入同一个实例即可让多个对话共享连接池
+    """
+
+    def __init__(
+        self,
+        mcp_client: MCPClient,
+        openai_client: Optional[AsyncOpenAI] = None,
+        model: str = OPENAI_MODEL,
+        tool_timeout: float = TOOL_TIMEOUT,
+        tool_concurrency: int = TOOL_CONCURRENCY,
+        tool_timeouts: Optional[Dict[str, float]] = None,
+        tool_limits: Optional[Dict[str, int]] = None,
+        executor: Optional[Executor] = None,
+    ):
+        self.mcp_client = mcp_client
+        self.openai_client = openai_client or create_openai_client()
+        self.model = model
+
+        # MCPClient.call_tool 是同步的，放到线程池执行（executor 为 None 时使用事件循环的默认线程池）
+        self.executor = executor
+        self.tool_timeout = tool_timeout
+        self.tool_timeouts = tool_timeouts or {}
+        self.tool_concurrency = tool_concurrency
+        self.tool_limits = tool_limits or {}
+        self._tool_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+        self.conversation_history: List[Dict[str, Any]] = []
+        self.last_response: Optional[str] = None
+
+    async def chat(
+        self,
+        user_message: str,
+        max_iterations: int = 5,
+        on_token: Optional[Callable[[str], Any]] = None,
+    ) -> str:
+        """与Agent对话，返回最终回答；on_token 在每个 token 到达时被调用"""
+        async for token in self.chat_stream(user_message, max_iterations):
+            if on_token is not None:
+                on_token(token)
+        return self.last_response
+
+    async def chat_stream(self, user_message: str, max_iterations: int = 5) -> AsyncIterator[str]:
+        """
+        与Agent对话，逐个产出模型输出的文本 token
+        支持多轮工具调用：工具结果写入历史后自动进入下一轮
+        """
+        print(f"\n💬 [User] {user_message}")
+        self.conversation_history.append({"role": "user", "content": user_message})
+        tools = self.mcp_client.get_tools_for_openai()
+
+        for iteration in range(1, max_iterations + 1):
+            print(f"\n🔄 [Agent] 第 {iteration} 轮思考...")
+            request: Dict[str, Any] = {"model": self.model, "messages": self.conversation_history, "stream": True}
+            if tools:
+                request.update(tools=tools, tool_choice="auto")
+            stream = await self.openai_client.chat.completions.create(**request)
+
+            content: List[str] = []
+            tool_calls: Dict[int, Dict[str, Any]] = {}  # 按 delta 的 index 增量拼接
+            tasks: Dict[int, asyncio.Task] = {}
+            try:
+                async for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    choice = chunk.choices[0]
+                    delta = choice.delta
+                    if delta.content:
+                        content.append(delta.content)
+                        yield delta.content
+                    for tc in delta.tool_calls or []:
+                        # 模型按 index 顺序逐个输出调用：出现更靠后的调用，说明之前的调用参数已完整
+                        for index in tool_calls:
+                            if index < tc.index:
+                                self._start_tool(index, tool_calls[index], tasks)
+                        call = tool_calls.setdefault(
+                            tc.index, {"id": "", "type": "function", "function": {"name": "", "arguments": ""}}
+                        )
+                        if tc.id:
+                            call["id"] = tc.id
+                        if tc.function is not None:
+                            call["function"]["name"] += tc.function.name or ""
+                            call["function"]["arguments"] += tc.function.arguments or ""
+                            if (tc.function.arguments or "").rstrip().endswith("}"):
+                                self._start_tool(tc.index, call, tasks, complete_only=True)
+                for index, call in tool_calls.items():
+                    self._start_tool(index, call, tasks)
+
+                if not tool_calls:
+                    final_response = "".join(content)
+                    self.conversation_history.append({"role": "assistant", "content": final_response})
+                    self.last_response = final_response
+                    print(f"\n🤖 [Agent] {final_response}")
+                    return
+
+                ordered = sorted(tool_calls)
+                self.conversation_history.append({
+                    "role": "assistant",
+                    "content": "".join(content) or None,
+                    "tool_calls": [tool_calls[index] for index in ordered],
+                })
+                # 结果按 tool_call_id 的原始顺序添加到历史
+                results = await asyncio.gather(*(tasks[index] for index in ordered))
+                for index, tool_result in zip(ordered, results):
+                    self.conversation_history.append({
+                        "role": "tool",
+                        "tool_call_id": tool_calls[index]["id"],
+                        "content": tool_result.get("result", str(tool_result)),
+                    })
+            finally:
+                # 调用方提前停止迭代或出错时，取消尚未完成的工具调用并关闭响应流
+                for task in tasks.values():
+                    if not task.done():
+                        task.cancel()
+                await stream.close()
+
+        self.last_response = MAX_ITERATIONS_MESSAGE
+        yield MAX_ITERATIONS_MESSAGE
+
+    def _start_tool(self, index: int, call: Dict[str, Any], tasks: Dict[int, asyncio.Task],
+                    complete_only: bool = False):
+        """为参数已完整的调用创建执行任务；complete_only=True 时仅当参数已能解析为 JSON 对象才开始"""
+        if index in tasks:
+            return
+        function_name = call["function"]["name"]
+        arguments = call["function"]["arguments"]
+        if complete_only:
+            # 完整的 JSON 对象之后不可能再有合法的续写，此时参数已确定
+            try:
+                if not isinstance(json.loads(arguments), dict):
+                    return
+            except json.JSONDecodeError:
+                return
+        print(f"\n🤖 [Agent] 决定调用工具: {function_name}")
+        tasks[index] = asyncio.create_task(self._run_tool(function_name, arguments))
+
+    def _semaphore(self, tool_name: str) -> asyncio.Semaphore:
+        """每个工具一个信号量，限制同一工具同时执行的调用数"""
+        semaphore = self._tool_semaphores.get(tool_name)
+        if semaphore is None:
+            limit = self.tool_limits.get(tool_name, self.tool_concurrency)
+            semaphore = self._tool_semaphores[tool_name] = asyncio.Semaphore(limit)
+        return semaphore
+
+    async def _call_tool(self, tool_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        名额在线程中的调用结束时才释放：超时只是不再等待结果，线程仍在执行，
+        若此时就释放名额，同一工具实际同时执行的调用数会超过上限；
+        还在线程池中排队、尚未开始的调用被取消时不会再执行，由取消回调释放名额
+        """
+        semaphore = self._semaphore(tool_name)
+        loop = asyncio.get_running_loop()
+        lock = threading.Lock()
+        state = {"started": False, "abandoned": False}
+
+        def release():
+            try:
+                loop.call_soon_threadsafe(semaphore.release)
+            except RuntimeError:
+                pass  # 事件循环已关闭
+
+        def call():
+            with lock:
+                if state["abandoned"]:
+                    return None  # 排队期间已被取消，名额已释放
+                state["started"] = True
+            try:
+                return self.mcp_client.call_tool(tool_name, arguments)
+            finally:
+                release()
+
+        def on_done(f: asyncio.Future):
+            if not f.cancelled():
+                return
+            with lock:
+                if state["started"]:
+                    return  # 线程中的调用结束时释放
+                state["abandoned"] = True
+            semaphore.release()
+
+        await semaphore.acquire()
+        try:
+            future = loop.run_in_executor(self.executor, call)
+        except BaseException:
+            semaphore.release()  # 未能提交到线程池
+            raise
+        future.add_done_callback(on_done)
+        return await future
+
+    async def _run_tool(self, tool_name: str, arguments: str) -> Dict[str, Any]:
+        """执行单个工具调用；超时（从开始执行算起，含排队）或异常返回错误结果，不影响其他调用"""
+        try:
+            function_args = json.loads(arguments or "{}")
+        except json.JSONDecodeError as e:
+            return {"error": True, "message": f"工具参数不是合法的 JSON: {e}"}
+        timeout = self.tool_timeouts.get(tool_name, self.tool_timeout)
+        try:
+            return await asyncio.wait_for(self._call_tool(tool_name, function_args), timeout)
+        except asyncio.TimeoutError:
+            # 线程无法强制终止，超时的调用在后台继续执行完毕
+            print(f"⏱️ [Agent] 工具调用超时: {tool_name} ({timeout}s)")
+            return {"error": True, "message": f"工具调用超时: {tool_name} 超过 {timeout} 秒未返回"}
+        except Exception as e:
+            return {"error": True, "message": f"工具调用异常: {tool_name}: {e}"}
+
+    def reset(self):
+        """重置对话历史"""
+        self.conversation_history = []
+        self.last_response = None
+        print("\n🔄 对话历史已重置")
@@ -0,0 +1,152 @@
+"""
+Agent 吞吐基准：本地模拟的 OpenAI 兼容接口（mock_openai_server.py）上
+对比 MCPAgent 逐个处理多个对话 与 AsyncMCPAgent 在一个事件循环中并发处理（共享连接池）
+每个对话：一轮流式工具调用（get_inbox_count + send_email）+ 一轮流式文本回答；
+开始前校验工具调用超时后（包括还在线程池中排队时就超时）并发名额都会归还，
+以及 MCPAgent 逐个执行时一个卡住的调用不会让之后的调用跟着超时
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from mock_openai_server import ANSWER, MockOpenAIServer
+
+QUESTION = "先查一下收件箱情况，然后给 lisi@example.com 发一封邮件告诉他我会在周五回复他"
+
+
+def start_mock_server(server: MockOpenAIServer, host: str, port: int):
+    """在后台线程的事件循环中运行模拟接口"""
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+
+    async def run():
+        listener = await asyncio.start_server(server.handle, host, port)
+        ready.set()
+        async with listener:
+            await listener.serve_forever()
+
+    threading.Thread(target=loop.run_until_complete, args=(run(),), daemon=True).start()
+    ready.wait()
+
+
+def bench_sync(mcp_client, conversations: int):
+    from agent import MCPAgent
+
+    agent = MCPAgent(mcp_client)
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(conversations):
+        agent.reset()
+        t0 = time.perf_counter()
+        answer = agent.chat(QUESTION)
+        latencies.append(time.perf_counter() - t0)
+        assert answer == ANSWER, answer
+    return time.perf_counter() - start, latencies, latencies
+
+
+async def bench_async(mcp_client, conversations: int, max_connections: int):
+    from async_agent import AsyncMCPAgent, create_openai_client
+
+    openai_client = create_openai_client(max_connections)
+    agents = [AsyncMCPAgent(mcp_client, openai_client=openai_client) for _ in range(conversations)]
+
+    async def converse(agent):
+        t0 = time.perf_counter()
+        first_token = None
+        async for _ in agent.chat_stream(QUESTION):
+            if first_token is None:
+                first_token = time.perf_counter() - t0
+        assert agent.last_response == ANSWER, agent.last_response
+        return first_token, time.perf_counter() - t0
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(converse(agent) for agent in agents))
+    elapsed = time.perf_counter() - start
+    await openai_client.close()
+    return elapsed, [r[0] for r in results], [r[1] for r in results]
+
+
+async def check_tool_slots():
+    """单线程的线程池 + 比超时更慢的工具：除第一个外都在排队时超时，所有线程结束后名额应全部归还"""
+    from async_agent import AsyncMCPAgent
+
+    class SlowClient:
+        def call_tool(self, tool_name, arguments):
+            time.sleep(0.3)
+            return {"result": "ok"}
+
+    agent = AsyncMCPAgent(SlowClient(), openai_client=object(), tool_timeout=0.05, tool_concurrency=4,
+                          executor=ThreadPoolExecutor(1))
+    results = await asyncio.gather(*(agent._run_tool("slow", "{}") for _ in range(4)))
+    assert all(r.get("error") for r in results), results
+    await asyncio.sleep(0.5)  # 等已开始的调用在线程中结束
+    slots = agent._semaphore("slow")._value
+    assert slots == 4, f"超时后只归还了 {slots}/4 个并发名额"
+
+
+def check_sync_tool_timeout():
+    """max_workers=1：第一个调用卡住超时后，第二个调用应从自己开始执行时计时并正常返回"""
+    from agent import MCPAgent
+
+    class HangingClient:
+        def call_tool(self, tool_name, arguments):
+            time.sleep(0.6 if tool_name == "hang" else 0.05)
+            return {"result": tool_name}
+
+    agent = MCPAgent(HangingClient(), max_workers=1, tool_timeout=0.2)
+    calls = [SimpleNamespace(function=SimpleNamespace(name=name, arguments="{}")) for name in ("hang", "fast")]
+    hang, fast = agent._execute_tool_calls(calls)
+    assert hang.get("error"), hang
+    assert fast == {"result": "fast"}, fast
+
+
+def report(label, conversations, elapsed, first_tokens, latencies):
+    print(
+        f"{label:>28}: {elapsed:6.2f}s total, {conversations / elapsed:6.1f} conv/s, "
+        f"first token p50 {statistics.median(first_tokens) * 1000:6.0f}ms, "
+        f"latency p50 {statistics.median(latencies) * 1000:6.0f}ms"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--conversations", type=int, default=50)
+    parser.add_argument("--port", type=int, default=8901)
+    parser.add_argument("--first-token-delay", type=float, default=0.2)
+    parser.add_argument("--token-delay", type=float, default=0.005)
+    parser.add_argument("--max-connections", type=int, default=100)
+    parser.add_argument("--sync-conversations", type=int, default=5, help="同步 Agent 只跑少量对话后按比例估算")
+    args = parser.parse_args()
+
+    # 在导入 config 之前指向模拟接口
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{args.port}/v1"
+    os.environ["OPENAI_API_KEY"] = "mock"
+
+    from mcp_client.client import MCPClient
+    from mcp_server.email_server import email_server
+
+    start_mock_server(MockOpenAIServer(args.first_token_delay, args.token_delay), "127.0.0.1", args.port)
+    mcp_client = MCPClient()
+
+    with contextlib.redirect_stdout(io.StringIO()):  # Agent / 工具的过程日志
+        asyncio.run(check_tool_slots())
+        check_sync_tool_timeout()
+        mcp_client.connect_server("email-server", email_server)
+        sync_result = bench_sync(mcp_client, args.sync_conversations)
+        async_result = asyncio.run(bench_async(mcp_client, args.conversations, args.max_connections))
+
+    print("tool slots: all returned after timeouts")
+    print("sync tool timeout: a hung call no longer times out the next one")
+    print(f"{args.conversations} conversations, 2 LLM calls + 2 tool calls each")
+    elapsed, first_tokens, latencies = sync_result
+    estimated = elapsed / args.sync_conversations * args.conversations
+    report(f"MCPAgent (est. x{args.conversations})", args.conversations, estimated, first_tokens, latencies)
+    report("AsyncMCPAgent", args.conversations, *async_result)
+    print(f"speedup: {estimated / async_result[0]:.1f}x")
@@ -0,0 +1,136 @@
+"""
+邮件投递基准：本地 SMTP 替身（mcp_server/smtp_standin.py）上
+对比逐封同步投递（旧的 send_email 做法）与 send_emails 批量入队 + 后台投递线程池，
+替身按比例返回临时错误（验证重试）并拒绝一个域名（验证永久失败）；
+最后校验 ServerPool 中的每个副本都能查到经由其他副本发出的邮件，
+以及未启用健康检查时被摘除的副本在摘除期过后会恢复
+"""
+import argparse
+import contextlib
+import io
+import time
+
+from mcp_client.pool import ServerPool
+from mcp_server.delivery import DeliveryQueue, SMTPTransport, SQLiteStatusStore, StatusStore
+from mcp_server.email_server import MCPEmailServer, ToolCallRequest
+from mcp_server.smtp_standin import LocalSMTPServer
+from common.serialization import decode
+
+
+def make_messages(n: int, domains: int):
+    return [
+        {"to": f"user{i}@domain{i % domains}.example", "subject": f"通知 #{i}", "body": "系统将于今晚 22:00 维护。"}
+        for i in range(n)
+    ]
+
+
+def bench_sequential(smtp: LocalSMTPServer, messages) -> float:
+    transport = SMTPTransport(smtp.host, smtp.port)
+    start = time.perf_counter()
+    for m in messages:
+        try:
+            transport.send(m["to"], m["subject"], m["body"])
+        except Exception:
+            pass  # 同步方式下失败即放弃
+    return time.perf_counter() - start
+
+
+def bench_queue(smtp: LocalSMTPServer, messages, args):
+    store = SQLiteStatusStore(args.db) if args.db else StatusStore()
+    queue = DeliveryQueue(
+        SMTPTransport(smtp.host, smtp.port), store, workers=args.workers,
+        domain_rate=args.domain_rate, backoff=0.05, backoff_max=0.5,
+    )
+    server = MCPEmailServer(delivery=queue)
+    start = time.perf_counter()
+    email_ids = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(0, len(messages), args.batch_size):
+            response = server.call_tool(
+                ToolCallRequest(name="send_emails", arguments={"messages": messages[i : i + args.batch_size]})
+            )
+            assert not response.isError, response
+            email_ids.extend(decode(response.content[0]["text"].encode())["email_ids"])
+    accepted = time.perf_counter() - start
+    assert queue.join(timeout=300), "投递超时"
+    elapsed = time.perf_counter() - start
+
+    status = decode(server.call_tool(
+        ToolCallRequest(name="check_email_status", arguments={"email_id": email_ids[0]})
+    ).content[0]["text"].encode())
+    queue.close()
+    return accepted, elapsed, store.counts(), status
+
+
+def check_replicas(messages, replicas: int = 3):
+    """默认构造的副本共用进程内的投递队列，状态查询落到任一副本都能找到邮件"""
+    servers = [MCPEmailServer() for _ in range(replicas)]
+    pool = ServerPool("email-server", servers, health_interval=0)
+    with contextlib.redirect_stdout(io.StringIO()):
+        email_ids = [
+            decode(pool.call_tool(ToolCallRequest(name="send_email", arguments=m)).content[0]["text"].encode())["email_id"]
+            for m in messages
+        ]
+        for server in servers:
+            for email_id in email_ids:
+                response = server.call_tool(ToolCallRequest(name="check_email_status", arguments={"email_id": email_id}))
+                assert not response.isError, f"副本查不到邮件 {email_id}"
+    pool.stop()
+    print(f"{replicas} replicas: every replica found all {len(email_ids)} emails")
+
+
+def check_readmit(eject_seconds: float = 0.2):
+    """health_interval=0：副本连续失败被摘除，恢复正常且摘除期过后应重新接收调用"""
+
+    class FlakyServer(MCPEmailServer):
+        down = True
+
+        def call_tool(self, request):
+            if self.down:
+                raise ConnectionError("副本不可用")
+            return super().call_tool(request)
+
+    flaky = FlakyServer()
+    pool = ServerPool("email-server", [flaky, MCPEmailServer()], strategy="round_robin",
+                      health_interval=0, failure_threshold=2, eject_seconds=eject_seconds)
+    request = ToolCallRequest(name="get_inbox_count", arguments={})
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(4):
+            pool.call_tool(request)
+        assert not pool.replicas[0].healthy
+        flaky.down = False
+        time.sleep(eject_seconds)
+        for _ in range(4):
+            pool.call_tool(request)
+    assert pool.replicas[0].healthy and pool.replicas[0].errors == 2, pool.metrics()[0]
+    pool.stop()
+    print("ejected replica: back in the pool after the cooldown (health checks off)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--emails", type=int, default=1000)
+    parser.add_argument("--domains", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--domain-rate", type=float, default=50, help="每个域名每秒最多投递数")
+    parser.add_argument("--latency", type=float, default=0.01, help="SMTP 替身处理每封邮件的耗时（秒）")
+    parser.add_argument("--fail-rate", type=float, default=0.05, help="SMTP 替身返回 451 的概率")
+    parser.add_argument("--db", default=None, help="投递状态写入该 SQLite 文件（默认内存）")
+    args = parser.parse_args()
+
+    messages = make_messages(args.emails, args.domains)
+    smtp = LocalSMTPServer(port=0, latency=args.latency, fail_rate=args.fail_rate,
+                           reject_domains=["domain0.example"], seed=0).start()
+
+    sequential = bench_sequential(smtp, messages)
+    print(f"{'sequential send_email':>24}: {sequential:6.2f}s, {len(messages) / sequential:7.1f} emails/s")
+
+    accepted, elapsed, counts, status = bench_queue(smtp, messages, args)
+    print(f"{'send_emails + queue':>24}: {elapsed:6.2f}s, {len(messages) / elapsed:7.1f} emails/s "
+          f"(all accepted in {accepted * 1000:.0f}ms, {args.workers} workers)")
+    print(f"final states: {counts}  (domain0.example is rejected with 550)")
+    print(f"check_email_status: {status}")
+    smtp.stop()
+    check_replicas(messages[:20])
+    check_readmit()
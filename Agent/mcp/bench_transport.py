@@ -0,0 +1,120 @@
+"""
+工具调用传输基准：进程内直接调用 vs JSON-RPC over stdio / TCP / Unix socket
+远程传输分别测试：逐个调用（等上一个响应）、流水线（先发出全部请求再等响应）、批量请求；
+开始前校验收到无法解析的一行后连接仍可继续使用
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from mcp_client.remote import PACKAGE_ROOT, JSONRPCConnection, RemoteMCPServer
+from common.serialization import decode, encode
+from mcp_server.email_server import ToolCallRequest, email_server
+
+REQUEST = ToolCallRequest(name="get_inbox_count", arguments={})
+
+
+def start_socket_server(listen: str) -> subprocess.Popen:
+    process = subprocess.Popen(
+        [sys.executable, "-m", "mcp_server.jsonrpc", "--listen", listen],
+        cwd=PACKAGE_ROOT,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            RemoteMCPServer.connect(listen).close()
+            return process
+        except (ConnectionError, FileNotFoundError, socket.error):
+            time.sleep(0.05)
+    process.kill()
+    raise RuntimeError(f"JSON-RPC 服务器启动失败: {listen}")
+
+
+def timed(label: str, calls: int, run) -> float:
+    start = time.perf_counter()
+    responses = run()
+    elapsed = time.perf_counter() - start
+    assert len(responses) == calls and not any(r.isError for r in responses), responses[:1]
+    print(f"{label:>24}: {calls / elapsed:10,.0f} calls/s")
+    return calls / elapsed
+
+
+def check_bad_line():
+    """对端先回一行无法解析的内容再回正常响应：连接应回复 -32700 并继续，调用照常返回"""
+    client_sock, peer_sock = socket.socketpair()
+    peer_r, peer_w = peer_sock.makefile("rb"), peer_sock.makefile("wb")
+    replies = []
+
+    def peer():
+        request = decode(peer_r.readline())
+        peer_w.write(b"{not json\n")
+        peer_w.write(encode({"jsonrpc": "2.0", "id": request["id"], "result": "ok"}) + b"\n")
+        peer_w.flush()
+        replies.append(decode(peer_r.readline()))
+
+    thread = threading.Thread(target=peer, daemon=True)
+    thread.start()
+    connection = JSONRPCConnection(client_sock.makefile("rb"), client_sock.makefile("wb"))
+    assert connection.call("ping", timeout=5) == "ok"
+    thread.join(5)
+    assert replies and replies[0]["error"]["code"] == -32700, replies
+    assert not connection.closed
+    client_sock.shutdown(socket.SHUT_RDWR)  # 与 RemoteMCPServer.close 相同，先唤醒读线程
+    connection.close()
+    client_sock.close()
+    peer_sock.close()
+
+
+def bench_remote(label: str, server: RemoteMCPServer, calls: int, batch_size: int):
+    timed(f"{label} sequential", calls, lambda: [server.call_tool(REQUEST) for _ in range(calls)])
+
+    def pipelined():
+        futures = [server.call_tool_async(REQUEST) for _ in range(calls)]
+        return [f.result() for f in futures]
+
+    timed(f"{label} pipelined", calls, pipelined)
+
+    def batched():
+        responses = []
+        for i in range(0, calls, batch_size):
+            responses.extend(server.call_tools([REQUEST] * min(batch_size, calls - i)))
+        return responses
+
+    timed(f"{label} batch x{batch_size}", calls, batched)
+    server.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=20000)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    check_bad_line()
+    print("bad line: answered with -32700, connection kept")
+    timed("in-process", args.calls, lambda: [email_server.call_tool(REQUEST) for _ in range(args.calls)])
+
+    bench_remote("stdio", RemoteMCPServer.stdio(), args.calls, args.batch_size)
+
+    tcp = f"127.0.0.1:{args.port}"
+    process = start_socket_server(tcp)
+    try:
+        bench_remote("tcp", RemoteMCPServer.connect(tcp), args.calls, args.batch_size)
+    finally:
+        process.terminate()
+
+    if hasattr(socket, "AF_UNIX"):
+        unix = f"unix:{os.path.join(tempfile.gettempdir(), f'mcp-bench-{os.getpid()}.sock')}"
+        process = start_socket_server(unix)
+        try:
+            bench_remote("unix", RemoteMCPServer.connect(unix), args.calls, args.batch_size)
+        finally:
+            process.terminate()
+            os.unlink(unix[len("unix:"):])
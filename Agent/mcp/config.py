@@ -11,3 +11,42 @@ OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4")
 # 如果使用其他兼容OpenAI API的服务（如DeepSeek等）
 OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", None)
 
+# 工具执行配置
+# 同一轮中多个工具调用并发执行的线程数（1 表示逐个执行）
+TOOL_MAX_WORKERS = int(os.getenv("MCP_TOOL_MAX_WORKERS", "8"))
+# 单个工具调用的超时时间（秒）
+TOOL_TIMEOUT = float(os.getenv("MCP_TOOL_TIMEOUT", "30"))
+# 同一个工具同时执行的调用数上限
+TOOL_CONCURRENCY = int(os.getenv("MCP_TOOL_CONCURRENCY", "4"))
+# AsyncMCPAgent 共享的 HTTP 连接池大小（多个并发对话复用同一个 AsyncOpenAI 客户端）
+LLM_MAX_CONNECTIONS = int(os.getenv("MCP_LLM_MAX_CONNECTIONS", "100"))
+
+# MCPClient 副本池配置（同一逻辑服务器连接多个副本时生效）
+# 选择副本的策略：least_outstanding（在途请求最少）或 round_robin
+POOL_STRATEGY = os.getenv("MCP_POOL_STRATEGY", "least_outstanding")
+# 每个副本同时在途的调用数上限
+POOL_MAX_IN_FLIGHT = int(os.getenv("MCP_POOL_MAX_IN_FLIGHT", "16"))
+# 健康检查间隔（秒，0 表示不做后台检查）
+POOL_HEALTH_INTERVAL = float(os.getenv("MCP_POOL_HEALTH_INTERVAL", "5"))
+# 连续失败多少次后摘除副本，以及摘除后至少隔多久才重新探测（不做后台检查时为多久后直接恢复）
+POOL_FAILURE_THRESHOLD = int(os.getenv("MCP_POOL_FAILURE_THRESHOLD", "3"))
+POOL_EJECT_SECONDS = float(os.getenv("MCP_POOL_EJECT_SECONDS", "30"))
+
+# 邮件投递配置（mcp_server/delivery.py）
+# SMTP 服务器，未配置时使用模拟投递（不真正发信，状态照常流转）
+SMTP_HOST = os.getenv("SMTP_HOST", None)
+SMTP_PORT = int(os.getenv("SMTP_PORT", "25"))
+MAIL_FROM = os.getenv("MAIL_FROM", "agent@example.com")
+# 投递线程数
+DELIVERY_WORKERS = int(os.getenv("MCP_DELIVERY_WORKERS", "4"))
+# 每个收件人域名每秒最多投递的邮件数（0 表示不限）
+DELIVERY_DOMAIN_RATE = float(os.getenv("MCP_DELIVERY_DOMAIN_RATE", "10"))
+# 最多尝试次数，以及重试退避的初始 / 最大间隔（秒）
+DELIVERY_MAX_ATTEMPTS = int(os.getenv("MCP_DELIVERY_MAX_ATTEMPTS", "4"))
+DELIVERY_BACKOFF = float(os.getenv("MCP_DELIVERY_BACKOFF", "1"))
+DELIVERY_BACKOFF_MAX = float(os.getenv("MCP_DELIVERY_BACKOFF_MAX", "60"))
+# 投递状态存储的 SQLite 文件，未配置时保存在内存中；
+# 以多个独立进程运行邮件服务器副本时必须配置，否则各副本只能查到自己发出的邮件
+DELIVERY_DB = os.getenv("MCP_DELIVERY_DB", None)
+# send_emails 一次最多提交的邮件数
+BATCH_EMAIL_LIMIT = int(os.getenv("MCP_BATCH_EMAIL_LIMIT", "100"))
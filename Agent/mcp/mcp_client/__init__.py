@@ -1 +1,6 @@
-"""MCP Server Package"""
\ No newline at end of file
+"""MCP Client Package"""
+import os
+import sys
+
+# 仓库根目录，导入共用的 common 包（common.serialization）
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
@@ -1,44 +1,143 @@
 """
 MCP Client - 连接MCP服务器并管理工具调用
 """
-from typing import List, Dict, Any
-from mcp_server.email_server import MCPEmailServer, ToolCallRequest
+from typing import Callable, List, Dict, Any, Sequence, Tuple, Union
+from mcp_server.email_server import MCPEmailServer
+from mcp_server.registry import Tool, ToolCallRequest
+from mcp_client.pool import ServerPool
 
 
 class MCPClient:
     """
     MCP客户端
-    在真实的MCP实现中，这会通过JSON-RPC 2.0与远程服务器通信
-    这里我们简化为直接调用本地服务器，便于理解
+    服务器可以是进程内的 MCPEmailServer（直接调用），
+    也可以是 mcp_client.remote.RemoteMCPServer（通过 JSON-RPC 2.0 调用独立进程中的服务器）
+
+    工具目录在连接/断开服务器、或服务器通知工具列表变化时重建一次：
+    - _routes: 工具名 -> 服务器名，call_tool 直接查表
+    - _catalog / _openai_tools: 缓存的工具列表和 OpenAI Function Calling 格式
+    不同服务器提供同名工具时，connect_server 直接报错，而不是按连接顺序取第一个
+
+    connect_server 传入多个副本（列表）时创建 ServerPool，在副本间负载均衡
     """
     
     def __init__(self):
         self.servers: Dict[str, MCPEmailServer] = {}
         self.connected = False
+        self._server_tools: Dict[str, List[Tool]] = {}
+        self._listeners: Dict[str, Callable[[], None]] = {}
+        self._routes: Dict[str, str] = {}
+        self._catalog: List[Dict[str, Any]] = []
+        self._openai_tools: List[Dict[str, Any]] = []
+        self._owned_pools: Dict[str, ServerPool] = {}
     
-    def connect_server(self, server_name: str, server: MCPEmailServer):
-        """连接到MCP服务器"""
+    def connect_server(self, server_name: str, server: Union[MCPEmailServer, Sequence[Any]], **pool_options):
+        """
+        连接到MCP服务器
+        server 为副本列表时创建 ServerPool，pool_options 传给 ServerPool（strategy、max_in_flight 等）
+        """
         print(f"🔌 [MCP Client] 正在连接到服务器: {server_name}")
+        pool = None
+        if isinstance(server, (list, tuple)):
+            pool = server = ServerPool(server_name, server, **pool_options)
+            print(f"   副本数: {len(pool.replicas)}，负载均衡策略: {pool.strategy}")
+        try:
+            tools = server.list_tools()
+            conflicts = self._conflicts(server_name, tools)
+            if conflicts:
+                raise ValueError(
+                    f"服务器 {server_name} 的工具与已连接服务器重名: "
+                    + ", ".join(f"{name}（{owner}）" for name, owner in conflicts)
+                )
+        except Exception:
+            if pool is not None:
+                pool.stop()
+            raise
+        if server_name in self.servers:
+            self.disconnect_server(server_name)
+
         self.servers[server_name] = server
+        if pool is not None:
+            self._owned_pools[server_name] = pool
+        self._server_tools[server_name] = tools
+        if hasattr(server, "add_tools_changed_listener"):
+            listener = self._listeners[server_name] = lambda: self.refresh_tools(server_name)
+            server.add_tools_changed_listener(listener)
+        self._rebuild()
         self.connected = True
         print(f"✅ [MCP Client] 已成功连接到 {server_name}")
-    
-    def list_all_tools(self) -> List[Dict[str, Any]]:
-        """
-        列出所有已连接服务器的工具
-        这是MCP的能力发现（Capability Discovery）机制
-        """
-        all_tools = []
-        for server_name, server in self.servers.items():
-            tools = server.list_tools()
+
+    def disconnect_server(self, server_name: str):
+        """断开MCP服务器，移除其工具"""
+        server = self.servers.pop(server_name, None)
+        if server is None:
+            return
+        listener = self._listeners.pop(server_name, None)
+        if listener is not None:
+            server.remove_tools_changed_listener(listener)
+        self._server_tools.pop(server_name, None)
+        pool = self._owned_pools.pop(server_name, None)
+        if pool is not None:
+            pool.stop()  # 副本本身由调用方创建，是否关闭由调用方决定
+        self._rebuild()
+        self.connected = bool(self.servers)
+        print(f"🔌 [MCP Client] 已断开 {server_name}")
+
+    def refresh_tools(self, server_name: str):
+        """服务器工具列表变化时重新拉取；与其他服务器重名的工具不生效"""
+        tools = self.servers[server_name].list_tools()
+        conflicts = dict(self._conflicts(server_name, tools))
+        for name, owner in conflicts.items():
+            print(f"⚠️ [MCP Client] {server_name} 的工具 {name} 与 {owner} 重名，已忽略")
+        self._server_tools[server_name] = [t for t in tools if t.name not in conflicts]
+        self._rebuild()
+
+    def _conflicts(self, server_name: str, tools: List[Tool]) -> List[Tuple[str, str]]:
+        """(工具名, 已占用该名字的服务器)；同一服务器内的重复名字也算冲突"""
+        conflicts, seen = [], set()
+        for tool in tools:
+            owner = self._routes.get(tool.name)
+            if owner is not None and owner != server_name:
+                conflicts.append((tool.name, owner))
+            elif tool.name in seen:
+                conflicts.append((tool.name, server_name))
+            seen.add(tool.name)
+        return conflicts
+
+    def _rebuild(self):
+        """重建路由表和缓存的工具列表（整体替换，并发读取时不会看到中间状态）"""
+        routes, catalog, openai_tools = {}, [], []
+        for server_name, tools in self._server_tools.items():
             for tool in tools:
-                all_tools.append({
+                routes[tool.name] = server_name
+                catalog.append({
                     "server": server_name,
                     "name": tool.name,
                     "description": tool.description,
                     "input_schema": tool.input_schema
                 })
-        return all_tools
+                openai_tools.append({
+                    "type": "function",
+                    "function": {
+                        "name": tool.name,
+                        "description": tool.description,
+                        "parameters": tool.input_schema
+                    }
+                })
+        self._routes, self._catalog, self._openai_tools = routes, catalog, openai_tools
+    
+    def server_metrics(self) -> Dict[str, List[Dict[str, Any]]]:
+        """各副本池中每个副本的负载与延迟指标"""
+        return {
+            name: server.metrics() for name, server in self.servers.items() if isinstance(server, ServerPool)
+        }
+
+    def list_all_tools(self) -> List[Dict[str, Any]]:
+        """
+        列出所有已连接服务器的工具
+        这是MCP的能力发现（Capability Discovery）机制
+        """
+        return list(self._catalog)
     
     def call_tool(self, tool_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -48,52 +147,34 @@ class MCPClient:
         print(f"\n🔧 [MCP Client] 正在调用工具: {tool_name}")
         print(f"   参数: {arguments}")
         
-        # 在所有服务器中查找工具
-        for server_name, server in self.servers.items():
-            tools = server.list_tools()
-            tool_names = [t.name for t in tools]
-            
-            if tool_name in tool_names:
-                # 创建工具调用请求
-                request = ToolCallRequest(name=tool_name, arguments=arguments)
-                # 执行调用
-                response = server.call_tool(request)
-                
-                if response.isError:
-                    print(f"❌ [MCP Client] 工具调用失败")
-                    return {
-                        "error": True,
-                        "message": response.content[0]["text"]
-                    }
-                else:
-                    print(f"✅ [MCP Client] 工具调用成功")
-                    return {
-                        "error": False,
-                        "result": response.content[0]["text"]
-                    }
+        # 按路由表找到提供该工具的服务器
+        server_name = self._routes.get(tool_name)
+        server = self.servers.get(server_name) if server_name is not None else None
+        if server is None:
+            return {
+                "error": True,
+                "message": f"未找到工具: {tool_name}"
+            }
+
+        # 创建工具调用请求并执行
+        request = ToolCallRequest(name=tool_name, arguments=arguments)
+        response = server.call_tool(request)
         
-        # 工具未找到
+        if response.isError:
+            print(f"❌ [MCP Client] 工具调用失败")
+            return {
+                "error": True,
+                "message": response.content[0]["text"]
+            }
+        print(f"✅ [MCP Client] 工具调用成功")
         return {
-            "error": True,
-            "message": f"未找到工具: {tool_name}"
+            "error": False,
+            "result": response.content[0]["text"]
         }
     
     def get_tools_for_openai(self) -> List[Dict[str, Any]]:
         """
         将MCP工具转换为OpenAI Function Calling格式
-        这是连接MCP和OpenAI的关键转换层
+        这是连接MCP和OpenAI的关键转换层；结果在工具目录变化时才重新生成，调用方不应修改
         """
-        all_tools = self.list_all_tools()
-        openai_tools = []
-        
-        for tool in all_tools:
-            openai_tools.append({
-                "type": "function",
-                "function": {
-                    "name": tool["name"],
-                    "description": tool["description"],
-                    "parameters": tool["input_schema"]
-                }
-            })
-        
-        return openai_tools
\ No newline at end of file
+        return self._openai_tools
@@ -0,0 +1,282 @@
+"""
+服务器副本池 - 一个逻辑服务器对应多个副本（进程内 MCPEmailServer 或 RemoteMCPServer）
+ServerPool 与单个服务器接口相同，MCPClient.connect_server 传入副本列表时自动创建
+
+- 负载均衡：least_outstanding 选在途请求最少的副本（相同时轮流），round_robin 依次轮流
+- 每个副本有在途调用上限，所有副本都满时排队等待，超过 acquire_timeout 返回错误
+- 调用时的传输错误或后台健康检查失败连续达到阈值时摘除副本，
+  摘除期过后健康检查通过再恢复；未启用健康检查（health_interval=0）时摘除期过后直接恢复，
+  恢复后再失败一次即重新摘除；全部副本都被摘除时仍按原策略分配（避免整个服务不可用）
+- 不自动换副本重试：send_email 等工具不是幂等的
+- metrics() 返回每个副本的在途数、调用数、错误数和延迟分位数
+"""
+import itertools
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from mcp_server.registry import Tool, ToolCallRequest, ToolCallResponse
+from config import (
+    POOL_STRATEGY,
+    POOL_MAX_IN_FLIGHT,
+    POOL_HEALTH_INTERVAL,
+    POOL_FAILURE_THRESHOLD,
+    POOL_EJECT_SECONDS,
+)
+
+STRATEGIES = ("least_outstanding", "round_robin")
+
+
+def _percentile(values: Sequence[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class Replica:
+    """池中的一个副本及其状态，所有字段由 ServerPool 在锁内更新"""
+
+    def __init__(self, name: str, server: Any, max_in_flight: int):
+        self.name = name
+        self.server = server
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.calls = 0
+        self.errors = 0
+        self.consecutive_failures = 0
+        self.ejected_until: Optional[float] = None  # 非 None 表示已被摘除
+        self.latencies: deque = deque(maxlen=1024)  # 最近调用的耗时（秒）
+
+    @property
+    def healthy(self) -> bool:
+        return self.ejected_until is None
+
+    def call(self, request: ToolCallRequest, timeout: Optional[float]) -> ToolCallResponse:
+        """调用副本；RemoteMCPServer 走 call_tool_async，使传输错误以异常抛出而不是错误响应"""
+        call_async = getattr(self.server, "call_tool_async", None)
+        if call_async is not None:
+            future = call_async(request)
+            try:
+                return future.result(timeout)
+            finally:
+                future.cancel()  # 超时后不再等待响应
+        return self.server.call_tool(request)
+
+    def probe(self, timeout: Optional[float]):
+        ping = getattr(self.server, "ping", None)
+        if ping is not None:
+            ping(timeout)
+        else:
+            self.server.list_tools()
+
+
+class ServerPool:
+    def __init__(
+        self,
+        name: str,
+        servers: Sequence[Any],
+        strategy: str = POOL_STRATEGY,
+        max_in_flight: int = POOL_MAX_IN_FLIGHT,
+        health_interval: float = POOL_HEALTH_INTERVAL,
+        failure_threshold: int = POOL_FAILURE_THRESHOLD,
+        eject_seconds: float = POOL_EJECT_SECONDS,
+        call_timeout: Optional[float] = 30.0,
+        acquire_timeout: Optional[float] = 30.0,
+    ):
+        if not servers:
+            raise ValueError(f"副本池 {name} 至少需要一个副本")
+        if strategy not in STRATEGIES:
+            raise ValueError(f"未知的负载均衡策略: {strategy}，可选 {', '.join(STRATEGIES)}")
+        self.name = name
+        self.version = getattr(servers[0], "version", "")
+        self.strategy = strategy
+        self.failure_threshold = failure_threshold
+        self.eject_seconds = eject_seconds
+        self.call_timeout = call_timeout
+        self.acquire_timeout = acquire_timeout
+        self.replicas = [
+            Replica(f"{name}#{i}", server, max_in_flight) for i, server in enumerate(servers)
+        ]
+        self.waiting = 0  # 因所有副本都满而排队的调用数
+        self._cursor = itertools.count()
+        self._cond = threading.Condition()
+        self._tools_changed_listeners: List[Callable[[], None]] = []
+        for replica in self.replicas:
+            if hasattr(replica.server, "add_tools_changed_listener"):
+                replica.server.add_tools_changed_listener(self._notify_tools_changed)
+
+        self._stop = threading.Event()
+        self._health_thread = None
+        if health_interval > 0:
+            self._health_thread = threading.Thread(
+                target=self._health_loop, args=(health_interval,), name=f"pool-health-{name}", daemon=True
+            )
+            self._health_thread.start()
+
+    # ---- 与单个服务器相同的接口 ----
+
+    def list_tools(self) -> List[Tool]:
+        """副本提供相同的工具，取第一个健康副本的工具列表"""
+        for replica in self.replicas:
+            if replica.healthy:
+                return replica.server.list_tools()
+        return self.replicas[0].server.list_tools()
+
+    def add_tools_changed_listener(self, callback: Callable[[], None]):
+        self._tools_changed_listeners.append(callback)
+
+    def remove_tools_changed_listener(self, callback: Callable[[], None]):
+        if callback in self._tools_changed_listeners:
+            self._tools_changed_listeners.remove(callback)
+
+    def _notify_tools_changed(self):
+        for callback in list(self._tools_changed_listeners):
+            callback()
+
+    def call_tool(self, request: ToolCallRequest) -> ToolCallResponse:
+        replica = self._acquire()
+        if replica is None:
+            return ToolCallResponse(
+                content=[{"type": "text", "text": f"{self.name} 的所有副本都已达到并发上限，排队超时"}],
+                isError=True,
+            )
+        start = time.monotonic()
+        try:
+            response = replica.call(request, self.call_timeout)
+        except Exception as e:
+            self._release(replica, time.monotonic() - start, failed=True)
+            return ToolCallResponse(
+                content=[{"type": "text", "text": f"副本 {replica.name} 调用失败: {e}"}], isError=True
+            )
+        self._release(replica, time.monotonic() - start, failed=False)
+        return response
+
+    # ---- 负载均衡 ----
+
+    def _pick(self) -> Optional[Replica]:
+        if self._health_thread is None:
+            self._readmit_expired()
+        candidates = [r for r in self.replicas if r.healthy] or self.replicas
+        candidates = [r for r in candidates if r.in_flight < r.max_in_flight]
+        if not candidates:
+            return None
+        offset = next(self._cursor)
+        n = len(candidates)
+        if self.strategy == "round_robin":
+            return candidates[offset % n]
+        # 在途数相同的副本从游标位置开始轮流，避免总是选中第一个
+        return min((candidates[(offset + i) % n] for i in range(n)), key=lambda r: r.in_flight)
+
+    def _acquire(self) -> Optional[Replica]:
+        deadline = None if self.acquire_timeout is None else time.monotonic() + self.acquire_timeout
+        with self._cond:
+            while True:
+                replica = self._pick()
+                if replica is not None:
+                    replica.in_flight += 1
+                    replica.peak_in_flight = max(replica.peak_in_flight, replica.in_flight)
+                    return replica
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self.waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self.waiting -= 1
+
+    def _release(self, replica: Replica, elapsed: float, failed: bool):
+        with self._cond:
+            replica.in_flight -= 1
+            replica.calls += 1
+            replica.latencies.append(elapsed)
+            if failed:
+                replica.errors += 1
+                self._record_failure(replica)
+            else:
+                replica.consecutive_failures = 0
+            self._cond.notify()
+
+    def _record_failure(self, replica: Replica):
+        replica.consecutive_failures += 1
+        if replica.consecutive_failures >= self.failure_threshold and replica.healthy:
+            replica.ejected_until = time.monotonic() + self.eject_seconds
+            print(f"⚠️ [MCP Pool] 副本 {replica.name} 连续失败 {replica.consecutive_failures} 次，已摘除")
+
+    # ---- 健康检查 ----
+
+    def _readmit_expired(self):
+        """未启用健康检查时由调用代替探测：摘除期已过的副本恢复接收调用，再失败一次即重新摘除"""
+        now = time.monotonic()
+        for replica in self.replicas:
+            if replica.ejected_until is not None and now >= replica.ejected_until:
+                replica.ejected_until = None
+                replica.consecutive_failures = self.failure_threshold - 1
+                print(f"✅ [MCP Pool] 副本 {replica.name} 摘除期已过，重新接入")
+
+    def check_health(self):
+        """探测一遍所有副本：失败计入连续失败次数，摘除期已过且探测成功的副本恢复"""
+        now = time.monotonic()
+        for replica in self.replicas:
+            if replica.ejected_until is not None and now < replica.ejected_until:
+                continue
+            try:
+                replica.probe(self.call_timeout)
+            except Exception:
+                with self._cond:
+                    self._record_failure(replica)  # 已摘除的副本保持摘除，之后每次健康检查再探测
+                continue
+            with self._cond:
+                if not replica.healthy:
+                    print(f"✅ [MCP Pool] 副本 {replica.name} 恢复")
+                replica.ejected_until = None
+                replica.consecutive_failures = 0
+                self._cond.notify_all()
+
+    def _health_loop(self, interval: float):
+        while not self._stop.wait(interval):
+            self.check_health()
+
+    # ---- 指标 ----
+
+    def metrics(self) -> List[Dict[str, Any]]:
+        with self._cond:
+            snapshot = [
+                (r, r.in_flight, r.peak_in_flight, r.calls, r.errors, r.healthy, list(r.latencies))
+                for r in self.replicas
+            ]
+            waiting = self.waiting
+        metrics = []
+        for replica, in_flight, peak, calls, errors, healthy, latencies in snapshot:
+            p50, p99 = _percentile(latencies, 0.5), _percentile(latencies, 0.99)
+            metrics.append({
+                "replica": replica.name,
+                "healthy": healthy,
+                "in_flight": in_flight,
+                "peak_in_flight": peak,
+                "pool_waiting": waiting,
+                "calls": calls,
+                "errors": errors,
+                "latency_avg_ms": sum(latencies) / len(latencies) * 1000 if latencies else None,
+                "latency_p50_ms": p50 * 1000 if p50 is not None else None,
+                "latency_p99_ms": p99 * 1000 if p99 is not None else None,
+            })
+        return metrics
+
+    def stop(self):
+        """停止后台健康检查，取消对副本工具变化的订阅"""
+        self._stop.set()
+        for replica in self.replicas:
+            if hasattr(replica.server, "remove_tools_changed_listener"):
+                replica.server.remove_tools_changed_listener(self._notify_tools_changed)
+
+    def close(self):
+        """停止健康检查并关闭副本连接"""
+        self.stop()
+        for replica in self.replicas:
+            close = getattr(replica.server, "close", None)
+            if close is not None:
+                close()
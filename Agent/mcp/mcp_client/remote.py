@@ -0,0 +1,306 @@
+"""
+远程 MCP 服务器 - 通过 JSON-RPC 2.0（stdio / 本地 socket）调用独立进程中的工具服务器
+RemoteMCPServer 与 MCPEmailServer 接口相同（list_tools / call_tool / 工具变化订阅），
+可直接交给 MCPClient.connect_server
+
+每个服务器一条持久连接：
+- 写请求不等待响应（流水线），后台线程读取响应并按 id 交给对应的 Future，
+  多个线程（如 MCPAgent 的并发工具调用）可同时在同一连接上发起调用
+- call_tools 把多个调用合并为一个批量请求，一次写入
+"""
+import itertools
+import os
+import socket
+import subprocess
+import sys
+import threading
+from concurrent.futures import Future
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Sequence, Tuple
+
+from mcp_server.registry import Tool, ToolCallRequest, ToolCallResponse
+from mcp_server.jsonrpc import PARSE_ERROR, JSONRPCError, error_response, parse_address
+from common.serialization import decode, encode
+
+# Agent/mcp 目录：以子进程方式启动 mcp_server.jsonrpc 时作为工作目录
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EMAIL_SERVER_COMMAND = [sys.executable, "-m", "mcp_server.jsonrpc", "--stdio"]
+
+
+class JSONRPCConnection:
+    """一条 JSON-RPC 2.0 连接（每行一个 JSON），按请求 id 复用"""
+
+    def __init__(
+        self,
+        rfile: BinaryIO,
+        wfile: BinaryIO,
+        on_notification: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+    ):
+        self.rfile = rfile
+        self.wfile = wfile
+        self.on_notification = on_notification
+        self._ids = itertools.count(1)
+        self._pending: Dict[int, Future] = {}
+        self._lock = threading.Lock()  # 保护 _pending 和写端
+        self.closed = False
+        self._reader = threading.Thread(target=self._read_loop, name="jsonrpc-reader", daemon=True)
+        self._reader.start()
+
+    def _send(self, payload: Any, futures: Sequence[Tuple[int, Future]]):
+        data = encode(payload) + b"\n"
+        with self._lock:
+            if self.closed:
+                raise ConnectionError("JSON-RPC 连接已关闭")
+            for request_id, future in futures:
+                self._pending[request_id] = future
+            try:
+                self.wfile.write(data)
+                self.wfile.flush()
+            except (OSError, ValueError) as e:
+                for request_id, _ in futures:
+                    self._pending.pop(request_id, None)
+                raise ConnectionError(f"JSON-RPC 连接写入失败: {e}") from e
+
+    def request(self, method: str, params: Optional[Dict[str, Any]] = None) -> Future:
+        """发送请求，立即返回 Future（不等待响应）"""
+        request_id = next(self._ids)
+        future: Future = Future()
+        message = {"jsonrpc": "2.0", "id": request_id, "method": method}
+        if params is not None:
+            message["params"] = params
+        self._send(message, [(request_id, future)])
+        return future
+
+    def batch(self, calls: Sequence[Tuple[str, Optional[Dict[str, Any]]]]) -> List[Future]:
+        """多个请求合并为一个批量请求发送，返回与 calls 一一对应的 Future"""
+        messages, futures = [], []
+        for method, params in calls:
+            request_id = next(self._ids)
+            message = {"jsonrpc": "2.0", "id": request_id, "method": method}
+            if params is not None:
+                message["params"] = params
+            messages.append(message)
+            futures.append((request_id, Future()))
+        if messages:
+            self._send(messages, futures)
+        return [future for _, future in futures]
+
+    def call(self, method: str, params: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None) -> Any:
+        future = self.request(method, params)
+        try:
+            return future.result(timeout)
+        finally:
+            self.discard(future)
+
+    def discard(self, future: Future):
+        """不再等待该请求（如超时）：移除待响应项，之后到达的响应直接丢弃"""
+        if future.done():
+            return
+        with self._lock:
+            for request_id, pending in self._pending.items():
+                if pending is future:
+                    del self._pending[request_id]
+                    break
+
+    def notify(self, method: str, params: Optional[Dict[str, Any]] = None):
+        message = {"jsonrpc": "2.0", "method": method}
+        if params is not None:
+            message["params"] = params
+        self._send(message, [])
+
+    def _resolve(self, message: Dict[str, Any]):
+        if "method" in message and "id" not in message:
+            if self.on_notification is not None:
+                self.on_notification(message["method"], message.get("params") or {})
+            return
+        with self._lock:
+            future = self._pending.pop(message.get("id"), None)
+        if future is None:
+            return  # 无法对应到请求的响应（如服务器的解析错误）
+        if "error" in message:
+            error = message["error"]
+            future.set_exception(JSONRPCError(error.get("code"), error.get("message"), error.get("data")))
+        else:
+            future.set_result(message.get("result"))
+
+    def _read_loop(self):
+        """
+        只有对端关闭（EOF）或读取出错时才结束并让待响应的调用失败；
+        无法解析的一行回复解析错误后继续读取，不影响同一连接上的其他调用
+        """
+        try:
+            for line in self.rfile:
+                if not line.strip():
+                    continue
+                try:
+                    message = decode(line)
+                except ValueError as e:
+                    self._reply_parse_error(e)
+                    continue
+                for item in message if isinstance(message, list) else [message]:
+                    if isinstance(item, dict):
+                        self._resolve(item)
+        except (OSError, ValueError):
+            pass  # 读取出错，或 close() 已关闭 rfile
+        finally:
+            self._fail_pending(ConnectionError("JSON-RPC 连接已断开"))
+
+    def _reply_parse_error(self, error: ValueError):
+        try:
+            self._send(error_response(None, PARSE_ERROR, f"JSON 解析失败: {error}"), [])
+        except ConnectionError:
+            pass  # 写端已断开，读端随后也会结束
+
+    def _fail_pending(self, error: Exception):
+        with self._lock:
+            self.closed = True
+            pending, self._pending = self._pending, {}
+        for future in pending.values():
+            future.set_exception(error)
+
+    def close(self):
+        with self._lock:
+            self.closed = True
+        for stream in (self.wfile, self.rfile):
+            try:
+                stream.close()
+            except OSError:
+                pass
+
+
+def _to_response(result: Dict[str, Any]) -> ToolCallResponse:
+    return ToolCallResponse(content=result["content"], isError=result.get("isError", False))
+
+
+class RemoteMCPServer:
+    """
+    独立进程中的 MCP 服务器的本地代理
+    工具列表在连接时拉取并缓存，收到 notifications/tools/list_changed 后重新拉取
+    """
+
+    def __init__(self, rfile: BinaryIO, wfile: BinaryIO, process: Optional[subprocess.Popen] = None,
+                 sock: Optional[socket.socket] = None, timeout: Optional[float] = 30.0):
+        self.process = process
+        self.sock = sock
+        self.timeout = timeout
+        self._tools_changed_listeners: List[Callable[[], None]] = []
+        self.connection = JSONRPCConnection(rfile, wfile, on_notification=self._on_notification)
+        info = self.connection.call("initialize", {"protocolVersion": "2024-11-05", "clientInfo": {"name": "mcp-client"}},
+                                    timeout)
+        self.name = info["serverInfo"]["name"]
+        self.version = info["serverInfo"]["version"]
+        self.connection.notify("notifications/initialized")
+        self._tools = self._fetch_tools()
+
+    @classmethod
+    def stdio(cls, command: Optional[List[str]] = None, cwd: Optional[str] = None, **kwargs) -> "RemoteMCPServer":
+        """启动子进程，通过其 stdin/stdout 通信；默认启动邮件服务器"""
+        process = subprocess.Popen(
+            command or EMAIL_SERVER_COMMAND,
+            cwd=cwd or PACKAGE_ROOT,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+        )
+        return cls(process.stdout, process.stdin, process=process, **kwargs)
+
+    @classmethod
+    def connect(cls, address: Any, **kwargs) -> "RemoteMCPServer":
+        """连接 socket 服务器：(host, port)、"host:port" 或 "unix:/path/to.sock" """
+        if isinstance(address, str):
+            address = parse_address(address)
+        if isinstance(address, tuple):
+            sock = socket.create_connection(address)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        else:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.connect(address)
+        return cls(sock.makefile("rb"), sock.makefile("wb"), sock=sock, **kwargs)
+
+    def _fetch_tools(self) -> List[Tool]:
+        result = self.connection.call("tools/list", None, self.timeout)
+        return [
+            Tool(name=t["name"], description=t.get("description", ""), input_schema=t.get("inputSchema") or {})
+            for t in result["tools"]
+        ]
+
+    def _on_notification(self, method: str, params: Dict[str, Any]):
+        if method == "notifications/tools/list_changed":
+            # 在读线程之外拉取，避免读线程等待自己要读取的响应
+            threading.Thread(target=self._refresh_tools, daemon=True).start()
+
+    def _refresh_tools(self):
+        try:
+            self._tools = self._fetch_tools()
+        except (JSONRPCError, ConnectionError):
+            return
+        for callback in list(self._tools_changed_listeners):
+            callback()
+
+    def list_tools(self) -> List[Tool]:
+        return self._tools
+
+    def add_tools_changed_listener(self, callback: Callable[[], None]):
+        self._tools_changed_listeners.append(callback)
+
+    def remove_tools_changed_listener(self, callback: Callable[[], None]):
+        if callback in self._tools_changed_listeners:
+            self._tools_changed_listeners.remove(callback)
+
+    def ping(self, timeout: Optional[float] = None):
+        """健康检查：连接断开或超时时抛出异常"""
+        self.connection.call("ping", None, timeout or self.timeout)
+
+    def call_tool_async(self, request: ToolCallRequest) -> Future:
+        """发送 tools/call，返回结果为 ToolCallResponse 的 Future；取消该 Future 时不再等待响应"""
+        raw = self.connection.request("tools/call", {"name": request.name, "arguments": request.arguments})
+        future: Future = Future()
+        future.add_done_callback(lambda f: f.cancelled() and self.connection.discard(raw))
+
+        def done(f: Future):
+            if not future.set_running_or_notify_cancel():
+                return  # 已取消
+            error = f.exception()
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(_to_response(f.result()))
+
+        raw.add_done_callback(done)
+        return future
+
+    def call_tool(self, request: ToolCallRequest) -> ToolCallResponse:
+        """与 MCPEmailServer.call_tool 相同的同步接口；传输失败时返回错误响应"""
+        future = None
+        try:
+            future = self.call_tool_async(request)
+            return future.result(self.timeout)
+        except Exception as e:
+            return ToolCallResponse(content=[{"type": "text", "text": f"远程工具调用失败: {e}"}], isError=True)
+        finally:
+            if future is not None:
+                future.cancel()  # 超时后移除待响应项
+
+    def call_tools(self, requests: Sequence[ToolCallRequest]) -> List[ToolCallResponse]:
+        """多个工具调用作为一个批量请求发送"""
+        futures = self.connection.batch(
+            [("tools/call", {"name": r.name, "arguments": r.arguments}) for r in requests]
+        )
+        responses = []
+        for future in futures:
+            try:
+                responses.append(_to_response(future.result(self.timeout)))
+            except Exception as e:
+                self.connection.discard(future)
+                responses.append(ToolCallResponse(content=[{"type": "text", "text": f"远程工具调用失败: {e}"}], isError=True))
+        return responses
+
+    def close(self):
+        if self.sock is not None:
+            try:
+                self.sock.shutdown(socket.SHUT_RDWR)  # 唤醒阻塞在读取上的读线程
+            except OSError:
+                pass
+        self.connection.close()
+        if self.sock is not None:
+            self.sock.close()
+        if self.process is not None:
+            self.process.wait(timeout=5)
@@ -1 +1,6 @@
-"""MCP Client Package"""
\ No newline at end of file
+"""MCP Server Package"""
+import os
+import sys
+
+# 仓库根目录，导入共用的 common 包（common.serialization）
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..")))
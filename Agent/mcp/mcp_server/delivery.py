@@ -0,0 +1,366 @@
+"""
+邮件投递后端：后台队列 + 投递线程池
+- submit 只记录状态并入队，立即返回 email_id；投递线程从队列取出邮件交给传输层（SMTP / 模拟）
+- 每个收件人域名单独限速（每秒最多 domain_rate 封），超出的邮件推迟到下一个可用时刻
+- 临时错误（连接失败、4xx）按指数退避重试，永久错误（5xx）或达到最大次数后标记为失败
+- 状态存储：queued -> sending -> delivered / failed（重试前回到 queued），
+  默认保存在内存中，配置 SQLite 文件后可跨进程查询、重启后保留
+- shared_delivery_queue 是进程内共享的默认队列，同一进程中的多个邮件服务器副本共用它；
+  多个进程的副本（如 ServerPool 中的多个 RemoteMCPServer）必须配置 MCP_DELIVERY_DB 共享状态，
+  否则查询状态的请求落到其他副本时找不到邮件
+"""
+import heapq
+import itertools
+import random
+import smtplib
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from email.message import EmailMessage
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from config import (
+    SMTP_HOST,
+    SMTP_PORT,
+    MAIL_FROM,
+    DELIVERY_WORKERS,
+    DELIVERY_DOMAIN_RATE,
+    DELIVERY_MAX_ATTEMPTS,
+    DELIVERY_BACKOFF,
+    DELIVERY_BACKOFF_MAX,
+    DELIVERY_DB,
+)
+
+QUEUED, SENDING, DELIVERED, FAILED = "queued", "sending", "delivered", "failed"
+
+
+def utc_now() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _domain(address: str) -> str:
+    return address.rpartition("@")[2].lower()
+
+
+class PermanentDeliveryError(Exception):
+    """不应重试的投递错误（如收件人不存在）"""
+
+
+# ---- 状态存储 ----
+
+class StatusStore:
+    """内存中的投递状态"""
+
+    def __init__(self):
+        self._records: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def create_many(self, records: Iterable[Tuple[str, str, str]]):
+        """records: (email_id, to, subject)"""
+        now = utc_now()
+        with self._lock:
+            for email_id, to, subject in records:
+                self._records[email_id] = {
+                    "email_id": email_id, "to": to, "subject": subject, "status": QUEUED,
+                    "attempts": 0, "error": None, "created_at": now, "updated_at": now, "delivered_at": None,
+                }
+
+    def update(self, email_id: str, status: str, attempts: Optional[int] = None, error: Optional[str] = None):
+        now = utc_now()
+        with self._lock:
+            record = self._records[email_id]
+            record.update(status=status, error=error, updated_at=now)
+            if attempts is not None:
+                record["attempts"] = attempts
+            if status == DELIVERED:
+                record["delivered_at"] = now
+
+    def get(self, email_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            record = self._records.get(email_id)
+            return dict(record) if record else None
+
+    def counts(self) -> Dict[str, int]:
+        counts = dict.fromkeys((QUEUED, SENDING, DELIVERED, FAILED), 0)
+        with self._lock:
+            for record in self._records.values():
+                counts[record["status"]] += 1
+        return counts
+
+
+class SQLiteStatusStore(StatusStore):
+    """SQLite 中的投递状态（WAL 模式，一个连接加锁共享给所有投递线程）"""
+
+    COLUMNS = ("email_id", "to_addr", "subject", "status", "attempts", "error",
+               "created_at", "updated_at", "delivered_at")
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS email_status ("
+            "email_id TEXT PRIMARY KEY, to_addr TEXT, subject TEXT, status TEXT, attempts INTEGER, "
+            "error TEXT, created_at TEXT, updated_at TEXT, delivered_at TEXT)"
+        )
+
+    def create_many(self, records: Iterable[Tuple[str, str, str]]):
+        now = utc_now()
+        rows = [(email_id, to, subject, QUEUED, 0, None, now, now, None) for email_id, to, subject in records]
+        with self._lock:
+            self._conn.executemany("INSERT INTO email_status VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def update(self, email_id: str, status: str, attempts: Optional[int] = None, error: Optional[str] = None):
+        now = utc_now()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE email_status SET status = ?, error = ?, updated_at = ?, "
+                "attempts = COALESCE(?, attempts), "
+                "delivered_at = CASE WHEN ? = 'delivered' THEN ? ELSE delivered_at END "
+                "WHERE email_id = ?",
+                (status, error, now, attempts, status, now, email_id),
+            )
+
+    def get(self, email_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(self.COLUMNS)} FROM email_status WHERE email_id = ?", (email_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        record = dict(zip(self.COLUMNS, row))
+        record["to"] = record.pop("to_addr")
+        return record
+
+    def counts(self) -> Dict[str, int]:
+        counts = dict.fromkeys((QUEUED, SENDING, DELIVERED, FAILED), 0)
+        with self._lock:
+            for status, n in self._conn.execute("SELECT status, COUNT(*) FROM email_status GROUP BY status"):
+                counts[status] = n
+        return counts
+
+
+# ---- 传输层 ----
+
+class SimulatedTransport:
+    """模拟投递：不发信，只等待 latency 秒"""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+
+    def send(self, to: str, subject: str, body: str):
+        if self.latency:
+            time.sleep(self.latency)
+
+
+class SMTPTransport:
+    """通过 SMTP 投递；每个投递线程复用自己的一条连接，出错后重连"""
+
+    def __init__(self, host: str, port: int = 25, mail_from: str = MAIL_FROM, timeout: float = 30.0):
+        self.host = host
+        self.port = port
+        self.mail_from = mail_from
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self) -> smtplib.SMTP:
+        smtp = getattr(self._local, "smtp", None)
+        if smtp is None:
+            smtp = self._local.smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        return smtp
+
+    def _reset(self):
+        smtp = getattr(self._local, "smtp", None)
+        self._local.smtp = None
+        if smtp is not None:
+            try:
+                smtp.close()
+            except OSError:
+                pass
+
+    def send(self, to: str, subject: str, body: str):
+        message = EmailMessage()
+        message["From"] = self.mail_from
+        message["To"] = to
+        message["Subject"] = subject
+        message.set_content(body)
+        try:
+            self._connection().send_message(message)
+        except smtplib.SMTPRecipientsRefused as e:
+            code = min(code for code, _ in e.recipients.values())
+            if code >= 500:
+                raise PermanentDeliveryError(f"收件人被拒绝: {e.recipients}") from e
+            raise
+        except smtplib.SMTPResponseException as e:
+            if e.smtp_code >= 500:
+                raise PermanentDeliveryError(f"SMTP {e.smtp_code}: {e.smtp_error!r}") from e
+            raise
+        except (smtplib.SMTPServerDisconnected, OSError):
+            self._reset()  # 连接已不可用，下次重新建立
+            raise
+
+
+def default_transport():
+    if SMTP_HOST:
+        return SMTPTransport(SMTP_HOST, SMTP_PORT)
+    return SimulatedTransport()
+
+
+# ---- 投递队列 ----
+
+class _Job:
+    __slots__ = ("email_id", "to", "subject", "body", "attempts", "slot")
+
+    def __init__(self, email_id: str, to: str, subject: str, body: str):
+        self.email_id = email_id
+        self.to = to
+        self.subject = subject
+        self.body = body
+        self.attempts = 0
+        self.slot: Optional[float] = None  # 已预留的域名限速时刻
+
+
+class DeliveryQueue:
+    def __init__(
+        self,
+        transport=None,
+        store: Optional[StatusStore] = None,
+        workers: int = DELIVERY_WORKERS,
+        domain_rate: float = DELIVERY_DOMAIN_RATE,
+        max_attempts: int = DELIVERY_MAX_ATTEMPTS,
+        backoff: float = DELIVERY_BACKOFF,
+        backoff_max: float = DELIVERY_BACKOFF_MAX,
+    ):
+        self.transport = transport or default_transport()
+        self.store = store or (SQLiteStatusStore(DELIVERY_DB) if DELIVERY_DB else StatusStore())
+        self.workers = workers
+        self.domain_interval = 1.0 / domain_rate if domain_rate > 0 else 0.0
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+
+        self._heap: List[Tuple[float, int, _Job]] = []  # (可投递时刻, 序号, 邮件)
+        self._seq = itertools.count()
+        self._next_slot: Dict[str, float] = {}  # 域名 -> 下一个可投递时刻
+        self._cond = threading.Condition()
+        self._pending = 0  # 尚未到达最终状态的邮件数
+        self._threads: List[threading.Thread] = []
+        self._closed = False
+
+    def _start(self):
+        """第一次提交时才启动投递线程"""
+        if self._threads:
+            return
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"email-delivery-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, messages: Sequence[Tuple[str, str, str]]) -> List[str]:
+        """messages: (to, subject, body)；返回与之对应的 email_id"""
+        jobs = [_Job(f"email_{uuid.uuid4().hex[:16]}", to, subject, body) for to, subject, body in messages]
+        self.store.create_many((job.email_id, job.to, job.subject) for job in jobs)
+        now = time.monotonic()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("投递队列已关闭")
+            self._start()
+            for job in jobs:
+                heapq.heappush(self._heap, (now, next(self._seq), job))
+            self._pending += len(jobs)
+            self._cond.notify_all()
+        return [job.email_id for job in jobs]
+
+    def _reserve(self, domain: str, now: float) -> float:
+        """为域名预留下一个投递时刻（调用方持有锁）"""
+        slot = max(self._next_slot.get(domain, 0.0), now)
+        self._next_slot[domain] = slot + self.domain_interval
+        return slot
+
+    def _next_job(self) -> Optional[_Job]:
+        with self._cond:
+            while True:
+                if self._closed:
+                    return None
+                now = time.monotonic()
+                if self._heap and self._heap[0][0] <= now:
+                    _, _, job = heapq.heappop(self._heap)
+                    if job.slot is None and self.domain_interval:
+                        job.slot = self._reserve(_domain(job.to), now)
+                        if job.slot > now:  # 该域名已达到速率上限，推迟到预留的时刻
+                            heapq.heappush(self._heap, (job.slot, next(self._seq), job))
+                            continue
+                    return job
+                self._cond.wait(self._heap[0][0] - now if self._heap else None)
+
+    def _worker(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            job.attempts += 1
+            self.store.update(job.email_id, SENDING, attempts=job.attempts)
+            try:
+                self.transport.send(job.to, job.subject, job.body)
+            except PermanentDeliveryError as e:
+                self._finish(job, FAILED, str(e))
+            except Exception as e:
+                if job.attempts >= self.max_attempts:
+                    self._finish(job, FAILED, f"重试 {job.attempts} 次后仍失败: {e}")
+                else:
+                    self._retry(job, str(e))
+            else:
+                self._finish(job, DELIVERED, None)
+
+    def _retry(self, job: _Job, error: str):
+        delay = min(self.backoff * 2 ** (job.attempts - 1), self.backoff_max)
+        delay *= random.uniform(0.5, 1.0)  # 抖动，避免同时失败的邮件同时重试
+        self.store.update(job.email_id, QUEUED, error=error)
+        with self._cond:
+            job.slot = None
+            heapq.heappush(self._heap, (time.monotonic() + delay, next(self._seq), job))
+            self._cond.notify()
+
+    def _finish(self, job: _Job, status: str, error: Optional[str]):
+        self.store.update(job.email_id, status, error=error)
+        with self._cond:
+            self._pending -= 1
+            self._cond.notify_all()
+
+    def status(self, email_id: str) -> Optional[Dict[str, Any]]:
+        return self.store.get(email_id)
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """等待已提交的邮件全部到达最终状态，超时返回 False"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def close(self):
+        """停止投递线程，队列中未投递的邮件保持 queued 状态"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join()
+
+
+_shared_queue: Optional[DeliveryQueue] = None
+_shared_lock = threading.Lock()
+
+
+def shared_delivery_queue() -> DeliveryQueue:
+    """进程内共享的默认投递队列，第一次调用时创建"""
+    global _shared_queue
+    with _shared_lock:
+        if _shared_queue is None:
+            _shared_queue = DeliveryQueue()
+        return _shared_queue
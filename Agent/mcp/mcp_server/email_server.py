@@ -1,164 +1,203 @@
 """
 MCP Email Server - 提供邮件发送工具
 这是一个简化的MCP服务器实现，用于教学目的
+工具通过 mcp_server.registry 的 @tool 声明，参数在分发前按 input_schema 校验
+发送类工具只把邮件交给 mcp_server.delivery 的投递队列，后台异步投递，
+check_email_status 查询真实的投递状态
+未传入投递队列的实例共用进程内的同一个队列，ServerPool 中的任一副本都能查到其他副本发出的邮件；
+以独立进程运行多个副本时须配置 MCP_DELIVERY_DB，让各进程共享 SQLite 中的投递状态
 """
-import json
-from typing import Dict, List, Any, Optional
-from pydantic import BaseModel
+from typing import Dict, Any, Optional
 
+from config import BATCH_EMAIL_LIMIT
+from mcp_server.delivery import DeliveryQueue, shared_delivery_queue, utc_now
+from mcp_server.registry import MCPServer, Tool, ToolCallRequest, ToolCallResponse, tool
+from common.serialization import dump_tool_result
 
-class Tool(BaseModel):
-    """工具定义"""
-    name: str
-    description: str
-    input_schema: Dict[str, Any]
+# 各工具返回内容的最大字节数（UTF-8），超出时截断，未配置的工具不限制
+TOOL_PAYLOAD_LIMITS: Dict[str, int] = {
+    "send_email": 4_000,
+    "send_emails": 16_000,
+    "check_email_status": 4_000,
+    "get_inbox_count": 1_000,
+}
 
+EMAIL_ADDRESS = {
+    "type": "string",
+    "pattern": r"^[^@\s]+@[^@\s]+$",
+    "description": "收件人邮箱地址"
+}
 
-class ToolCallRequest(BaseModel):
-    """工具调用请求"""
-    name: str
-    arguments: Dict[str, Any]
+__all__ = ["MCPEmailServer", "Tool", "ToolCallRequest", "ToolCallResponse", "email_server"]
 
 
-class ToolCallResponse(BaseModel):
-    """工具调用响应"""
-    content: List[Dict[str, str]]
-    isError: bool = False
-
-
-class MCPEmailServer:
+class MCPEmailServer(MCPServer):
     """
     MCP邮件服务器
-    在真实的MCP实现中，这会通过JSON-RPC与客户端通信
-    这里我们简化为Python类，便于理解核心概念
+    通过 mcp_server.jsonrpc 可作为独立进程以 JSON-RPC 提供服务，
+    也可以作为Python对象直接交给 MCPClient
     """
+
+    name = "email-server"
+    version = "1.0.0"
+
+    def __init__(self, delivery: Optional[DeliveryQueue] = None):
+        super().__init__()
+        # 投递线程在第一次发信时才启动
+        self.delivery = delivery or shared_delivery_queue()
     
-    def __init__(self):
-        self.name = "email-server"
-        self.version = "1.0.0"
-        self._tools = self._register_tools()
-    
-    def _register_tools(self) -> List[Tool]:
-        """注册可用的工具"""
-        return [
-            Tool(
-                name="send_email",
-                description="发送电子邮件给指定收件人",
-                input_schema={
-                    "type": "object",
-                    "properties": {
-                        "to": {
-                            "type": "string",
-                            "description": "收件人邮箱地址"
-                        },
-                        "subject": {
-                            "type": "string",
-                            "description": "邮件主题"
-                        },
-                        "body": {
-                            "type": "string",
-                            "description": "邮件正文内容"
-                        }
-                    },
-                    "required": ["to", "subject", "body"]
-                }
-            ),
-            Tool(
-                name="check_email_status",
-                description="检查邮件发送状态",
-                input_schema={
-                    "type": "object",
-                    "properties": {
-                        "email_id": {
-                            "type": "string",
-                            "description": "邮件ID"
-                        }
-                    },
-                    "required": ["email_id"]
-                }
-            ),
-            Tool(
-                name="get_inbox_count",
-                description="获取收件箱中未读邮件数量",
-                input_schema={
-                    "type": "object",
-                    "properties": {},
-                    "required": []
+    @tool(
+        name="send_email",
+        description="发送电子邮件给指定收件人",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "to": EMAIL_ADDRESS,
+                "subject": {
+                    "type": "string",
+                    "description": "邮件主题"
+                },
+                "body": {
+                    "type": "string",
+                    "description": "邮件正文内容"
                 }
-            )
-        ]
-    
-    def list_tools(self) -> List[Tool]:
-        """列出所有可用工具（MCP Resources发现）"""
-        return self._tools
-    
-    def call_tool(self, request: ToolCallRequest) -> ToolCallResponse:
-        """执行工具调用"""
-        tool_name = request.name
-        arguments = request.arguments
-        
-        # 路由到对应的工具处理函数
-        if tool_name == "send_email":
-            return self._send_email(arguments)
-        elif tool_name == "check_email_status":
-            return self._check_email_status(arguments)
-        elif tool_name == "get_inbox_count":
-            return self._get_inbox_count(arguments)
-        else:
-            return ToolCallResponse(
-                content=[{
-                    "type": "text",
-                    "text": f"未知工具: {tool_name}"
-                }],
-                isError=True
-            )
-    
+            },
+            "required": ["to", "subject", "body"]
+        }
+    )
     def _send_email(self, args: Dict[str, Any]) -> ToolCallResponse:
         """发送邮件工具实现"""
         to = args.get("to")
         subject = args.get("subject")
         body = args.get("body")
         
-        # 模拟邮件发送（实际应用中这里会调用SMTP等真实邮件服务）
-        print(f"\n📧 [邮件服务器] 正在发送邮件...")
+        # 加入投递队列，由后台线程通过 SMTP（或模拟传输）投递
+        print(f"\n📧 [邮件服务器] 正在将邮件加入发送队列...")
         print(f"   收件人: {to}")
         print(f"   主题: {subject}")
         print(f"   内容: {body[:50]}..." if len(body) > 50 else f"   内容: {body}")
         
-        # 模拟成功响应
-        email_id = f"email_{hash(to + subject)}"
+        email_id = self.delivery.submit([(to, subject, body)])[0]
         result = {
-            "status": "success",
-            "message": f"邮件已成功发送到 {to}",
+            "status": "queued",
+            "message": f"邮件已加入发送队列，收件人 {to}，可用 check_email_status 查询投递状态",
             "email_id": email_id,
-            "timestamp": "2025-10-24T10:30:00Z"
+            "timestamp": utc_now()
         }
         
         return ToolCallResponse(
             content=[{
                 "type": "text",
-                "text": json.dumps(result, ensure_ascii=False, indent=2)
+                "text": dump_tool_result("send_email", result, TOOL_PAYLOAD_LIMITS)
             }]
         )
     
+    @tool(
+        name="send_emails",
+        description=f"批量发送电子邮件（一次最多 {BATCH_EMAIL_LIMIT} 封），返回每封邮件的ID",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "messages": {
+                    "type": "array",
+                    "minItems": 1,
+                    "maxItems": BATCH_EMAIL_LIMIT,
+                    "description": "邮件列表",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "to": EMAIL_ADDRESS,
+                            "subject": {
+                                "type": "string",
+                                "description": "邮件主题"
+                            },
+                            "body": {
+                                "type": "string",
+                                "description": "邮件正文内容"
+                            }
+                        },
+                        "required": ["to", "subject", "body"]
+                    }
+                }
+            },
+            "required": ["messages"]
+        }
+    )
+    def _send_emails(self, args: Dict[str, Any]) -> ToolCallResponse:
+        """批量发送邮件工具实现"""
+        messages = args["messages"]
+        print(f"\n📧 [邮件服务器] 正在将 {len(messages)} 封邮件加入发送队列...")
+        
+        email_ids = self.delivery.submit([(m["to"], m["subject"], m["body"]) for m in messages])
+        result = {
+            "status": "queued",
+            "count": len(email_ids),
+            "email_ids": email_ids,
+            "timestamp": utc_now()
+        }
+        
+        return ToolCallResponse(
+            content=[{
+                "type": "text",
+                "text": dump_tool_result("send_emails", result, TOOL_PAYLOAD_LIMITS)
+            }]
+        )
+    
+    @tool(
+        name="check_email_status",
+        description="检查邮件投递状态（queued / sending / delivered / failed）",
+        input_schema={
+            "type": "object",
+            "properties": {
+                "email_id": {
+                    "type": "string",
+                    "description": "邮件ID"
+                }
+            },
+            "required": ["email_id"]
+        }
+    )
     def _check_email_status(self, args: Dict[str, Any]) -> ToolCallResponse:
         """检查邮件状态工具实现"""
         email_id = args.get("email_id")
         
-        # 模拟状态查询
+        record = self.delivery.status(email_id)
+        if record is None:
+            return ToolCallResponse(
+                content=[{
+                    "type": "text",
+                    "text": f"未找到邮件: {email_id}"
+                }],
+                isError=True
+            )
+        # status: queued / sending / delivered / failed
         result = {
             "email_id": email_id,
-            "status": "delivered",
-            "delivered_at": "2025-10-24T10:31:00Z"
+            "status": record["status"],
+            "to": record["to"],
+            "subject": record["subject"],
+            "attempts": record["attempts"],
+            "error": record["error"],
+            "updated_at": record["updated_at"],
+            "delivered_at": record["delivered_at"]
         }
         
         return ToolCallResponse(
             content=[{
                 "type": "text",
-                "text": json.dumps(result, ensure_ascii=False, indent=2)
+                "text": dump_tool_result("check_email_status", result, TOOL_PAYLOAD_LIMITS)
             }]
         )
     
+    @tool(
+        name="get_inbox_count",
+        description="获取收件箱中未读邮件数量",
+        input_schema={
+            "type": "object",
+            "properties": {},
+            "required": []
+        }
+    )
     def _get_inbox_count(self, args: Dict[str, Any]) -> ToolCallResponse:
         """获取收件箱未读数工具实现"""
         # 模拟收件箱查询
@@ -170,7 +209,7 @@ class MCPEmailServer:
         return ToolCallResponse(
             content=[{
                 "type": "text",
-                "text": json.dumps(result, ensure_ascii=False, indent=2)
+                "text": dump_tool_result("get_inbox_count", result, TOOL_PAYLOAD_LIMITS)
             }]
         )
 
@@ -0,0 +1,231 @@
+"""
+MCP Server 的 JSON-RPC 2.0 传输层
+把任意提供 list_tools / call_tool 的服务器（如 MCPEmailServer）放到独立进程中运行，
+通过 stdio 或本地 socket（TCP / Unix domain socket）与 MCPClient 通信
+
+- 报文格式：每行一个 JSON（与 MCP 的 stdio 传输一致），可以是单个请求或批量请求（数组）
+- 流水线：同一连接上的请求不必等上一个响应，读到即交给线程池处理，响应按完成顺序写回，
+  客户端按 id 匹配
+- 支持的方法：initialize、ping、tools/list、tools/call；
+  服务器工具列表变化时向所有连接发送 notifications/tools/list_changed
+
+运行：
+    python -m mcp_server.jsonrpc --stdio
+    python -m mcp_server.jsonrpc --listen 127.0.0.1:8765
+    python -m mcp_server.jsonrpc --listen unix:/tmp/mcp-email.sock
+"""
+import argparse
+import os
+import socket
+import socketserver
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple, Union
+
+from mcp_server.registry import ToolCallRequest
+from common.serialization import decode, encode
+
+PROTOCOL_VERSION = "2024-11-05"
+
+# JSON-RPC 2.0 错误码
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+
+Address = Union[Tuple[str, int], str]  # (host, port) 或 Unix socket 路径
+
+
+def parse_address(address: str) -> Address:
+    """"unix:/path/to.sock" -> 路径；"host:port" -> (host, port)"""
+    if address.startswith("unix:"):
+        return address[len("unix:"):]
+    host, _, port = address.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def error_response(request_id: Any, code: int, message: str) -> Dict[str, Any]:
+    return {"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}}
+
+
+class JSONRPCError(Exception):
+    """JSON-RPC 错误：服务端抛出后转为 error 响应，客户端收到 error 响应时抛出"""
+
+    def __init__(self, code: int, message: str, data: Any = None):
+        super().__init__(f"[{code}] {message}")
+        self.code = code
+        self.message = message
+        self.data = data
+
+
+class _Connection:
+    """一个客户端连接的写端；多个工作线程写响应时加锁，保证每行完整"""
+
+    def __init__(self, wfile: BinaryIO):
+        self.wfile = wfile
+        self.lock = threading.Lock()
+        self.closed = False
+
+    def send(self, message: Any):
+        data = encode(message) + b"\n"
+        with self.lock:
+            if self.closed:
+                return
+            try:
+                self.wfile.write(data)
+                self.wfile.flush()
+            except (BrokenPipeError, ConnectionError, ValueError):
+                self.closed = True
+
+
+class JSONRPCServer:
+    def __init__(self, server, max_workers: int = 8):
+        self.server = server
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="jsonrpc")
+        self._connections: List[_Connection] = []
+        self._connections_lock = threading.Lock()
+        if hasattr(server, "add_tools_changed_listener"):
+            server.add_tools_changed_listener(self._broadcast_tools_changed)
+
+    # ---- 方法分发 ----
+
+    def _dispatch(self, method: str, params: Dict[str, Any]) -> Any:
+        if method == "tools/call":
+            name = params.get("name")
+            if not isinstance(name, str):
+                raise JSONRPCError(INVALID_PARAMS, "tools/call 缺少工具名 name")
+            arguments = params.get("arguments") or {}
+            if not isinstance(arguments, dict):
+                raise JSONRPCError(INVALID_PARAMS, "tools/call 的 arguments 必须是对象")
+            response = self.server.call_tool(ToolCallRequest(name=name, arguments=arguments))
+            return {"content": response.content, "isError": response.isError}
+        if method == "tools/list":
+            return {
+                "tools": [
+                    {"name": t.name, "description": t.description, "inputSchema": t.input_schema}
+                    for t in self.server.list_tools()
+                ]
+            }
+        if method == "initialize":
+            return {
+                "protocolVersion": PROTOCOL_VERSION,
+                "capabilities": {"tools": {"listChanged": True}},
+                "serverInfo": {"name": self.server.name, "version": self.server.version},
+            }
+        if method == "ping":
+            return {}
+        raise JSONRPCError(METHOD_NOT_FOUND, f"未知方法: {method}")
+
+    def handle_request(self, message: Any) -> Optional[Dict[str, Any]]:
+        """处理单个请求，通知（没有 id）和对端发来的响应（如客户端的解析错误）返回 None"""
+        if isinstance(message, dict) and "method" not in message and ("result" in message or "error" in message):
+            return None  # 不回复响应，否则两端可能互相回复错误
+        if not isinstance(message, dict) or message.get("jsonrpc") != "2.0" or not isinstance(message.get("method"), str):
+            return error_response(message.get("id") if isinstance(message, dict) else None,
+                                  INVALID_REQUEST, "不是合法的 JSON-RPC 2.0 请求")
+        request_id = message.get("id")
+        is_notification = "id" not in message
+        params = message.get("params") or {}
+        try:
+            if not isinstance(params, dict):
+                raise JSONRPCError(INVALID_PARAMS, "params 必须是对象")
+            result = self._dispatch(message["method"], params)
+        except JSONRPCError as e:
+            return None if is_notification else error_response(request_id, e.code, e.message)
+        except Exception as e:
+            return None if is_notification else error_response(request_id, INTERNAL_ERROR, f"{type(e).__name__}: {e}")
+        return None if is_notification else {"jsonrpc": "2.0", "id": request_id, "result": result}
+
+    def handle_message(self, message: Any) -> Optional[Any]:
+        """单个请求或批量请求（数组）；批量请求的响应也是数组，全是通知时不返回"""
+        if isinstance(message, list):
+            if not message:
+                return error_response(None, INVALID_REQUEST, "批量请求不能为空")
+            responses = [r for r in map(self.handle_request, message) if r is not None]
+            return responses or None
+        return self.handle_request(message)
+
+    # ---- 传输 ----
+
+    def _process_line(self, connection: _Connection, line: bytes):
+        try:
+            message = decode(line)
+        except ValueError as e:
+            connection.send(error_response(None, PARSE_ERROR, f"JSON 解析失败: {e}"))
+            return
+        response = self.handle_message(message)
+        if response is not None:
+            connection.send(response)
+
+    def serve_stream(self, rfile: BinaryIO, wfile: BinaryIO):
+        """处理一个连接直到对端关闭；每行交给线程池，不等前一个请求完成（流水线）"""
+        connection = _Connection(wfile)
+        with self._connections_lock:
+            self._connections.append(connection)
+        try:
+            for line in rfile:
+                if line.strip():
+                    self._executor.submit(self._process_line, connection, line)
+        finally:
+            with self._connections_lock:
+                self._connections.remove(connection)
+
+    def _broadcast_tools_changed(self):
+        with self._connections_lock:
+            connections = list(self._connections)
+        for connection in connections:
+            connection.send({"jsonrpc": "2.0", "method": "notifications/tools/list_changed"})
+
+    def serve_stdio(self):
+        """stdin/stdout 作为传输通道；工具实现中的 print 改写到 stderr，避免混入协议数据"""
+        rfile, wfile = sys.stdin.buffer, sys.stdout.buffer
+        sys.stdout = sys.stderr
+        self.serve_stream(rfile, wfile)
+        self._executor.shutdown(wait=True)
+
+    def serve_socket(self, address: Address):
+        """监听 TCP 或 Unix socket，每个连接一个线程读取请求，处理共享同一个线程池"""
+        rpc = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def setup(self):
+                super().setup()
+                if isinstance(address, tuple):
+                    self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+            def handle(self):
+                rpc.serve_stream(self.rfile, self.wfile)
+
+        if isinstance(address, tuple):
+            base = socketserver.ThreadingTCPServer
+        else:
+            base = socketserver.ThreadingUnixStreamServer
+            if os.path.exists(address):
+                os.unlink(address)
+
+        class Server(base):  # 子类中设置，不修改标准库类的属性
+            allow_reuse_address = True
+            daemon_threads = True
+
+        with Server(address, Handler) as server:
+            print(f"🚀 [JSON-RPC] {self.server.name} 正在监听 {address}", file=sys.stderr)
+            server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="以 JSON-RPC 2.0 运行 MCP 邮件服务器")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--stdio", action="store_true", help="通过 stdin/stdout 通信")
+    group.add_argument("--listen", help="host:port 或 unix:/path/to.sock")
+    parser.add_argument("--workers", type=int, default=8, help="处理请求的线程数")
+    args = parser.parse_args()
+
+    from mcp_server.email_server import email_server
+
+    rpc_server = JSONRPCServer(email_server, max_workers=args.workers)
+    if args.stdio:
+        rpc_server.serve_stdio()
+    else:
+        rpc_server.serve_socket(parse_address(args.listen))
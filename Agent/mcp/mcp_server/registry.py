@@ -0,0 +1,151 @@
+"""
+MCP 服务器的工具注册表
+用 @tool 装饰处理函数声明工具，继承 MCPServer 的类在定义时收集这些声明：
+- list_tools 返回的 Tool 列表由声明生成
+- call_tool 按工具名查表分发（O(1)），分发前用预先编译好的 input_schema 校验参数，
+  参数不合法时直接返回错误响应，不进入处理函数
+
+    class MyServer(MCPServer):
+        name = "my-server"
+
+        @tool("echo", "原样返回文本", {"type": "object", "properties": {"text": {"type": "string"}},
+                                      "required": ["text"]})
+        def _echo(self, args):
+            ...
+"""
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from mcp_server.schema import compile_schema
+
+
+class Tool(BaseModel):
+    """工具定义"""
+    name: str
+    description: str
+    input_schema: Dict[str, Any]
+
+
+class ToolCallRequest(BaseModel):
+    """工具调用请求"""
+    name: str
+    arguments: Dict[str, Any]
+
+
+class ToolCallResponse(BaseModel):
+    """工具调用响应"""
+    content: List[Dict[str, str]]
+    isError: bool = False
+
+
+EMPTY_SCHEMA = {"type": "object", "properties": {}, "required": []}
+
+Validator = Callable[[Any], List[str]]
+
+
+@dataclass
+class ToolSpec:
+    name: str
+    description: str
+    input_schema: Dict[str, Any]
+    validate: Validator  # 声明时编译一次
+    attr: str = ""  # 处理函数在类中的属性名，类定义时填入
+
+
+def tool(name: Optional[str] = None, description: Optional[str] = None,
+         input_schema: Optional[Dict[str, Any]] = None):
+    """声明工具；name 默认为函数名（去掉开头的下划线），description 默认为函数文档"""
+    def decorator(func):
+        schema = input_schema or EMPTY_SCHEMA
+        func.__mcp_tool__ = ToolSpec(
+            name=name or func.__name__.lstrip("_"),
+            description=description or (func.__doc__ or "").strip(),
+            input_schema=schema,
+            validate=compile_schema(schema),
+        )
+        return func
+    return decorator
+
+
+def error_response(text: str) -> ToolCallResponse:
+    return ToolCallResponse(content=[{"type": "text", "text": text}], isError=True)
+
+
+class MCPServer:
+    """
+    MCP 服务器基类：工具注册、参数校验与分发、工具列表变化通知
+    子类用 @tool 声明工具，子类的子类继承并可覆盖父类的工具
+    """
+
+    name = "mcp-server"
+    version = "1.0.0"
+    _tool_specs: Dict[str, ToolSpec] = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        specs = dict(cls._tool_specs)
+        declared: Dict[str, str] = {}
+        for attr, value in cls.__dict__.items():
+            spec = getattr(value, "__mcp_tool__", None)
+            if spec is None:
+                continue
+            if spec.name in declared:
+                raise ValueError(f"{cls.__name__} 中工具名重复: {spec.name}（{declared[spec.name]} 与 {attr}）")
+            declared[spec.name] = attr
+            specs[spec.name] = ToolSpec(spec.name, spec.description, spec.input_schema, spec.validate, attr)
+        cls._tool_specs = specs
+
+    def __init__(self):
+        self._tools_changed_listeners: List[Callable[[], None]] = []
+        self._all_handlers: Dict[str, Tuple[Callable[[Dict[str, Any]], ToolCallResponse], ToolSpec]] = {
+            name: (getattr(self, spec.attr), spec) for name, spec in self._tool_specs.items()
+        }
+        self._tools: List[Tool] = []
+        self._handlers: Dict[str, Tuple[Callable[[Dict[str, Any]], ToolCallResponse], Validator]] = {}
+        self._activate([
+            Tool(name=spec.name, description=spec.description, input_schema=spec.input_schema)
+            for spec in self._tool_specs.values()
+        ])
+
+    def _activate(self, tools: List[Tool]):
+        handlers = {}
+        for t in tools:
+            entry = self._all_handlers.get(t.name)
+            if entry is None:
+                raise ValueError(f"{self.name} 没有注册工具 {t.name} 的处理函数")
+            handler, spec = entry
+            # schema 与声明相同时复用已编译的校验函数
+            validate = spec.validate if t.input_schema == spec.input_schema else compile_schema(t.input_schema)
+            handlers[t.name] = (handler, validate)
+        self._tools, self._handlers = tools, handlers
+
+    def list_tools(self) -> List[Tool]:
+        """列出所有可用工具（MCP Resources发现）"""
+        return self._tools
+
+    def set_tools(self, tools: List[Tool]):
+        """替换工具列表（只能包含已注册处理函数的工具）并通知已连接的客户端"""
+        self._activate(tools)
+        for callback in list(self._tools_changed_listeners):
+            callback()
+
+    def add_tools_changed_listener(self, callback: Callable[[], None]):
+        """订阅工具列表变化（对应 MCP 的 notifications/tools/list_changed）"""
+        self._tools_changed_listeners.append(callback)
+
+    def remove_tools_changed_listener(self, callback: Callable[[], None]):
+        if callback in self._tools_changed_listeners:
+            self._tools_changed_listeners.remove(callback)
+
+    def call_tool(self, request: ToolCallRequest) -> ToolCallResponse:
+        """执行工具调用：查表分发，参数不符合 input_schema 时直接返回错误"""
+        entry = self._handlers.get(request.name)
+        if entry is None:
+            return error_response(f"未知工具: {request.name}")
+        handler, validate = entry
+        errors = validate(request.arguments)
+        if errors:
+            return error_response(f"参数校验失败（{request.name}）: " + "; ".join(errors))
+        return handler(request.arguments)
@@ -0,0 +1,155 @@
+"""
+工具 input_schema 校验
+把 JSON Schema 编译成由闭包组成的校验函数，注册工具时编译一次，之后每次调用只执行闭包，
+不再解释 schema 字典。支持工具参数常用的子集：
+type、properties、required、additionalProperties、items、enum、
+minLength / maxLength、minimum / maximum、minItems / maxItems、pattern；
+其余关键字（description、default 等）忽略
+"""
+import re
+from typing import Any, Callable, Dict, List
+
+Check = Callable[[Any, str, List[str]], None]  # (值, 路径, 错误列表)
+
+_TYPE_CHECKS: Dict[str, Callable[[Any], bool]] = {
+    "string": lambda v: isinstance(v, str),
+    "integer": lambda v: isinstance(v, int) and not isinstance(v, bool),
+    "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    "boolean": lambda v: isinstance(v, bool),
+    "null": lambda v: v is None,
+    "array": lambda v: isinstance(v, list),
+    "object": lambda v: isinstance(v, dict),
+}
+
+
+def json_type(value: Any) -> str:
+    """值对应的 JSON 类型名，用于错误信息"""
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "boolean"
+    if isinstance(value, int):
+        return "integer"
+    if isinstance(value, float):
+        return "number"
+    if isinstance(value, str):
+        return "string"
+    if isinstance(value, list):
+        return "array"
+    if isinstance(value, dict):
+        return "object"
+    return type(value).__name__
+
+
+def _compile(schema: Dict[str, Any]) -> Check:
+    checks: List[Check] = []
+
+    expected = schema.get("type")
+    type_check = None
+    if expected is not None:
+        names = [expected] if isinstance(expected, str) else list(expected)
+        unknown = [n for n in names if n not in _TYPE_CHECKS]
+        if unknown:
+            raise ValueError(f"不支持的 schema 类型: {unknown}")
+        predicates = [_TYPE_CHECKS[n] for n in names]
+        label = " / ".join(names)
+
+        def type_check(value, path, errors):
+            if not any(p(value) for p in predicates):
+                errors.append(f"{path}: 应为 {label}，实际为 {json_type(value)}")
+                return False
+            return True
+
+    if "enum" in schema:
+        allowed = list(schema["enum"])
+
+        def check_enum(value, path, errors):
+            if value not in allowed:
+                errors.append(f"{path}: 取值必须是 {allowed} 之一")
+
+        checks.append(check_enum)
+
+    min_length, max_length = schema.get("minLength"), schema.get("maxLength")
+    pattern = re.compile(schema["pattern"]) if "pattern" in schema else None
+    if min_length is not None or max_length is not None or pattern is not None:
+        def check_string(value, path, errors):
+            if not isinstance(value, str):
+                return
+            if min_length is not None and len(value) < min_length:
+                errors.append(f"{path}: 长度不能小于 {min_length}")
+            if max_length is not None and len(value) > max_length:
+                errors.append(f"{path}: 长度不能超过 {max_length}")
+            if pattern is not None and not pattern.search(value):
+                errors.append(f"{path}: 不匹配格式 {pattern.pattern}")
+
+        checks.append(check_string)
+
+    minimum, maximum = schema.get("minimum"), schema.get("maximum")
+    if minimum is not None or maximum is not None:
+        def check_range(value, path, errors):
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                return
+            if minimum is not None and value < minimum:
+                errors.append(f"{path}: 不能小于 {minimum}")
+            if maximum is not None and value > maximum:
+                errors.append(f"{path}: 不能大于 {maximum}")
+
+        checks.append(check_range)
+
+    properties = {name: _compile(sub) for name, sub in schema.get("properties", {}).items()}
+    required = tuple(schema.get("required", ()))
+    additional = schema.get("additionalProperties", True)
+    additional_check = _compile(additional) if isinstance(additional, dict) else None
+    if properties or required or additional is not True:
+        def check_object(value, path, errors):
+            if not isinstance(value, dict):
+                return
+            for name in required:
+                if name not in value:
+                    errors.append(f"{path}.{name}: 缺少必填参数")
+            for name, item in value.items():
+                check = properties.get(name)
+                if check is not None:
+                    check(item, f"{path}.{name}", errors)
+                elif additional is False:
+                    errors.append(f"{path}.{name}: 不允许的参数")
+                elif additional_check is not None:
+                    additional_check(item, f"{path}.{name}", errors)
+
+        checks.append(check_object)
+
+    items = _compile(schema["items"]) if isinstance(schema.get("items"), dict) else None
+    min_items, max_items = schema.get("minItems"), schema.get("maxItems")
+    if items is not None or min_items is not None or max_items is not None:
+        def check_array(value, path, errors):
+            if not isinstance(value, list):
+                return
+            if min_items is not None and len(value) < min_items:
+                errors.append(f"{path}: 至少需要 {min_items} 项")
+            if max_items is not None and len(value) > max_items:
+                errors.append(f"{path}: 最多 {max_items} 项")
+            if items is not None:
+                for i, item in enumerate(value):
+                    items(item, f"{path}[{i}]", errors)
+
+        checks.append(check_array)
+
+    def check(value, path, errors):
+        if type_check is not None and not type_check(value, path, errors):
+            return  # 类型不对时其余约束没有意义
+        for c in checks:
+            c(value, path, errors)
+
+    return check
+
+
+def compile_schema(schema: Dict[str, Any]) -> Callable[[Any], List[str]]:
+    """编译 schema，返回校验函数：参数合法时返回空列表，否则返回错误信息列表"""
+    check = _compile(schema)
+
+    def validate(value: Any) -> List[str]:
+        errors: List[str] = []
+        check(value, "arguments", errors)
+        return errors
+
+    return validate
@@ -0,0 +1,133 @@
+"""
+本地 SMTP 替身服务器，用于测试邮件投递，不会把邮件发到外部
+实现 SMTP 的最小子集（HELO/EHLO、MAIL、RCPT、DATA、RSET、NOOP、QUIT），收到的邮件保存在内存中；
+可以模拟处理延迟、按比例返回临时错误（451）、对指定域名返回永久错误（550）
+
+运行：
+    python -m mcp_server.smtp_standin --port 2525 --fail-rate 0.1
+"""
+import argparse
+import random
+import socketserver
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+
+
+class LocalSMTPServer:
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 2525,
+        latency: float = 0.0,
+        fail_rate: float = 0.0,
+        reject_domains: Sequence[str] = (),
+        seed: Optional[int] = None,
+    ):
+        self.latency = latency  # 每封邮件 DATA 阶段的处理耗时（秒）
+        self.fail_rate = fail_rate  # RCPT 返回 451 临时错误的概率
+        self.reject_domains = {d.lower() for d in reject_domains}  # RCPT 返回 550 的域名
+        self.messages: List[Dict[str, object]] = []
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+        self._server = socketserver.ThreadingTCPServer((host, port), self._handler_class(), bind_and_activate=False)
+        self._server.allow_reuse_address = True
+        self._server.daemon_threads = True
+        self._server.server_bind()
+        self._server.server_activate()
+        self.host, self.port = self._server.server_address[:2]
+        self._thread: Optional[threading.Thread] = None
+
+    def _rcpt_reply(self, address: str) -> str:
+        domain = address.rpartition("@")[2].lower()
+        if domain in self.reject_domains:
+            return "550 5.1.1 mailbox unavailable"
+        with self._lock:
+            temporary_failure = self._random.random() < self.fail_rate
+        if temporary_failure:
+            return "451 4.3.0 temporary failure, try again later"
+        return "250 OK"
+
+    def _handler_class(self):
+        standin = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def reply(self, line: str):
+                self.wfile.write(line.encode("ascii") + b"\r\n")
+
+            def handle(self):
+                self.reply("220 localhost SMTP stand-in")
+                mail_from, recipients = None, []
+                for raw in self.rfile:
+                    line = raw.decode("utf-8", "replace").rstrip("\r\n")
+                    command = line[:4].upper()
+                    if command in ("HELO", "EHLO"):
+                        self.reply("250-localhost" if command == "EHLO" else "250 localhost")
+                        if command == "EHLO":
+                            self.reply("250 8BITMIME")
+                    elif command == "MAIL":
+                        mail_from, recipients = line.partition(":")[2].strip().strip("<>"), []
+                        self.reply("250 OK")
+                    elif command == "RCPT":
+                        address = line.partition(":")[2].strip().strip("<>")
+                        reply = standin._rcpt_reply(address)
+                        if reply.startswith("250"):
+                            recipients.append(address)
+                        self.reply(reply)
+                    elif command == "DATA":
+                        if not recipients:
+                            self.reply("554 no valid recipients")
+                            continue
+                        self.reply("354 End data with <CR><LF>.<CR><LF>")
+                        data = []
+                        for raw_data in self.rfile:
+                            if raw_data.rstrip(b"\r\n") == b".":
+                                break
+                            data.append(raw_data[1:] if raw_data.startswith(b"..") else raw_data)
+                        if standin.latency:
+                            time.sleep(standin.latency)
+                        with standin._lock:
+                            standin.messages.append({
+                                "from": mail_from, "to": list(recipients), "data": b"".join(data),
+                            })
+                        mail_from, recipients = None, []
+                        self.reply("250 OK queued")
+                    elif command == "RSET":
+                        mail_from, recipients = None, []
+                        self.reply("250 OK")
+                    elif command == "NOOP":
+                        self.reply("250 OK")
+                    elif command == "QUIT":
+                        self.reply("221 Bye")
+                        return
+                    else:
+                        self.reply("502 command not implemented")
+                    self.wfile.flush()
+
+        return Handler
+
+    def start(self) -> "LocalSMTPServer":
+        """在后台线程中运行"""
+        self._thread = threading.Thread(target=self._server.serve_forever, name="smtp-standin", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="本地 SMTP 替身服务器")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=2525)
+    parser.add_argument("--latency", type=float, default=0.0, help="每封邮件的处理耗时（秒）")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="返回 451 临时错误的概率")
+    parser.add_argument("--reject-domain", action="append", default=[], help="返回 550 的收件人域名")
+    args = parser.parse_args()
+    server = LocalSMTPServer(args.host, args.port, args.latency, args.fail_rate, args.reject_domain)
+    print(f"📮 SMTP stand-in listening on {server.host}:{server.port}")
+    server.serve_forever()
@@ -0,0 +1,161 @@
+"""
+本地模拟的 OpenAI 兼容接口（POST /v1/chat/completions），用于压测 Agent，不访问任何外部服务
+脚本化行为：
+- 最后一条消息来自用户：调用 get_inbox_count 和 send_email 两个工具
+- 最后一条消息是工具结果：逐 token 输出一段总结
+首 token 延迟和每个 token 的间隔可配置；支持 stream=true（SSE，分块传输）和非流式响应
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import Dict, List
+
+ANSWER = "已查询收件箱，当前有 5 封未读邮件；并已将邮件发送给收件人，请留意对方回复。"
+
+
+def _tool_calls(turn: int) -> List[Dict]:
+    return [
+        {
+            "id": f"call_{turn}_0",
+            "type": "function",
+            "function": {"name": "get_inbox_count", "arguments": "{}"},
+        },
+        {
+            "id": f"call_{turn}_1",
+            "type": "function",
+            "function": {
+                "name": "send_email",
+                "arguments": json.dumps(
+                    {"to": "lisi@example.com", "subject": "回复", "body": "我会在周五回复你。"},
+                    ensure_ascii=False,
+                ),
+            },
+        },
+    ]
+
+
+def _split(text: str, size: int) -> List[str]:
+    return [text[i : i + size] for i in range(0, len(text), size)] or [""]
+
+
+class MockOpenAIServer:
+    def __init__(self, first_token_delay: float = 0.2, token_delay: float = 0.01, model: str = "mock-gpt"):
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        self.model = model
+        self.requests = 0
+
+    def _chunk(self, delta: Dict, finish_reason=None) -> bytes:
+        payload = {
+            "id": f"chatcmpl-{self.requests}",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": self.model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+        return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n".encode("utf-8")
+
+    async def _stream_events(self, messages: List[Dict]):
+        """按 OpenAI 的流式格式逐个产出 SSE 事件"""
+        await asyncio.sleep(self.first_token_delay)
+        yield self._chunk({"role": "assistant", "content": ""})
+        if messages[-1]["role"] == "user":
+            for index, call in enumerate(_tool_calls(self.requests)):
+                yield self._chunk({"tool_calls": [{
+                    "index": index,
+                    "id": call["id"],
+                    "type": "function",
+                    "function": {"name": call["function"]["name"], "arguments": ""},
+                }]})
+                for piece in _split(call["function"]["arguments"], 8):
+                    await asyncio.sleep(self.token_delay)
+                    yield self._chunk({"tool_calls": [{"index": index, "function": {"arguments": piece}}]})
+            yield self._chunk({}, "tool_calls")
+        else:
+            for piece in _split(ANSWER, 2):
+                await asyncio.sleep(self.token_delay)
+                yield self._chunk({"content": piece})
+            yield self._chunk({}, "stop")
+        yield b"data: [DONE]\n\n"
+
+    async def _complete(self, messages: List[Dict]) -> Dict:
+        """非流式响应：耗时与流式输出全部 token 相同"""
+        if messages[-1]["role"] == "user":
+            calls = _tool_calls(self.requests)
+            tokens = sum(len(_split(c["function"]["arguments"], 8)) for c in calls)
+            message, finish_reason = {"role": "assistant", "content": None, "tool_calls": calls}, "tool_calls"
+        else:
+            tokens = len(_split(ANSWER, 2))
+            message, finish_reason = {"role": "assistant", "content": ANSWER}, "stop"
+        await asyncio.sleep(self.first_token_delay + tokens * self.token_delay)
+        return {
+            "id": f"chatcmpl-{self.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": self.model,
+            "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": tokens, "total_tokens": tokens},
+        }
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """极简 HTTP/1.1：支持 keep-alive，流式响应使用分块传输编码"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = json.loads(await reader.readexactly(int(headers.get("content-length", 0))) or b"{}")
+
+                if method != "POST" or not path.endswith("/chat/completions"):
+                    data = json.dumps({"error": {"message": f"未知接口: {method} {path}"}}).encode()
+                    writer.write(
+                        f"HTTP/1.1 404 Not Found\r\nContent-Type: application/json\r\n"
+                        f"Content-Length: {len(data)}\r\n\r\n".encode() + data
+                    )
+                    await writer.drain()
+                    continue
+
+                self.requests += 1
+                if body.get("stream"):
+                    writer.write(
+                        b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+                        b"Transfer-Encoding: chunked\r\n\r\n"
+                    )
+                    async for event in self._stream_events(body["messages"]):
+                        writer.write(f"{len(event):x}\r\n".encode() + event + b"\r\n")
+                        await writer.drain()
+                    writer.write(b"0\r\n\r\n")
+                else:
+                    data = json.dumps(await self._complete(body["messages"]), ensure_ascii=False).encode("utf-8")
+                    writer.write(
+                        f"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                        f"Content-Length: {len(data)}\r\n\r\n".encode() + data
+                    )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(server: MockOpenAIServer, host: str = "127.0.0.1", port: int = 8900):
+    listener = await asyncio.start_server(server.handle, host, port)
+    print(f"mock OpenAI server listening on http://{host}:{port}/v1")
+    async with listener:
+        await listener.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="本地模拟的 OpenAI 兼容接口")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--first-token-delay", type=float, default=0.2, help="首 token 延迟（秒）")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="每个 token 的间隔（秒）")
+    args = parser.parse_args()
+    asyncio.run(serve(MockOpenAIServer(args.first_token_delay, args.token_delay), args.host, args.port))
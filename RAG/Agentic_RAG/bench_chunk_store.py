@@ -0,0 +1,71 @@
+"""
+片段存储内存基准
+对比当前的 dict[(file_id, chunk_index)] -> FileChunk 布局与 ColumnarChunkStore 的内存占用和读取耗时
+"""
+import random
+import time
+import tracemalloc
+
+from chunk_store import ColumnarChunkStore
+from tools import FileChunk
+
+FILE_COUNT = 10_000
+CHUNKS_PER_FILE = 20
+SAMPLE_TEXT = "向量搜索是 RAG 系统的核心组件，通过将文本转换为向量表示来实现语义相似度匹配。"
+
+
+def make_chunks():
+    """生成 (key, FileChunk)；每个片段内容各不相同，避免字符串驻留影响测量"""
+    for file_id in range(FILE_COUNT):
+        for chunk_index in range(CHUNKS_PER_FILE):
+            yield (file_id, chunk_index), FileChunk(
+                file_id, chunk_index, f"{SAMPLE_TEXT} #{file_id}-{chunk_index}"
+            )
+
+
+def measure(build):
+    """返回 (存储对象, 构建后仍驻留的字节数)"""
+    tracemalloc.start()
+    store = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return store, current
+
+
+def build_dict():
+    return dict(make_chunks())
+
+
+def build_columnar():
+    store = ColumnarChunkStore()
+    for key, chunk in make_chunks():
+        store[key] = chunk
+    return store
+
+
+def read_time(store, keys) -> float:
+    start = time.perf_counter()
+    for key in keys:
+        store[key].content
+    return (time.perf_counter() - start) / len(keys)
+
+
+def main():
+    total = FILE_COUNT * CHUNKS_PER_FILE
+    keys = [
+        (random.randrange(FILE_COUNT), random.randrange(CHUNKS_PER_FILE))
+        for _ in range(100_000)
+    ]
+    print(f"{total} chunks, ~{len(SAMPLE_TEXT)} chars each")
+    print(f"{'layout':>18} {'memory (MB)':>12} {'bytes/chunk':>12} {'read (µs)':>10}")
+    for name, build in [("dict+dataclass", build_dict), ("columnar", build_columnar)]:
+        store, size = measure(build)
+        print(
+            f"{name:>18} {size / 2**20:>12.1f} {size / total:>12.0f} "
+            f"{read_time(store, keys) * 1e6:>10.3f}"
+        )
+        del store
+
+
+if __name__ == "__main__":
+    main()
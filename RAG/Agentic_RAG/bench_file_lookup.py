@@ -0,0 +1,47 @@
+"""
+文件元信息查找的微基准
+对比线性扫描 next(f for f in files ...) 与 files_by_id 映射在不同文件规模下的单次查找耗时
+"""
+import random
+import timeit
+
+from tools import FileInfo, MockKnowledgeBaseController
+
+FILE_COUNTS = [10, 1_000, 100_000, 1_000_000]
+LOOKUPS = 1_000
+
+
+def build_controller(file_count: int) -> MockKnowledgeBaseController:
+    """构建包含 file_count 个（空）文件的控制器"""
+    controller = MockKnowledgeBaseController()
+    next_id = max(controller.files_by_id) + 1
+    for file_id in range(next_id, next_id + file_count - len(controller.files)):
+        controller.add_file(FileInfo(file_id, f"file_{file_id}.md", 0))
+    return controller
+
+
+def main():
+    print(f"{'files':>10} {'scan (µs)':>12} {'map (µs)':>12} {'getFilesMeta (µs)':>18}")
+    for file_count in FILE_COUNTS:
+        controller = build_controller(file_count)
+        ids = random.choices(list(controller.files_by_id), k=LOOKUPS)
+        # 线性扫描在百万级文件时过慢，只抽样少量查询
+        scan_ids = ids[: max(1, LOOKUPS * 10 // file_count)]
+
+        scan = timeit.timeit(
+            lambda: [next(f for f in controller.files if f.id == i) for i in scan_ids],
+            number=1,
+        ) / len(scan_ids)
+        lookup = timeit.timeit(
+            lambda: [controller.files_by_id[i] for i in ids], number=1
+        ) / len(ids)
+        meta = timeit.timeit(
+            lambda: controller.getFilesMeta(1, ids), number=1
+        ) / len(ids)
+        print(
+            f"{file_count:>10} {scan * 1e6:>12.3f} {lookup * 1e6:>12.3f} {meta * 1e6:>18.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
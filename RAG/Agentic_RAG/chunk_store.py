@@ -0,0 +1,121 @@
+"""
+紧凑的列式片段存储
+所有片段文本以 UTF-8 连续存放在一个 bytearray 中，每个文件用两个 array 记录
+各片段的偏移和长度（按 chunk_index 下标），避免每个片段一个 dataclass + 一个元组键的开销
+"""
+from array import array
+from collections.abc import MutableMapping
+from typing import Dict, Iterator, Tuple
+
+ChunkKey = Tuple[int, int]  # (file_id, chunk_index)
+
+_MISSING = 0xFFFFFFFF  # 长度数组中的空位标记
+
+
+class ChunkView:
+    """片段的轻量只读视图，content 在访问时才解码"""
+
+    __slots__ = ("file_id", "chunk_index", "_store", "_offset", "_length")
+
+    def __init__(self, store: "ColumnarChunkStore", file_id: int, chunk_index: int,
+                 offset: int, length: int):
+        self.file_id = file_id
+        self.chunk_index = chunk_index
+        self._store = store
+        self._offset = offset
+        self._length = length
+
+    @property
+    def content(self) -> str:
+        return self._store.read(self._offset, self._length)
+
+    def __repr__(self):
+        return f"ChunkView(file_id={self.file_id}, chunk_index={self.chunk_index})"
+
+
+class ColumnarChunkStore(MutableMapping):
+    """
+    (file_id, chunk_index) -> ChunkView 的映射
+    可直接替换 MockKnowledgeBaseController.chunks 使用的 dict；
+    写入时接受任何带 content 属性的对象（如 FileChunk）
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._offsets: Dict[int, array] = {}  # file_id -> array('Q')
+        self._lengths: Dict[int, array] = {}  # file_id -> array('I')，_MISSING 表示空位
+        self._count = 0
+        self.garbage_bytes = 0  # 被覆盖或删除、尚未回收的字节数
+
+    def read(self, offset: int, length: int) -> str:
+        """按偏移和长度解码一段文本"""
+        return self._buffer[offset : offset + length].decode("utf-8")
+
+    def _locate(self, key: ChunkKey) -> Tuple[int, int]:
+        """返回片段的 (offset, length)，不存在时抛出 KeyError"""
+        file_id, chunk_index = key
+        lengths = self._lengths.get(file_id)
+        if lengths is None or not 0 <= chunk_index < len(lengths):
+            raise KeyError(key)
+        length = lengths[chunk_index]
+        if length == _MISSING:
+            raise KeyError(key)
+        return self._offsets[file_id][chunk_index], length
+
+    def __getitem__(self, key: ChunkKey) -> ChunkView:
+        offset, length = self._locate(key)
+        return ChunkView(self, key[0], key[1], offset, length)
+
+    def __setitem__(self, key: ChunkKey, chunk):
+        file_id, chunk_index = key
+        data = chunk.content.encode("utf-8")
+        offsets = self._offsets.setdefault(file_id, array("Q"))
+        lengths = self._lengths.setdefault(file_id, array("I"))
+        if chunk_index >= len(lengths):
+            missing = chunk_index + 1 - len(lengths)
+            offsets.extend([0] * missing)
+            lengths.extend([_MISSING] * missing)
+        if lengths[chunk_index] == _MISSING:
+            self._count += 1
+        else:
+            self.garbage_bytes += lengths[chunk_index]
+        offsets[chunk_index] = len(self._buffer)
+        lengths[chunk_index] = len(data)
+        self._buffer += data
+
+    def __delitem__(self, key: ChunkKey):
+        _, length = self._locate(key)
+        file_id, chunk_index = key
+        lengths = self._lengths[file_id]
+        lengths[chunk_index] = _MISSING
+        self.garbage_bytes += length
+        self._count -= 1
+        # 收缩尾部空位，文件无片段时释放其数组
+        while lengths and lengths[-1] == _MISSING:
+            lengths.pop()
+            self._offsets[file_id].pop()
+        if not lengths:
+            del self._lengths[file_id]
+            del self._offsets[file_id]
+
+    def __iter__(self) -> Iterator[ChunkKey]:
+        for file_id, lengths in self._lengths.items():
+            for chunk_index, length in enumerate(lengths):
+                if length != _MISSING:
+                    yield file_id, chunk_index
+
+    def __len__(self) -> int:
+        return self._count
+
+    def compact(self):
+        """重写文本缓冲区，回收被覆盖或删除的字节（之前取得的 ChunkView 随之失效）"""
+        buffer = bytearray()
+        for file_id, lengths in self._lengths.items():
+            offsets = self._offsets[file_id]
+            for chunk_index, length in enumerate(lengths):
+                if length != _MISSING:
+                    start = offsets[chunk_index]
+                    offsets[chunk_index] = len(buffer)
+                    buffer += self._buffer[start : start + length]
+        self._buffer = buffer
+        self.garbage_bytes = 0
@@ -0,0 +1,116 @@
+"""
+混合检索：BM25 关键词检索 + 向量检索
+两路并发执行，按片段 (file_id, chunk_index) 去重后融合排序：
+- rrf: 倒数排名融合，score = Σ w / (rrf_k + rank)，不依赖两路分数的量纲
+- weighted: 各路分数 min-max 归一化后加权求和
+型号、编号、专有名词靠关键词召回，同义改写靠向量召回；融合规则在 common.retrieval 中，与 Native_RAG 共用
+"""
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Hashable, List, Optional, Sequence
+
+import numpy as np
+
+# 仓库根目录，导入共用的 common 包
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from common.retrieval import FUSIONS, Ranking
+
+# 向量检索的 embedding 请求和矩阵乘法都会释放 GIL，可与 BM25 并行
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="hybrid")
+
+
+class DenseIndex:
+    """片段向量索引：归一化 float32 向量存放在连续矩阵中，删除时用最后一行填补空位"""
+
+    def __init__(self, embeddings):
+        self.embeddings = embeddings  # LangChain Embeddings 接口
+        self._vectors: Optional[np.ndarray] = None
+        self._keys: List[Hashable] = []
+        self._positions: Dict[Hashable, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    @staticmethod
+    def _normalize(vectors) -> np.ndarray:
+        v = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(v, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return v / norms
+
+    def add_many(self, keys: Sequence[Hashable], contents: Sequence[str]):
+        if not keys:
+            return
+        vectors = self._normalize(self.embeddings.embed_documents(list(contents)))
+        needed = len(self._keys) + len(keys)
+        if self._vectors is None or needed > len(self._vectors):
+            grown = np.empty((max(needed, 2 * len(self._keys), 64), vectors.shape[1]), dtype=np.float32)
+            if self._vectors is not None:
+                grown[: len(self._keys)] = self._vectors[: len(self._keys)]
+            self._vectors = grown
+        for key, vector in zip(keys, vectors):
+            row = self._positions.get(key)
+            if row is None:
+                row = self._positions[key] = len(self._keys)
+                self._keys.append(key)
+            self._vectors[row] = vector
+
+    def add(self, key: Hashable, content: str):
+        self.add_many([key], [content])
+
+    def remove(self, key: Hashable):
+        row = self._positions.pop(key, None)
+        if row is None:
+            return
+        last = len(self._keys) - 1
+        if row != last:
+            self._vectors[row] = self._vectors[last]
+            self._keys[row] = self._keys[last]
+            self._positions[self._keys[row]] = row
+        self._keys.pop()
+
+    def top_k_many(self, queries: List[str], k: int) -> List[Ranking]:
+        """
+        批量查询：一次矩阵乘法
+        查询用 embed_query 编码：e5、带指令前缀的 bge 等非对称模型对查询和文档的编码方式不同
+        """
+        if not self._keys:
+            return [[] for _ in queries]
+        vectors = [self.embeddings.embed_query(query) for query in queries]
+        scores = self._normalize(vectors) @ self._vectors[: len(self._keys)].T
+        k = min(k, len(self._keys))
+        results = []
+        for row in scores:
+            top = np.argpartition(-row, k - 1)[:k]
+            top = top[np.argsort(-row[top])]
+            results.append([(float(row[i]), self._keys[i]) for i in top])
+        return results
+
+    def top_k(self, query: str, k: int) -> Ranking:
+        return self.top_k_many([query], k)[0]
+
+
+class HybridSearcher:
+    """与 BM25Scorer 相同的 top_k / top_k_many 接口，可直接替换知识库的检索后端"""
+
+    def __init__(self, scorer, dense: DenseIndex, method: str = "rrf",
+                 weights: Sequence[float] = (1.0, 1.0), candidates: int = 20):
+        self.scorer = scorer
+        self.dense = dense
+        self.fuse = FUSIONS[method]
+        self.weights = weights  # (关键词, 向量)
+        self.candidates = candidates  # 每一路取回的候选数，融合后再截断为 k
+
+    def top_k_many(self, queries: List[str], k: int) -> List[Ranking]:
+        n = max(k, self.candidates)
+        dense = _executor.submit(self.dense.top_k_many, queries, n)
+        lexical = self.scorer.top_k_many(queries, n)
+        return [
+            self.fuse([lex, vec], self.weights)[:k]
+            for lex, vec in zip(lexical, dense.result())
+        ]
+
+    def top_k(self, query: str, k: int) -> Ranking:
+        return self.top_k_many([query], k)[0]
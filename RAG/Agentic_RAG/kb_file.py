@@ -0,0 +1,300 @@
+"""
+知识库磁盘格式 - 可通过 mmap 零拷贝打开
+文件包含片段文本、偏移表、文件元信息和倒排索引，全部为定长数组或连续字节块；
+打开时只解析文件头，片段和索引都在访问时才从映射内存中读取。
+多个进程打开同一文件时共享操作系统页缓存，启动耗时与语料规模无关。
+
+布局（数组均为本机字节序）：
+    文件头  MAGIC | doc_count(Q) | total_length(Q) | 各区段 (offset, length)(QQ)
+    区段    见 SECTIONS，每个区段按 8 字节对齐
+"""
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping, Sequence
+from typing import Callable, Dict, Iterator, List, Tuple
+
+from chunk_store import ChunkView
+
+ChunkKey = Tuple[int, int]  # (file_id, chunk_index)
+
+MAGIC = b"AGKB0001"
+
+# 区段名 -> array 类型码（"B" 为字节块）
+SECTIONS: Dict[str, str] = {
+    # 片段：按 (file_id, chunk_index) 排序，下标即文档序号
+    "text": "B",
+    "doc_file": "q",
+    "doc_chunk": "I",
+    "doc_text_offset": "Q",
+    "doc_text_length": "I",
+    "doc_length": "I",  # 分词后的词项数，供 BM25 使用
+    # 文件：按 file_id 排序
+    "file_id": "q",
+    "file_chunk_count": "I",
+    "file_first_doc": "I",
+    "file_doc_count": "I",
+    "file_meta_offset": "Q",  # 指向 file_meta 中的 filename + status
+    "file_name_length": "I",
+    "file_status_length": "I",
+    "file_meta": "B",
+    "file_order": "I",  # 分页顺序 -> 排序后的文件下标
+    # 倒排索引：词项按 UTF-8 字节序排序
+    "term_offset": "Q",  # len = 词项数 + 1
+    "terms": "B",
+    "posting_offset": "Q",  # len = 词项数 + 1，单位为 posting 条目
+    "postings": "I",  # (文档序号, 词频) 交错存放
+}
+
+_HEADER = struct.Struct(f"<8sQQ{len(SECTIONS) * 2}Q")
+
+
+class FileRecord:
+    """文件元信息的只读视图，字段与 FileInfo 一致"""
+
+    __slots__ = ("id", "filename", "chunk_count", "status")
+
+    def __init__(self, id: int, filename: str, chunk_count: int, status: str):
+        self.id = id
+        self.filename = filename
+        self.chunk_count = chunk_count
+        self.status = status
+
+    def __repr__(self):
+        return f"FileRecord(id={self.id}, filename={self.filename!r})"
+
+
+def write_knowledge_base(path: str, files, chunks, index):
+    """
+    将知识库写入 path
+    files: 有序的文件列表（FileInfo），chunks: (file_id, chunk_index) -> 带 content 的对象，
+    index: 与 chunks 对应的 InvertedIndex
+    """
+    data = {name: array(code) for name, code in SECTIONS.items()}
+    text, meta, terms = bytearray(), bytearray(), bytearray()
+
+    doc_of: Dict[ChunkKey, int] = {}
+    for doc, key in enumerate(sorted(chunks)):
+        doc_of[key] = doc
+        encoded = chunks[key].content.encode("utf-8")
+        data["doc_file"].append(key[0])
+        data["doc_chunk"].append(key[1])
+        data["doc_text_offset"].append(len(text))
+        data["doc_text_length"].append(len(encoded))
+        data["doc_length"].append(index.doc_lengths[key])
+        text += encoded
+
+    sorted_files = sorted(files, key=lambda f: f.id)
+    position = {f.id: i for i, f in enumerate(sorted_files)}
+    doc_keys = sorted(doc_of)
+    for f in sorted_files:
+        first = bisect_left(doc_keys, (f.id, -1))
+        last = bisect_left(doc_keys, (f.id + 1, -1))
+        name, status = f.filename.encode("utf-8"), f.status.encode("utf-8")
+        data["file_id"].append(f.id)
+        data["file_chunk_count"].append(f.chunk_count)
+        data["file_first_doc"].append(first)
+        data["file_doc_count"].append(last - first)
+        data["file_meta_offset"].append(len(meta))
+        data["file_name_length"].append(len(name))
+        data["file_status_length"].append(len(status))
+        meta += name + status
+    data["file_order"].extend(position[f.id] for f in files)
+
+    data["term_offset"].append(0)
+    data["posting_offset"].append(0)
+    postings = data["postings"]
+    for term in sorted(index.postings, key=lambda t: t.encode("utf-8")):
+        terms += term.encode("utf-8")
+        data["term_offset"].append(len(terms))
+        for doc, tf in sorted((doc_of[key], tf) for key, tf in index.postings[term].items()):
+            postings.append(doc)
+            postings.append(tf)
+        data["posting_offset"].append(len(postings) // 2)
+
+    blobs = {name: data[name].tobytes() for name in SECTIONS}
+    blobs.update(text=bytes(text), file_meta=bytes(meta), terms=bytes(terms))
+
+    table, offset = [], _HEADER.size
+    for name in SECTIONS:
+        offset += -offset % 8
+        table.extend((offset, len(blobs[name])))
+        offset += len(blobs[name])
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, len(doc_of), index.total_length, *table))
+        for name in SECTIONS:
+            f.write(b"\0" * (-f.tell() % 8))
+            f.write(blobs[name])
+    os.replace(tmp_path, path)  # 原子替换，已打开旧文件的进程不受影响
+
+
+class MmapKnowledgeBase:
+    """以 mmap 只读方式打开的知识库文件"""
+
+    def __init__(self, path: str, tokenizer: Callable[[str], List[str]]):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        header = _HEADER.unpack_from(self._mmap)
+        if header[0] != MAGIC:
+            raise ValueError(f"不是知识库文件: {path}")
+        self.doc_count, self.total_length = header[1], header[2]
+
+        view = memoryview(self._mmap)
+        self._views = []
+        for i, (name, code) in enumerate(SECTIONS.items()):
+            offset, length = header[3 + 2 * i], header[4 + 2 * i]
+            section = view[offset : offset + length].cast(code)
+            self._views.append(section)
+            setattr(self, "_" + name, section)
+        self._views.append(view)
+
+        self.files = MmapFileList(self)
+        self.files_by_id = MmapFileMap(self)
+        self.chunks = MmapChunks(self)
+        self.index = MmapIndex(self, tokenizer)
+
+    def close(self):
+        """释放映射（之后不可再访问任何视图）"""
+        for section in self._views:
+            section.release()
+        self._mmap.close()
+
+    def file_at(self, i: int) -> FileRecord:
+        """按 file_id 排序后的第 i 个文件"""
+        start = self._file_meta_offset[i]
+        name_end = start + self._file_name_length[i]
+        meta = self._file_meta
+        return FileRecord(
+            self._file_id[i],
+            str(meta[start:name_end], "utf-8"),
+            self._file_chunk_count[i],
+            str(meta[name_end : name_end + self._file_status_length[i]], "utf-8"),
+        )
+
+    def find_file(self, file_id: int) -> int:
+        """二分查找文件下标，不存在时返回 -1"""
+        i = bisect_left(self._file_id, file_id)
+        return i if i < len(self._file_id) and self._file_id[i] == file_id else -1
+
+    def find_doc(self, key: ChunkKey) -> int:
+        """二分查找片段的文档序号，不存在时返回 -1"""
+        i = self.find_file(key[0])
+        if i < 0:
+            return -1
+        first = self._file_first_doc[i]
+        chunk_indices = self._doc_chunk[first : first + self._file_doc_count[i]]
+        j = bisect_left(chunk_indices, key[1])
+        return first + j if j < len(chunk_indices) and chunk_indices[j] == key[1] else -1
+
+    def doc_key(self, doc: int) -> ChunkKey:
+        return self._doc_file[doc], self._doc_chunk[doc]
+
+    def read(self, offset: int, length: int) -> str:
+        """ChunkView 使用：按偏移和长度解码片段文本"""
+        return str(self._text[offset : offset + length], "utf-8")
+
+
+class MmapFileList(Sequence):
+    """按分页顺序排列的文件列表，元素在访问时才构造"""
+
+    def __init__(self, kb: MmapKnowledgeBase):
+        self._kb = kb
+
+    def __len__(self) -> int:
+        return len(self._kb._file_order)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        return self._kb.file_at(self._kb._file_order[i])
+
+
+class MmapFileMap(Mapping):
+    """file_id -> FileRecord"""
+
+    def __init__(self, kb: MmapKnowledgeBase):
+        self._kb = kb
+
+    def __getitem__(self, file_id: int) -> FileRecord:
+        i = self._kb.find_file(file_id)
+        if i < 0:
+            raise KeyError(file_id)
+        return self._kb.file_at(i)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._kb._file_id)
+
+    def __len__(self) -> int:
+        return len(self._kb._file_id)
+
+
+class MmapChunks(Mapping):
+    """(file_id, chunk_index) -> ChunkView，与 ColumnarChunkStore 的读取接口一致"""
+
+    def __init__(self, kb: MmapKnowledgeBase):
+        self._kb = kb
+
+    def __getitem__(self, key: ChunkKey) -> ChunkView:
+        doc = self._kb.find_doc(key)
+        if doc < 0:
+            raise KeyError(key)
+        kb = self._kb
+        return ChunkView(
+            kb, key[0], key[1], kb._doc_text_offset[doc], kb._doc_text_length[doc]
+        )
+
+    def __iter__(self) -> Iterator[ChunkKey]:
+        return map(self._kb.doc_key, range(self._kb.doc_count))
+
+    def __len__(self) -> int:
+        return self._kb.doc_count
+
+
+class MmapIndex:
+    """只读倒排索引，接口与 InvertedIndex 中供 BM25Scorer 使用的部分一致"""
+
+    version = 0  # 文件内容不变
+
+    def __init__(self, kb: MmapKnowledgeBase, tokenizer: Callable[[str], List[str]]):
+        self._kb = kb
+        self.tokenizer = tokenizer
+        self.doc_count = kb.doc_count
+        self.total_length = kb.total_length
+
+    def _find_term(self, term: str) -> int:
+        """二分查找词项下标，不存在时返回 -1"""
+        target = term.encode("utf-8")
+        offsets, terms = self._kb._term_offset, self._kb._terms
+        lo, hi = 0, len(offsets) - 1
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if terms[offsets[mid] : offsets[mid + 1]].tobytes() < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(offsets) - 1 and terms[offsets[lo] : offsets[lo + 1]] == target:
+            return lo
+        return -1
+
+    def df(self, term: str) -> int:
+        i = self._find_term(term)
+        if i < 0:
+            return 0
+        return self._kb._posting_offset[i + 1] - self._kb._posting_offset[i]
+
+    def scan(self, term: str) -> Iterator[Tuple[ChunkKey, int, int]]:
+        """遍历词项的倒排表，产出 (片段, 词频, 片段长度)"""
+        i = self._find_term(term)
+        if i < 0:
+            return
+        kb = self._kb
+        start, end = kb._posting_offset[i], kb._posting_offset[i + 1]
+        postings = kb._postings[2 * start : 2 * end]
+        doc_file, doc_chunk, doc_length = kb._doc_file, kb._doc_chunk, kb._doc_length
+        for j in range(0, len(postings), 2):
+            doc = postings[j]
+            yield (doc_file[doc], doc_chunk[doc]), postings[j + 1], doc_length[doc]
@@ -1,10 +1,27 @@
-from typing import List, Dict
-import json
+from typing import (
+    Dict,
+    List,
+    MutableMapping,
+    Optional,
+    Set,
+    Tuple,
+)
+import os
+import sys
 from dataclasses import dataclass
 from langchain_core.tools import tool
 from langchain_openai import ChatOpenAI
 from langgraph.prebuilt import create_react_agent
 
+# 仓库根目录，导入共用的 common 包
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from common.retrieval import BM25Scorer, InvertedIndex, tokenize
+from common.serialization import dump_tool_result
+from hybrid import DenseIndex, HybridSearcher
+from kb_file import MmapKnowledgeBase, write_knowledge_base
+from result_cache import ResultCache
+
 
 @dataclass
 class FileChunk:
@@ -25,10 +42,17 @@ class FileInfo:
     status: str = "done"
 
 
+ChunkKey = Tuple[int, int]  # (file_id, chunk_index)
+
 class MockKnowledgeBaseController:
     """模拟知识库控制器 - 内存版本，用于演示"""
 
-    def __init__(self):
+    def __init__(
+        self,
+        chunk_store: Optional[MutableMapping] = None,
+        embeddings=None,
+        fusion: str = "rrf",
+    ):
         # 模拟一些文档数据
         self.files = [
             FileInfo(1, "rag_introduction.md", 5),
@@ -110,55 +134,134 @@ class MockKnowledgeBaseController:
                 4, 3, "系统提示词应该明确定义 Agent 的角色、能力边界和行为规范。"
             ),
         }
+        # 可替换片段存储后端，如 chunk_store.ColumnarChunkStore
+        if chunk_store is not None:
+            chunk_store.update(self.chunks)
+            self.chunks = chunk_store
+
+        # file_id -> FileInfo 与每个文件的片段目录，和 self.files 同步维护
+        self.files_by_id: Dict[int, FileInfo] = {f.id: f for f in self.files}
+        self.file_chunks: Dict[int, Set[int]] = {f.id: set() for f in self.files}
+        for file_id, chunk_index in self.chunks:
+            self.file_chunks[file_id].add(chunk_index)
+
+        # 入库时一次性构建倒排索引，之后随 add_chunk/remove_chunk 增量更新
+        self.index = InvertedIndex()
+        for key, chunk in self.chunks.items():
+            self.index.add(key, chunk.content)
+        self.scorer = BM25Scorer(self.index)
+
+        # 传入 embeddings 时启用混合检索（BM25 + 向量，fusion 为 rrf 或 weighted），否则只用 BM25
+        self.dense = None
+        self.searcher = self.scorer
+        if embeddings is not None:
+            self.dense = DenseIndex(embeddings)
+            keys = list(self.chunks)
+            self.dense.add_many(keys, [self.chunks[key].content for key in keys])
+            self.searcher = HybridSearcher(self.scorer, self.dense, method=fusion)
+
+    @classmethod
+    def open(cls, path: str) -> "MockKnowledgeBaseController":
+        """以 mmap 方式打开 save() 写出的知识库文件（只读，不支持增删文件/片段）"""
+        kb = MmapKnowledgeBase(path, tokenize)
+        controller = cls.__new__(cls)
+        controller.files = kb.files
+        controller.files_by_id = kb.files_by_id
+        controller.chunks = kb.chunks
+        controller.index = kb.index
+        controller.scorer = BM25Scorer(kb.index)
+        controller.dense = None
+        controller.searcher = controller.scorer
+        return controller
+
+    @property
+    def version(self) -> int:
+        """知识库版本号，片段每次增删都会递增"""
+        return self.index.version
+
+    def save(self, path: str):
+        """将文件、片段和倒排索引写入 kb_file 格式的磁盘文件"""
+        write_knowledge_base(path, self.files, self.chunks, self.index)
+
+    def add_file(self, file_info: FileInfo, contents: List[str] = ()):
+        """新增文件（追加到分页列表末尾），contents 依次作为其片段"""
+        if file_info.id in self.files_by_id:
+            raise ValueError(f"文件已存在: {file_info.id}")
+        self.files.append(file_info)
+        self.files_by_id[file_info.id] = file_info
+        self.file_chunks[file_info.id] = set()
+        for chunk_index, content in enumerate(contents):
+            self.add_chunk(file_info.id, chunk_index, content)
+
+    def remove_file(self, file_id: int):
+        """删除文件及其全部片段"""
+        file_info = self.files_by_id.get(file_id)
+        if file_info is None:
+            return
+        for chunk_index in list(self.file_chunks[file_id]):
+            self.remove_chunk(file_id, chunk_index)
+        del self.files_by_id[file_id]
+        del self.file_chunks[file_id]
+        self.files.remove(file_info)
+
+    def add_chunk(self, file_id: int, chunk_index: int, content: str):
+        """新增或覆盖一个文件片段，并同步更新索引（文件须已存在）"""
+        file_info = self.files_by_id[file_id]
+        key = (file_id, chunk_index)
+        old = self.chunks.get(key)
+        if old:
+            self.index.remove(key, old.content)
+        self.chunks[key] = FileChunk(file_id, chunk_index, content)
+        self.index.add(key, content)
+        if self.dense is not None:
+            self.dense.add(key, content)
+        self.file_chunks[file_id].add(chunk_index)
+        file_info.chunk_count = len(self.file_chunks[file_id])
+
+    def remove_chunk(self, file_id: int, chunk_index: int):
+        """删除一个文件片段，并同步更新索引"""
+        chunk = self.chunks.pop((file_id, chunk_index), None)
+        if chunk:
+            self.index.remove((file_id, chunk_index), chunk.content)
+            if self.dense is not None:
+                self.dense.remove((file_id, chunk_index))
+            self.file_chunks[file_id].discard(chunk_index)
+            self.files_by_id[file_id].chunk_count = len(self.file_chunks[file_id])
+
+    def search(self, kb_id: int, query: str, k: int = 5) -> List[Dict]:
+        """模拟语义搜索 - BM25 排序（启用混合检索时与向量检索融合），返回前 k 个片段"""
+        return self._search_results(self.searcher.top_k(query, k))
+
+    def search_many(self, kb_id: int, queries: List[str], k: int = 5) -> List[List[Dict]]:
+        """批量搜索 - 一次遍历所有查询的倒排表，按查询顺序返回各自的前 k 个片段"""
+        return [
+            self._search_results(top) for top in self.searcher.top_k_many(queries, k)
+        ]
 
-    def search(self, kb_id: int, query: str) -> List[Dict]:
-        """模拟语义搜索 - 基于关键词匹配"""
-        query_lower = query.lower()
+    def _search_results(self, top: List[Tuple[float, ChunkKey]]) -> List[Dict]:
+        """只为最终的 k 个结果构造返回内容"""
         results = []
-
-        for (file_id, chunk_idx), chunk in self.chunks.items():
-            content_lower = chunk.content.lower()
-            # 简单的关键词匹配评分
-            score = 0
-            keywords = [
-                "rag",
-                "agentic",
-                "优缺点",
-                "优点",
-                "缺点",
-                "llm",
-                "检索",
-                "生成",
-                "向量",
-                "搜索",
-            ]
-            for keyword in keywords:
-                if keyword in query_lower and keyword in content_lower:
-                    score += 1
-
-            if score > 0 or any(word in content_lower for word in query_lower.split()):
-                file_info = next(f for f in self.files if f.id == file_id)
-                results.append(
-                    {
-                        "file_id": file_id,
-                        "chunk_index": chunk_idx,
-                        "filename": file_info.filename,
-                        "score": score + 0.5,  # 基础分
-                        "preview": chunk.content[:100] + "..."
-                        if len(chunk.content) > 100
-                        else chunk.content,
-                    }
-                )
-
-        # 按分数排序并返回前5个
-        results.sort(key=lambda x: x["score"], reverse=True)
-        return results[:5]
+        for score, (file_id, chunk_idx) in top:
+            chunk = self.chunks[(file_id, chunk_idx)]
+            file_info = self.files_by_id[file_id]
+            results.append(
+                {
+                    "file_id": file_id,
+                    "chunk_index": chunk_idx,
+                    "filename": file_info.filename,
+                    "score": round(score, 4),
+                    "preview": chunk.content[:100] + "..."
+                    if len(chunk.content) > 100
+                    else chunk.content,
+                }
+            )
+        return results
 
     def getFilesMeta(self, kb_id: int, file_ids: List[int]) -> List[Dict]:
         """获取文件元信息"""
         result = []
         for file_id in file_ids:
-            file_info = next((f for f in self.files if f.id == file_id), None)
+            file_info = self.files_by_id.get(file_id)
             if file_info:
                 result.append(
                     {
@@ -184,9 +287,7 @@ class MockKnowledgeBaseController:
                         "file_id": file_id,
                         "chunk_index": chunk_index,
                         "content": chunk.content,
-                        "filename": next(
-                            f.filename for f in self.files if f.id == file_id
-                        ),
+                        "filename": self.files_by_id[file_id].filename,
                     }
                 )
         return result
@@ -208,17 +309,77 @@ class MockKnowledgeBaseController:
         ]
 
 
+def _kb_embeddings():
+    """设置 EMBEDDING_MODEL 环境变量时启用混合检索"""
+    model = os.getenv("EMBEDDING_MODEL")
+    if not model:
+        return None
+    from langchain_openai import OpenAIEmbeddings
+
+    return OpenAIEmbeddings(base_url="https://api.siliconflow.cn/v1", model=model)
+
+
 # 初始化模拟的知识库控制器
-kb_controller = MockKnowledgeBaseController()
+kb_controller = MockKnowledgeBaseController(embeddings=_kb_embeddings())
 knowledge_base_id = 1  # 模拟的知识库ID
 
+# 工具结果缓存，跨问题、跨用户共享；知识库版本变化时自动失效
+search_cache = ResultCache(maxsize=1024, ttl=600)
+chunk_cache = ResultCache(maxsize=1024, ttl=600)
+
+# 各工具返回内容的最大字节数（UTF-8），超出时截断，未配置的工具不限制
+TOOL_PAYLOAD_LIMITS: Dict[str, int] = {
+    "query_knowledge_base": 8_000,
+    "query_knowledge_base_batch": 16_000,
+    "read_file_chunks": 16_000,
+    "get_files_meta": 8_000,
+    "list_files": 8_000,
+}
+
+
+def _normalize_query(query: str) -> str:
+    """查询归一化：小写并合并空白，使等价查询命中同一缓存条目"""
+    return " ".join(query.lower().split())
+
 
-# 定义四个核心工具
+def _cached_search_many(queries: List[str], k: int) -> List[List[Dict]]:
+    """逐个查缓存，只对未命中的查询做一次批量搜索"""
+    version = kb_controller.version
+    keys = [(knowledge_base_id, _normalize_query(q), k) for q in queries]
+    results = [search_cache.get(key, version) for key in keys]
+    missing = [i for i, r in enumerate(results) if r is None]
+    if missing:
+        fresh = kb_controller.search_many(
+            knowledge_base_id, [queries[i] for i in missing], k
+        )
+        for i, r in zip(missing, fresh):
+            search_cache.put(keys[i], version, r)
+            results[i] = r
+    return results
+
+
+def cache_stats() -> Dict[str, Dict]:
+    """各工具缓存的命中/未命中/淘汰计数"""
+    return {"search": search_cache.stats(), "chunks": chunk_cache.stats()}
+
+
+# 定义核心工具
 @tool("query_knowledge_base")
-def query_knowledge_base(query: str) -> str:
-    """Query a knowledge base with semantic search"""
-    results = kb_controller.search(knowledge_base_id, query)
-    return json.dumps(results, ensure_ascii=False, indent=2)
+def query_knowledge_base(query: str, k: int = 5) -> str:
+    """Query a knowledge base with semantic search. Returns the top k chunks ranked by relevance score (BM25, fused with vector search when hybrid retrieval is enabled; higher is more relevant)."""
+    results = _cached_search_many([query], k)[0]
+    return dump_tool_result("query_knowledge_base", results, TOOL_PAYLOAD_LIMITS)
+
+
+@tool("query_knowledge_base_batch")
+def query_knowledge_base_batch(queries: List[str], k: int = 5) -> str:
+    """Query the knowledge base with several queries in one call. Returns, for each query, its top k chunks ranked by relevance score. Prefer this over repeated query_knowledge_base calls."""
+    results = _cached_search_many(queries, k)
+    return dump_tool_result(
+        "query_knowledge_base_batch",
+        [{"query": q, "results": r} for q, r in zip(queries, results)],
+        TOOL_PAYLOAD_LIMITS,
+    )
 
 
 @tool("get_files_meta")
@@ -227,7 +388,7 @@ def get_files_meta(fileIds: List[int]) -> str:
     if not fileIds:
         return "请提供文件ID数组"
     results = kb_controller.getFilesMeta(knowledge_base_id, fileIds)
-    return json.dumps(results, ensure_ascii=False, indent=2)
+    return dump_tool_result("get_files_meta", results, TOOL_PAYLOAD_LIMITS)
 
 
 @tool("read_file_chunks")
@@ -235,27 +396,41 @@ def read_file_chunks(chunks: List[Dict[str, int]]) -> str:
     """Read content chunks from specified files in the current knowledge base."""
     if not chunks:
         return "请提供要读取的chunk信息数组"
-    results = kb_controller.readFileChunks(knowledge_base_id, chunks)
-    return json.dumps(results, ensure_ascii=False, indent=2)
+    version = kb_controller.version
+    key = (
+        knowledge_base_id,
+        tuple((c.get("fileId"), c.get("chunkIndex")) for c in chunks),
+    )
+    results = chunk_cache.get(key, version)
+    if results is None:
+        results = kb_controller.readFileChunks(knowledge_base_id, chunks)
+        chunk_cache.put(key, version, results)
+    return dump_tool_result("read_file_chunks", results, TOOL_PAYLOAD_LIMITS)
 
 
 @tool("list_files")
 def list_files(page: int = 0, pageSize: int = 10) -> str:
     """List all files in the current knowledge base. Returns file ID, filename, and chunk count."""
     results = kb_controller.listFilesPaginated(knowledge_base_id, page, pageSize)
-    return json.dumps(results, ensure_ascii=False, indent=2)
+    return dump_tool_result("list_files", results, TOOL_PAYLOAD_LIMITS)
 
 
 def create_agentic_rag_system():
     """创建 Agentic RAG 系统"""
 
     # 工具清单
-    tools = [query_knowledge_base, get_files_meta, read_file_chunks, list_files]
+    tools = [
+        query_knowledge_base,
+        query_knowledge_base_batch,
+        get_files_meta,
+        read_file_chunks,
+        list_files,
+    ]
 
     # 行为策略（系统提示）
     SYSTEM_PROMPT = """你是一个 Agentic RAG 助手。请遵循以下策略逐步收集证据后回答：
 
-1. 先用 query_knowledge_base 搜索相关内容，获得候选文件和片段线索
+1. 先用 query_knowledge_base 搜索相关内容，获得候选文件和片段线索；需要从多个角度搜索时，用 query_knowledge_base_batch 一次提交多个查询
 2. 根据搜索结果，选择最相关的文件，可选择性使用 get_files_meta 查看详细文件信息
 3. 使用 read_file_chunks 精读最相关的2-3个片段内容作为证据
 4. 基于读取的具体片段内容组织答案
@@ -0,0 +1,57 @@
+"""
+IVF 近似检索基准
+在聚簇分布的随机向量上，对不同 nprobe 输出 recall@k 与 QPS（即召回率-吞吐曲线），以精确检索为基线
+"""
+import argparse
+import time
+
+from langchain_core.documents import Document
+
+from bench_vector_store import ground_truth, make_data, recall
+from embeddings import HashingEmbeddings
+from ivf_store import IVFVectorStore
+from numpy_store import NumpyVectorStore
+
+
+def measure(store, queries, truth, k, **kwargs):
+    start = time.perf_counter()
+    results = [[d.id for d in store.similarity_search_by_vector(q, k, **kwargs)] for q in queries]
+    elapsed = time.perf_counter() - start
+    return recall(results, truth), len(queries) / elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=500_000, help="向量数")
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--nlist", type=int, default=1024)
+    parser.add_argument("-k", type=int, default=3)
+    args = parser.parse_args()
+
+    vectors, queries = make_data(args.n, args.dim, args.queries)
+    truth = ground_truth(vectors, queries, args.k)
+    ids = [str(i) for i in range(args.n)]
+    docs = [Document(page_content=f"chunk {i}") for i in range(args.n)]
+    print(f"{args.n} vectors x {args.dim} dims, {args.queries} queries, k={args.k}, nlist={args.nlist}")
+
+    exact = NumpyVectorStore(HashingEmbeddings())
+    exact.upsert(ids, docs, vectors)
+    r, qps = measure(exact, queries, truth, args.k)
+    print(f"{'exact':>12}: recall@{args.k} {r:.4f}, {qps:,.0f} QPS")
+
+    store = IVFVectorStore(HashingEmbeddings(), nlist=args.nlist)
+    start = time.perf_counter()
+    half = args.n // 2  # 先写入一半（达到 train_size 自动训练），另一半增量写入，模拟 offline.py 多次入库
+    store.upsert(ids[:half], docs[:half], vectors[:half])
+    for i in range(half, args.n, 10_000):
+        store.upsert(ids[i : i + 10_000], docs[i : i + 10_000], vectors[i : i + 10_000])
+    store.similarity_search_by_vector(queries[0], args.k)  # 写入后的首次查询会按簇重排矩阵，不计入测量
+    print(f"ivf build (train + incremental insert): {time.perf_counter() - start:.2f}s")
+
+    print(f"{'nprobe':>12}  recall@{args.k}    QPS")
+    nprobe = 1
+    while nprobe <= args.nlist:
+        r, qps = measure(store, queries, truth, args.k, nprobe=nprobe)
+        print(f"{nprobe:>12}  {r:.4f}  {qps:>9,.0f}  {'#' * int(r * 40)}")
+        nprobe *= 2
@@ -0,0 +1,123 @@
+"""
+切分器一致性检查与吞吐基准
+在合成中文语料上，逐篇校验 FastRecursiveSplitter 与 RecursiveCharacterTextSplitter 的输出完全一致
+（默认分隔符与 CJK_SEPARATORS 两种配置）、流式切分与整篇切分一致，再对比单进程 / 多进程的切分吞吐
+"""
+import argparse
+import logging
+import os
+import random
+import time
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from fast_splitter import CJK_SEPARATORS, FastRecursiveSplitter
+from ingest import BLOCK_CHARS, split_stream
+
+CHARS = "检索增强生成向量数据库大模型上下文切分片段召回精度语义相似度匹配知识来源提示词工程的一是在不了有和人这中大为上个"
+
+
+def make_corpus(docs: int, seed: int = 0):
+    """段落、换行、句末标点、空格混排，另有一部分没有任何分隔符的长段落（触发逐字符切分）"""
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(docs):
+        paragraphs = []
+        for _ in range(rng.randint(5, 40)):
+            if rng.random() < 0.1:
+                paragraphs.append("".join(rng.choices(CHARS, k=rng.randint(600, 2000))))
+                continue
+            sentences = []
+            for _ in range(rng.randint(1, 20)):
+                words = ["".join(rng.choices(CHARS, k=rng.randint(2, 12))) for _ in range(rng.randint(1, 6))]
+                sentences.append(rng.choice(["", " "]).join(words) + rng.choice("。！？，；"))
+            paragraphs.append(rng.choice(["", "\n"]).join(sentences))
+        corpus.append("\n\n".join(paragraphs))
+    return corpus
+
+
+def check(reference, fast, corpus, label):
+    for i, text in enumerate(corpus):
+        expected, actual = reference.split_text(text), fast.split_text(text)
+        if expected != actual:
+            raise AssertionError(f"{label}: 第 {i} 篇文档切分结果不一致")
+    print(f"{label}: {len(corpus)} 篇文档切分结果一致")
+
+
+def blocks_of(text, block_chars):
+    return [text[i : i + block_chars] for i in range(0, len(text), block_chars)]
+
+
+def check_stream(splitter, text, label):
+    """没有段落跨越块边界时，按任意大小分块流式切分（ingest.split_stream）的结果与整篇切分一致"""
+    expected = splitter.split_text(text)
+    for block_chars in range(1, len(text) + 1):
+        if list(split_stream(blocks_of(text, block_chars), splitter)) != expected:
+            raise AssertionError(f"{label}: 按 {block_chars} 字符分块流式切分的结果与整篇切分不一致")
+    print(f"{label}: 按 1~{len(text)} 字符分块流式切分的结果与整篇切分一致")
+
+
+def check_stream_corpus(splitter, corpus, block_chars, label):
+    """
+    语料逐篇流式切分：按 BLOCK_CHARS 读取（每篇一个块）时与整篇切分完全一致；
+    按 block_chars 小块读取时每个片段都是原文的连续子串，且（chunk_overlap=0 时）去掉空白后拼接等于原文，
+    即块边界处没有丢失、重复或拼接文本
+    """
+    identical = 0
+    for i, text in enumerate(corpus):
+        expected = splitter.split_text(text)
+        if list(split_stream(blocks_of(text, BLOCK_CHARS), splitter)) != expected:
+            raise AssertionError(f"{label}: 第 {i} 篇文档流式切分结果与整篇切分不一致")
+        streamed = list(split_stream(blocks_of(text, block_chars), splitter))
+        if any(chunk not in text for chunk in streamed):
+            raise AssertionError(f"{label}: 第 {i} 篇文档按 {block_chars} 字符分块流式切分时出现原文中没有的片段")
+        if splitter._chunk_overlap == 0 and "".join("".join(streamed).split()) != "".join(text.split()):
+            raise AssertionError(f"{label}: 第 {i} 篇文档按 {block_chars} 字符分块流式切分时丢失或重复了文本")
+        identical += streamed == expected
+    print(f"{label}: {len(corpus)} 篇文档流式切分结果一致，"
+          f"按 {block_chars} 字符分块时 {identical} 篇与整篇切分完全相同，其余只在跨块的长段落处边界不同")
+
+
+def timed(label, split, corpus, chars):
+    start = time.perf_counter()
+    chunks = split(corpus)
+    elapsed = time.perf_counter() - start
+    print(f"{label:>28}: {elapsed:.2f}s, {chars / elapsed / 1e6:.2f} M chars/s, {chunks} chunks")
+    return elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=400)
+    parser.add_argument("--processes", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)  # 逐字符切分时 langchain 会对超长片段打印警告
+
+    corpus = make_corpus(args.docs)
+    chars = sum(map(len, corpus))
+    print(f"{args.docs} docs, {chars / 1e6:.1f} M chars")
+
+    reference = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=20)
+    fast = FastRecursiveSplitter(chunk_size=500, chunk_overlap=20)
+    check(reference, fast, corpus, "default separators")
+    check(
+        RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=20, separators=CJK_SEPARATORS, keep_separator="end"),
+        FastRecursiveSplitter(chunk_size=500, chunk_overlap=20, separators=CJK_SEPARATORS, keep_separator="end"),
+        corpus,
+        "CJK separators",
+    )
+    words = "alpha beta gamma delta " * 6
+    check_stream(RecursiveCharacterTextSplitter(chunk_size=40, chunk_overlap=0), words, "stream (langchain)")
+    check_stream(FastRecursiveSplitter(chunk_size=40, chunk_overlap=10), words, "stream (fast)")
+    check_stream_corpus(fast, corpus, 4096, "stream corpus")
+    check_stream_corpus(FastRecursiveSplitter(chunk_size=500, chunk_overlap=0), corpus, 4096, "stream corpus, no overlap")
+
+    base = timed("RecursiveCharacterTextSplitter", lambda c: sum(len(reference.split_text(t)) for t in c), corpus, chars)
+    single = timed("FastRecursiveSplitter", lambda c: sum(len(fast.split_text(t)) for t in c), corpus, chars)
+    multi = timed(
+        f"FastRecursiveSplitter x{args.processes}",
+        lambda c: sum(map(len, fast.split_texts(c, processes=args.processes))),
+        corpus,
+        chars,
+    )
+    print(f"speedup: {base / single:.1f}x single process, {base / multi:.1f}x with {args.processes} processes")
@@ -0,0 +1,132 @@
+"""
+按 token 预算拼装 RAG 上下文
+按检索排名贪心挑选片段，跳过近似重复的片段，装不下的片段跳过（继续尝试更短的）；
+同一来源相邻的片段（chunk_index 连续）合并为一段，并去掉切分时 chunk_overlap 造成的重复文字
+"""
+import math
+import re
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Set
+
+from langchain_core.documents import Document
+
+try:  # 可选依赖：安装了 tiktoken 时精确计数，否则按字符估算
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+_CJK_PATTERN = re.compile(r"[\u3000-\u303f\u4e00-\u9fff\uff00-\uffef]")
+_WORD_PATTERN = re.compile(r"[A-Za-z0-9]+")
+
+
+def estimate_tokens(text: str) -> int:
+    """估算 token 数：中文字符和全角标点各约 1 个，英文/数字约 4 个字符 1 个，其余符号各 1 个"""
+    cjk = len(_CJK_PATTERN.findall(text))
+    words = _WORD_PATTERN.findall(text)
+    word_tokens = sum(math.ceil(len(w) / 4) for w in words)
+    others = len(text) - cjk - sum(len(w) for w in words) - text.count(" ") - text.count("\n")
+    return cjk + word_tokens + max(others, 0)
+
+
+def default_token_counter() -> Callable[[str], int]:
+    if tiktoken is not None:
+        encoding = tiktoken.get_encoding("cl100k_base")
+        return lambda text: len(encoding.encode(text))
+    return estimate_tokens
+
+
+def _shingles(text: str) -> Set[str]:
+    text = "".join(text.split())
+    return {text[i : i + 2] for i in range(max(len(text) - 1, 1))}
+
+
+def overlap_length(previous: str, following: str, max_overlap: int = 50, min_overlap: int = 4) -> int:
+    """following 开头与 previous 结尾重复的字符数（切分器的 chunk_overlap 区域），没有重复返回 0"""
+    for n in range(min(max_overlap, len(previous), len(following)), min_overlap - 1, -1):
+        if previous.endswith(following[:n]):
+            return n
+    return 0
+
+
+@dataclass
+class PackedContext:
+    text: str
+    documents: List[Document]  # 被选中的片段，按检索排名
+    tokens: int  # text 的 token 数
+    budget: int
+    dropped: Dict[str, int] = field(default_factory=dict)  # 各原因被丢弃的片段数：duplicate / budget
+
+
+class ContextPacker:
+    def __init__(
+        self,
+        max_tokens: int = 1500,
+        token_counter: Optional[Callable[[str], int]] = None,
+        duplicate_threshold: float = 0.85,
+        merge_adjacent: bool = True,
+        separator: str = "\n\n",
+        max_overlap: int = 50,
+    ):
+        self.max_tokens = max_tokens
+        self.count = token_counter or default_token_counter()
+        self.duplicate_threshold = duplicate_threshold  # 字符二元组 Jaccard 相似度达到该值视为重复
+        self.merge_adjacent = merge_adjacent
+        self.separator = separator
+        self.max_overlap = max_overlap  # 不小于 offline.py 的 CHUNK_OVERLAP
+        self._separator_tokens = self.count(separator)
+
+    def _is_duplicate(self, shingles: Set[str], selected: List[Set[str]]) -> bool:
+        for other in selected:
+            union = len(shingles | other)
+            if union and len(shingles & other) / union >= self.duplicate_threshold:
+                return True
+        return False
+
+    def pack(self, documents: List[Document]) -> PackedContext:
+        """documents 按相关性从高到低排列"""
+        selected: List[Document] = []
+        selected_shingles: List[Set[str]] = []
+        dropped = {"duplicate": 0, "budget": 0}
+        used = 0
+        for doc in documents:
+            shingles = _shingles(doc.page_content)
+            if self._is_duplicate(shingles, selected_shingles):
+                dropped["duplicate"] += 1
+                continue
+            cost = self.count(doc.page_content) + (self._separator_tokens if selected else 0)
+            if used + cost > self.max_tokens:
+                dropped["budget"] += 1
+                continue
+            used += cost
+            selected.append(doc)
+            selected_shingles.append(shingles)
+
+        passages = self._merge(selected) if self.merge_adjacent else [d.page_content for d in selected]
+        text = self.separator.join(passages)
+        return PackedContext(text, selected, self.count(text) if text else 0, self.max_tokens, dropped)
+
+    def _merge(self, documents: List[Document]) -> List[str]:
+        """同一来源、chunk_index 连续的片段合并为一段；各段按其中最靠前片段的排名排列"""
+        groups = defaultdict(list)
+        for rank, doc in enumerate(documents):
+            source = doc.metadata.get("source")
+            index = doc.metadata.get("chunk_index")
+            groups[source if index is not None else ("rank", rank)].append((index, rank, doc))
+
+        passages = []
+        for members in groups.values():
+            members.sort(key=lambda m: (m[0] is None, m[0]))
+            run_text, run_rank, last_index = None, None, None
+            for index, rank, doc in members:
+                if run_text is not None and index is not None and last_index is not None and index == last_index + 1:
+                    n = overlap_length(run_text, doc.page_content, self.max_overlap)
+                    run_text += doc.page_content[n:] if n else "\n" + doc.page_content
+                    run_rank = min(run_rank, rank)
+                else:
+                    if run_text is not None:
+                        passages.append((run_rank, run_text))
+                    run_text, run_rank = doc.page_content, rank
+                last_index = index
+            passages.append((run_rank, run_text))
+        return [text for _, text in sorted(passages, key=lambda p: p[0])]
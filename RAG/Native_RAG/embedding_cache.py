@@ -0,0 +1,131 @@
+"""
+持久化 embedding 缓存
+按 (模型, 文本哈希) 内容寻址，向量以 float32 字节存入 SQLite；
+可包装任意 LangChain Embeddings，命中时完全跳过网络请求，超出容量时淘汰最久未使用的条目
+"""
+import hashlib
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+_SELECT_BATCH = 500  # 单条 SQL 中 IN (...) 的参数上限
+_RECOUNT_EVERY = 1000  # 每写入这么多批重新统计一次条目数，校正其他进程共用缓存文件造成的偏差
+
+
+class CachedEmbeddings(Embeddings):
+    """带 SQLite 缓存的 Embeddings 包装器，offline.py 和 online.py 共用同一个缓存文件"""
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        path: str,
+        model: str,
+        max_entries: Optional[int] = 1_000_000,
+    ):
+        self.embeddings = embeddings
+        self.model = model  # 参与缓存键，换模型不会命中旧向量
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")  # 允许多个进程同时读
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key BLOB PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)"
+        )
+        self._conn.commit()
+        # 条目数在内存中累加，写入时不必每次 COUNT(*) 全表
+        self._writes = 0
+        self._count = self._count_entries() if max_entries is not None else 0
+
+    def _count_entries(self) -> int:
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        return count
+
+    def _key(self, kind: str, text: str) -> bytes:
+        # 查询和文档分开缓存：部分模型对二者使用不同的指令前缀
+        return hashlib.sha256(f"{self.model}\0{kind}\0{text}".encode("utf-8")).digest()
+
+    def _lookup(self, keys: List[bytes]) -> Dict[bytes, List[float]]:
+        found: Dict[bytes, List[float]] = {}
+        unique = list(dict.fromkeys(keys))
+        for i in range(0, len(unique), _SELECT_BATCH):
+            batch = unique[i : i + _SELECT_BATCH]
+            rows = self._conn.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})",
+                batch,
+            ).fetchall()
+            for key, blob in rows:
+                found[key] = array("f", blob).tolist()
+        if found:
+            now = time.time()
+            self._conn.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                [(now, key) for key in found],
+            )
+        return found
+
+    def _store(self, items: Dict[bytes, List[float]]):
+        now = time.time()
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+            [(key, array("f", vector).tobytes(), now) for key, vector in items.items()],
+        )
+        if self.max_entries is None:
+            return
+        self._writes += 1
+        if self._writes % _RECOUNT_EVERY == 0:
+            self._count = self._count_entries()
+        else:
+            self._count += len(items)  # 写入的都是查找时未命中的键，按新增计
+        if self._count > self.max_entries:
+            deleted = self._conn.execute(
+                "DELETE FROM embeddings WHERE key IN ("
+                " SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+                (self._count - self.max_entries,),
+            ).rowcount
+            self._count -= deleted
+
+    def _embed(self, kind: str, texts: List[str], embed) -> List[List[float]]:
+        keys = [self._key(kind, text) for text in texts]
+        with self._lock:
+            found = self._lookup(keys)
+            self._conn.commit()
+            hit_count = sum(1 for key in keys if key in found)
+            self.hits += hit_count
+            self.misses += len(keys) - hit_count
+        missing = {key: text for key, text in zip(keys, texts) if key not in found}
+        if missing:
+            # 网络请求在锁外进行，并发的 embedding 批次互不阻塞
+            vectors = embed(list(missing.values()))
+            fresh = dict(zip(missing, vectors))
+            with self._lock:
+                self._store(fresh)
+                self._conn.commit()
+            found.update(fresh)
+        return [found[key] for key in keys]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed("doc", texts, self.embeddings.embed_documents)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed("query", [text], lambda t: [self.embeddings.embed_query(t[0])])[0]
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> Dict[str, float]:
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hit_rate}
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,36 @@
+"""
+本地确定性 embedding
+用字符 n-gram 的哈希特征代替远程 embedding 接口，供测试、压测和离线调试使用；
+同一文本总是得到同一向量，字面相近的文本向量也相近
+"""
+import hashlib
+import math
+from typing import List
+
+from langchain_core.embeddings import Embeddings
+
+
+class HashingEmbeddings(Embeddings):
+    """字符 n-gram 哈希 embedding（L2 归一化）"""
+
+    def __init__(self, dimensions: int = 256, ngram: int = 2):
+        self.dimensions = dimensions
+        self.ngram = ngram
+
+    def _embed(self, text: str) -> List[float]:
+        vector = [0.0] * self.dimensions
+        text = text.lower()
+        n = min(self.ngram, len(text)) or 1
+        for i in range(max(len(text) - n + 1, 1)):
+            digest = hashlib.blake2b(text[i : i + n].encode("utf-8"), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            # 低位决定维度，最高位决定符号，降低哈希冲突带来的偏差
+            vector[value % self.dimensions] += -1.0 if value >> 63 else 1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
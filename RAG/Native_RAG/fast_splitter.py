@@ -0,0 +1,155 @@
+"""
+快速递归字符切分
+与 RecursiveCharacterTextSplitter（keep_separator 为 True/"start"/"end"，length_function=len）
+切分结果完全一致，但：
+- 每个分隔符在整段文本中只扫描一次，记录所有出现位置，之后按偏移量二分查找，
+  不再对每一层子串重复 re.search / re.split
+- 递归和合并都只处理 (start, end) 偏移量，只有最终片段才切出子串
+- 按单字符切分（分隔符 ""）的长段落，片段边界直接按步长算出，不再逐字符合并
+CJK_SEPARATORS 在换行之后按中文句末标点（。！？）切分，配合 keep_separator="end" 使标点留在句尾；
+split_texts 可用多进程并行切分多篇文档
+"""
+import re
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Literal, Optional, Sequence, Tuple, Union
+
+from langchain_text_splitters import TextSplitter
+
+DEFAULT_SEPARATORS = ["\n\n", "\n", " ", ""]
+CJK_SEPARATORS = ["\n\n", "\n", "。", "！", "？", " ", ""]
+
+Span = Tuple[int, int]
+
+
+class FastRecursiveSplitter(TextSplitter):
+    def __init__(
+        self,
+        separators: Optional[List[str]] = None,
+        keep_separator: Union[bool, Literal["start", "end"]] = True,
+        **kwargs: Any,
+    ):
+        if not keep_separator:
+            # 丢弃分隔符时片段不再是原文的连续子串，无法只用偏移量表示
+            raise ValueError("FastRecursiveSplitter 仅支持保留分隔符（keep_separator 为 True/start/end）")
+        if kwargs.get("length_function", len) is not len:
+            raise ValueError("FastRecursiveSplitter 仅支持按字符数计算长度")
+        super().__init__(keep_separator=keep_separator, **kwargs)
+        self._separators = separators or DEFAULT_SEPARATORS
+        self._separator_at_end = keep_separator == "end"
+
+    def split_text(self, text: str) -> List[str]:
+        positions: Dict[int, List[int]] = {}
+        chunks: List[str] = []
+        if text:
+            self._split_span(text, 0, len(text), 0, positions, chunks)
+        return chunks
+
+    def split_texts(self, texts: Sequence[str], processes: int = 1) -> List[List[str]]:
+        """批量切分，processes > 1 时按文档分片到多个进程"""
+        if processes <= 1 or len(texts) < 2:
+            return [self.split_text(text) for text in texts]
+        chunksize = max(1, len(texts) // (processes * 4))
+        with ProcessPoolExecutor(processes) as pool:
+            return list(pool.map(self.split_text, texts, chunksize=chunksize))
+
+    def _positions(self, text: str, level: int, positions: Dict[int, List[int]]) -> List[int]:
+        """第 level 个分隔符在整段文本中的全部出现位置（多字符分隔符包含相互重叠的位置）"""
+        found = positions.get(level)
+        if found is None:
+            separator = self._separators[level]
+            if len(separator) == 1:
+                pattern = re.escape(separator)
+            else:
+                pattern = f"(?={re.escape(separator)})"
+            found = positions[level] = [m.start() for m in re.finditer(pattern, text)]
+        return found
+
+    def _occurrences(self, text: str, level: int, start: int, end: int,
+                     positions: Dict[int, List[int]]) -> List[int]:
+        """与对 text[start:end] 执行 re.split 相同的匹配：从左到右、互不重叠"""
+        found = self._positions(text, level, positions)
+        width = len(self._separators[level])
+        lo = bisect_left(found, start)
+        hi = bisect_left(found, end - width + 1, lo)
+        if width == 1:
+            return found[lo:hi]
+        result, next_allowed = [], start
+        for p in found[lo:hi]:
+            if p >= next_allowed:
+                result.append(p)
+                next_allowed = p + width
+        return result
+
+    def _split_span(self, text: str, start: int, end: int, level: int,
+                    positions: Dict[int, List[int]], chunks: List[str]):
+        separators = self._separators
+        occurrences: Optional[List[int]] = None  # None 表示按单字符切分
+        width = 0
+        next_level = None  # None 表示没有更细的分隔符
+        for i in range(level, len(separators)):
+            if not separators[i]:
+                break
+            found = self._occurrences(text, i, start, end, positions)
+            if found:
+                occurrences, width = found, len(separators[i])
+                next_level = i + 1 if i + 1 < len(separators) else None
+                break
+        else:
+            occurrences = []  # 所有分隔符都不存在：整段作为一个片段
+
+        if occurrences is None:
+            if self._chunk_size > 1:
+                self._merge_characters(text, start, end, chunks)
+            else:
+                chunks.extend(text[start:end])
+            return
+
+        shift = width if self._separator_at_end else 0
+        bounds = [start] + [p + shift for p in occurrences] + [end]
+        pieces = [(a, b) for a, b in zip(bounds, bounds[1:]) if a < b]
+
+        good: List[Span] = []
+        for a, b in pieces:
+            if b - a < self._chunk_size:
+                good.append((a, b))
+                continue
+            if good:
+                self._merge(text, good, chunks)
+                good = []
+            if next_level is None:
+                chunks.append(text[a:b])
+            else:
+                self._split_span(text, a, b, next_level, positions, chunks)
+        if good:
+            self._merge(text, good, chunks)
+
+    def _emit(self, text: str, start: int, end: int, chunks: List[str]):
+        chunk = text[start:end]
+        if self._strip_whitespace:
+            chunk = chunk.strip()
+        if chunk:
+            chunks.append(chunk)
+
+    def _merge(self, text: str, pieces: List[Span], chunks: List[str]):
+        """与 TextSplitter._merge_splits 相同（保留分隔符时合并用的分隔符为空串），只计算长度"""
+        chunk_size, chunk_overlap = self._chunk_size, self._chunk_overlap
+        head, total = 0, 0
+        for i, (a, b) in enumerate(pieces):
+            length = b - a
+            if total + length > chunk_size and i > head:
+                self._emit(text, pieces[head][0], pieces[i - 1][1], chunks)
+                while total > chunk_overlap or (total + length > chunk_size and total > 0):
+                    total -= pieces[head][1] - pieces[head][0]
+                    head += 1
+            total += length
+        if head < len(pieces):
+            self._emit(text, pieces[head][0], pieces[-1][1], chunks)
+
+    def _merge_characters(self, text: str, start: int, end: int, chunks: List[str]):
+        """单字符片段的合并：每段 chunk_size 个字符，相邻两段重叠 min(chunk_overlap, chunk_size - 1) 个"""
+        step = self._chunk_size - min(self._chunk_overlap, self._chunk_size - 1)
+        while start + self._chunk_size < end:
+            self._emit(text, start, start + self._chunk_size, chunks)
+            start += step
+        self._emit(text, start, end, chunks)
@@ -0,0 +1,109 @@
+"""
+混合检索：BM25 关键词检索 + 向量检索
+两路并发执行，按片段 ID 去重后融合排序（rrf 倒数排名融合 / weighted 归一化分数加权）；
+型号、编号、专有名词靠关键词召回，同义改写靠向量召回。
+分词、BM25 与融合规则在 common.retrieval 中，与 Agentic_RAG 的 query_knowledge_base 共用
+"""
+import asyncio
+import os
+import sys
+from typing import Any, Callable, Dict, Hashable, List, Sequence, Tuple
+
+from langchain_core.documents import Document
+
+# 仓库根目录，导入共用的 common 包
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from common.retrieval import FUSIONS, BM25Scorer, InvertedIndex
+
+
+def document_key(doc: Document) -> Hashable:
+    """去重用的片段 ID：优先 Document.id（ingest.chunk_id 写入的 ID），其次来源 + 序号"""
+    if doc.id:
+        return doc.id
+    if "chunk_index" in doc.metadata:
+        return (doc.metadata.get("source"), doc.metadata["chunk_index"])
+    return doc.page_content
+
+
+def load_documents(vectorstore) -> List[Document]:
+    """取出向量库中的全部片段，用于构建关键词索引"""
+    if hasattr(vectorstore, "documents"):  # NumpyVectorStore / IVFVectorStore
+        return vectorstore.documents()
+    if hasattr(vectorstore, "store"):  # langchain_core InMemoryVectorStore
+        return [
+            Document(id=cid, page_content=item["text"], metadata=item["metadata"])
+            for cid, item in vectorstore.store.items()
+        ]
+    data = vectorstore.get(include=["documents", "metadatas"])  # Chroma
+    return [
+        Document(id=cid, page_content=text, metadata=metadata or {})
+        for cid, text, metadata in zip(data["ids"], data["documents"], data["metadatas"])
+    ]
+
+
+def build_lexical(documents: List[Document]) -> Tuple[BM25Scorer, Dict[Hashable, Document]]:
+    """片段的 BM25 索引，以及 ID -> 片段（融合结果中只有关键词一路召回的片段从这里取）"""
+    index = InvertedIndex()
+    by_key = {}
+    for doc in documents:
+        key = document_key(doc)
+        by_key[key] = doc
+        index.add(key, doc.page_content)
+    return BM25Scorer(index), by_key
+
+
+class HybridRetriever:
+    """
+    RAGService 的检索后端：向量检索与 BM25 并发执行后融合
+    index_version 与 RAGService 的相同（如入库清单的修改时间），变化时从向量库重建关键词索引，
+    避免重新入库后仍返回已删除或过期的片段
+    """
+
+    def __init__(self, vectorstore, documents: List[Document], method: str = "rrf",
+                 weights: Sequence[float] = (1.0, 1.0), candidates: int = 20,
+                 index_version: Callable[[], Any] = lambda: None):
+        self.vectorstore = vectorstore
+        self.fuse = FUSIONS[method]
+        self.weights = weights  # (关键词, 向量)
+        self.candidates = candidates  # 每一路取回的候选数，融合后再截断为 k
+        self.index_version = index_version
+        self._version = index_version()
+        self._lexical = build_lexical(documents)  # (打分器, 片段)，重建时整体替换
+        self._reload_lock = asyncio.Lock()
+
+    @classmethod
+    def from_vectorstore(cls, vectorstore, **kwargs) -> "HybridRetriever":
+        return cls(vectorstore, load_documents(vectorstore), **kwargs)
+
+    async def _check_version(self):
+        if self.index_version() == self._version:
+            return
+        async with self._reload_lock:
+            version = self.index_version()
+            if version != self._version:  # 等锁期间可能已由其他请求重建
+                self._lexical = await asyncio.to_thread(
+                    lambda: build_lexical(load_documents(self.vectorstore))
+                )
+                self._version = version
+
+    async def _dense(self, vector: List[float], n: int) -> List[Tuple[float, Document]]:
+        search = getattr(self.vectorstore, "similarity_search_with_score_by_vector", None)
+        if search is not None:
+            pairs = await asyncio.to_thread(search, vector, n)
+            return [(score, doc) for doc, score in pairs]
+        # 不提供分数的向量库按名次给分，rrf 只看名次，不受影响
+        docs = await self.vectorstore.asimilarity_search_by_vector(vector, k=n)
+        return [(1.0 / rank, doc) for rank, doc in enumerate(docs, 1)]
+
+    async def asearch(self, query: str, vector: List[float], k: int) -> List[Document]:
+        await self._check_version()
+        scorer, lexical_documents = self._lexical
+        n = max(k, self.candidates)
+        dense, lexical = await asyncio.gather(
+            self._dense(vector, n), asyncio.to_thread(scorer.top_k, query, n)
+        )
+        documents = {document_key(doc): doc for _, doc in dense}
+        dense_ranking = [(score, document_key(doc)) for score, doc in dense]
+        fused = self.fuse([lexical, dense_ranking], self.weights)[:k]
+        return [documents.get(key) or lexical_documents[key] for _, key in fused]
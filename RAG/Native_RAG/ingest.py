@@ -0,0 +1,181 @@
+"""
+流式入库流水线
+    文件遍历 -> 分块读取 -> 增量切分 -> 批量 embedding（并发） -> 批量写入向量库
+每个阶段都是生成器，同一时刻内存中只有一个读取块和 concurrency 个待写入批次，
+与语料总大小无关
+"""
+import copy
+import glob
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from itertools import islice
+from typing import Iterable, Iterator, List, Sequence, Tuple
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+BLOCK_CHARS = 1 << 20  # 每次从文件读取的字符数
+
+
+@dataclass
+class IngestStats:
+    """一次入库的统计"""
+
+    files: int = 0
+    chunks: int = 0  # 本次 embedding 并写入的片段
+    batches: int = 0
+    reused: int = 0  # 增量入库时内容未变、跳过 embedding 的片段
+    deleted: int = 0  # 增量入库时从向量库删除的片段
+
+
+def iter_files(paths: Sequence[str], pattern: str = "**/*.txt") -> Iterator[str]:
+    """展开文件和目录，目录按 pattern 递归匹配"""
+    for path in paths:
+        if os.path.isdir(path):
+            yield from sorted(glob.glob(os.path.join(path, pattern), recursive=True))
+        else:
+            yield path
+
+
+def read_blocks(path: str, block_chars: int = BLOCK_CHARS, encoding: str = "utf-8") -> Iterator[str]:
+    """按块读取文本文件，避免一次性载入大文件"""
+    with open(path, encoding=encoding) as f:
+        while True:
+            block = f.read(block_chars)
+            if not block:
+                return
+            yield block
+
+
+def split_stream(blocks: Iterable[str], splitter) -> Iterator[str]:
+    """
+    增量切分：每个块切分后保留最后一个片段，与下一块拼接后再切分，
+    从而不会在块边界处硬切断文本
+    保留的是最后一个片段在原文中的原样内容（不去掉首尾空白），否则块边界落在空白上时
+    前后两个词会被直接拼在一起；只有输出的片段才按 splitter 的设置去掉首尾空白
+    超过 chunk_size 的段落跨越块边界时，该处的片段边界可能与整篇切分不同，但不会丢失或拼接文本
+    """
+    raw = copy.copy(splitter)
+    raw._strip_whitespace = False
+    strip = splitter._strip_whitespace
+    carry = ""
+    for block in blocks:
+        text = carry + block
+        pieces = raw.split_text(text)
+        if not pieces:
+            carry = text
+            continue
+        last = pieces.pop()
+        carry = text[text.rfind(last):]  # 最后一个片段延伸到 text 末尾，rfind 即其起点
+        for piece in pieces:
+            piece = piece.strip() if strip else piece
+            if piece:
+                yield piece
+    carry = carry.strip() if strip else carry
+    if carry:
+        yield carry
+
+
+def _split_file(path: str, splitter, block_chars: int) -> List[str]:
+    return list(split_stream(read_blocks(path, block_chars), splitter))
+
+
+def split_files(
+    paths: Iterable[str], splitter, processes: int = 1, block_chars: int = BLOCK_CHARS
+) -> Iterator[Tuple[str, Iterable[str]]]:
+    """
+    按文件顺序产出 (path, 片段)；processes > 1 时各文件在子进程中并行切分，
+    最多提前切分 2 * processes 个文件，内存占用仍与语料总大小无关
+    """
+    if processes <= 1:
+        for path in paths:
+            yield path, split_stream(read_blocks(path, block_chars), splitter)
+        return
+    with ProcessPoolExecutor(processes) as pool:
+        pending = deque()
+        for path in paths:
+            pending.append((path, pool.submit(_split_file, path, splitter, block_chars)))
+            if len(pending) >= 2 * processes:
+                done, future = pending.popleft()
+                yield done, future.result()
+        while pending:
+            done, future = pending.popleft()
+            yield done, future.result()
+
+
+def iter_chunks(
+    paths: Sequence[str], splitter, stats: IngestStats = None, block_chars: int = BLOCK_CHARS,
+    processes: int = 1,
+) -> Iterator[Document]:
+    """遍历所有文件的切分片段，metadata 记录来源文件和片段序号"""
+    for path, texts in split_files(iter_files(paths), splitter, processes, block_chars):
+        if stats:
+            stats.files += 1
+        for index, text in enumerate(texts):
+            yield Document(page_content=text, metadata={"source": path, "chunk_index": index})
+
+
+def batched(iterable: Iterable, size: int) -> Iterator[List]:
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def chunk_id(doc: Document) -> str:
+    """确定性的片段 ID，重复入库时覆盖而不是追加；doc.id 已设置时优先使用"""
+    return doc.id or f"{doc.metadata['source']}:{doc.metadata['chunk_index']}"
+
+
+class ChromaSink:
+    """把预先计算好的向量批量 upsert 进 langchain_chroma.Chroma"""
+
+    def __init__(self, vector_store):
+        self.collection = vector_store._collection
+
+    def upsert(self, ids: List[str], docs: List[Document], vectors: List[List[float]]):
+        self.collection.upsert(
+            ids=ids,
+            embeddings=vectors,
+            documents=[d.page_content for d in docs],
+            metadatas=[d.metadata for d in docs],
+        )
+
+    def update_metadata(self, ids: List[str], metadatas: List[dict]):
+        self.collection.update(ids=ids, metadatas=metadatas)
+
+    def delete(self, ids: List[str]):
+        self.collection.delete(ids=ids)
+
+
+def ingest(
+    chunks: Iterable[Document],
+    embeddings: Embeddings,
+    sink,
+    batch_size: int = 64,
+    concurrency: int = 4,
+    stats: IngestStats = None,
+) -> IngestStats:
+    """
+    批量 embedding 并写入 sink
+    最多 concurrency 个批次同时请求 embedding，写入在当前线程按顺序进行
+    """
+    stats = stats or IngestStats()
+    pending = deque()
+
+    def flush_oldest():
+        docs, future = pending.popleft()
+        sink.upsert([chunk_id(d) for d in docs], docs, future.result())
+        stats.chunks += len(docs)
+        stats.batches += 1
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for docs in batched(chunks, batch_size):
+            texts = [d.page_content for d in docs]
+            pending.append((docs, pool.submit(embeddings.embed_documents, texts)))
+            if len(pending) >= concurrency:
+                flush_oldest()
+        while pending:
+            flush_oldest()
+    return stats
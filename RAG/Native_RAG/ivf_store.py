@@ -0,0 +1,169 @@
+"""
+IVF 近似向量检索
+用球面 k-means 把向量划分为 nlist 个簇（倒排表），查询时只在与问题最相近的 nprobe 个簇内做精确检索；
+nprobe 越大召回率越高、速度越慢，nprobe == nlist 时等价于暴力检索。
+向量和文档的存储沿用 NumpyVectorStore，训练前（片段数不足 train_size）自动退化为精确检索
+"""
+import os
+from typing import Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from numpy_store import NumpyVectorStore, _normalize, top_k_indices
+
+
+def kmeans(vectors: np.ndarray, nlist: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """球面 k-means（向量已归一化，按内积分配），返回归一化后的质心 (nlist, dim)"""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assign = np.argmax(vectors @ centroids.T, axis=1)
+        counts = np.bincount(assign, minlength=nlist)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        nonempty = np.flatnonzero(counts)
+        sums = np.zeros_like(centroids)
+        sums[nonempty] = np.add.reduceat(vectors[np.argsort(assign, kind="stable")], starts[nonempty])
+        empty = np.flatnonzero(counts == 0)
+        sums[empty] = vectors[rng.choice(len(vectors), len(empty), replace=False)]  # 空簇重新随机取点
+        centroids = _normalize(sums)
+    return centroids
+
+
+class IVFVectorStore(NumpyVectorStore):
+    """NumpyVectorStore 加上 IVF 倒排表，检索接口不变"""
+
+    def __init__(self, embedding: Embeddings, nlist: int = 256, nprobe: int = 8,
+                 train_size: Optional[int] = None):
+        super().__init__(embedding)
+        self.nlist = nlist
+        self.nprobe = nprobe  # 每次查询搜索的簇数
+        self.train_size = train_size or 39 * nlist  # 片段数达到该值时自动训练
+        self.centroids: Optional[np.ndarray] = None
+        self._assign = np.empty(0, dtype=np.int32)  # 行号 -> 簇号
+        self._bounds: Optional[np.ndarray] = None  # 第 c 个簇为 bounds[c]:bounds[c + 1] 行
+
+    @property
+    def trained(self) -> bool:
+        return self.centroids is not None
+
+    def _assign_rows(self, rows, vectors: np.ndarray):
+        for start in range(0, len(rows), 65536):  # 分块，避免 (n, nlist) 的打分矩阵过大
+            block = vectors[start : start + 65536]
+            self._assign[rows[start : start + 65536]] = np.argmax(block @ self.centroids.T, axis=1)
+        self._bounds = None
+
+    def train(self, nlist: Optional[int] = None, iterations: int = 10, seed: int = 0):
+        """在当前向量（至多抽样 64 * nlist 个）上训练质心并重建倒排表；语料规模大幅增长后可再次调用"""
+        n = len(self)
+        self.nlist = min(nlist or self.nlist, n)
+        rng = np.random.default_rng(seed)
+        sample = self.matrix
+        if n > 64 * self.nlist:
+            sample = sample[np.sort(rng.choice(n, 64 * self.nlist, replace=False))]
+        self.centroids = kmeans(np.ascontiguousarray(sample), self.nlist, iterations, seed)
+        self._assign = np.empty(max(n, 1024), dtype=np.int32)
+        self._assign_rows(np.arange(n), self.matrix)
+
+    # ---- 写入 ----
+
+    def upsert(self, ids: Sequence[str], docs: Sequence[Document], vectors):
+        super().upsert(ids, docs, vectors)
+        if not self.trained:
+            if len(self) >= self.train_size:
+                self.train()
+            return
+        if len(self._assign) < len(self):
+            assign = np.empty(max(len(self), 2 * len(self._assign)), dtype=np.int32)
+            assign[: len(self._assign)] = self._assign
+            self._assign = assign
+        rows = np.array([self._positions[cid] for cid in ids], dtype=np.int64)
+        self._assign_rows(rows, self.matrix[rows])
+
+    def _move_row(self, src: int, dst: int):
+        super()._move_row(src, dst)
+        if self.trained:
+            self._assign[dst] = self._assign[src]
+            self._bounds = None
+
+    def _inverted_lists(self) -> np.ndarray:
+        """
+        写入后首次查询时把各行按簇号重新排列，使每个倒排表都是矩阵中连续的一段，
+        查询时直接在切片上做矩阵乘法，无需按行号收集向量；save() 保存的就是排好序的矩阵
+        """
+        if self._bounds is None:
+            n = len(self)
+            assign = self._assign[:n]
+            if np.any(assign[1:] < assign[:-1]):
+                order = np.argsort(assign, kind="stable")
+                if not self._vectors.flags.writeable:
+                    self._reserve(0, self._vectors.shape[1])
+                self._vectors[:n] = self._vectors[order]
+                self._assign[:n] = assign[order]
+                self._ids = [self._ids[i] for i in order]
+                self._texts = [self._texts[i] for i in order]
+                self._metadatas = [self._metadatas[i] for i in order]
+                self._positions = {cid: row for row, cid in enumerate(self._ids)}
+            self._bounds = np.searchsorted(self._assign[:n], np.arange(self.nlist + 1))
+        return self._bounds
+
+    # ---- 检索 ----
+
+    def similarity_search_with_score_by_vectors(
+        self, embeddings: Sequence[Sequence[float]], k: int = 4, nprobe: Optional[int] = None
+    ) -> List[List[Tuple[Document, float]]]:
+        if not self.trained or not self._ids:
+            return super().similarity_search_with_score_by_vectors(embeddings, k)
+        queries = _normalize(embeddings)
+        bounds = self._inverted_lists()
+        nprobe = max(1, min(self.nprobe if nprobe is None else nprobe, self.nlist))  # 至少搜索一个簇
+        probes = top_k_indices(queries @ self.centroids.T, nprobe)
+        matrix = self.matrix
+        results = []
+        for query, clusters in zip(queries, probes):
+            clusters = np.sort(clusters)
+            candidates = np.concatenate([np.arange(bounds[c], bounds[c + 1]) for c in clusters])
+            scores = np.concatenate([matrix[bounds[c] : bounds[c + 1]] @ query for c in clusters])
+            best = top_k_indices(scores, k)
+            results.append([(self._document(int(candidates[i])), float(scores[i])) for i in best])
+        return results
+
+    def similarity_search_with_score_by_vector(
+        self, embedding: List[float], k: int = 4, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vectors([embedding], k, kwargs.get("nprobe"))[0]
+
+    def similarity_search_by_vector(
+        self, embedding: List[float], k: int = 4, **kwargs: Any
+    ) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k, **kwargs)]
+
+    def similarity_search_with_score(
+        self, query: str, k: int = 4, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(self.embedding.embed_query(query), k, **kwargs)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return self.similarity_search_by_vector(self.embedding.embed_query(query), k, **kwargs)
+
+    # ---- 持久化 ----
+
+    def save(self, path: str):
+        """在 NumpyVectorStore 的文件之外保存 centroids.npy 和 assign.npy"""
+        if self.trained:
+            self._inverted_lists()  # 先按簇排好序，加载后无需再重排（可直接只读内存映射）
+        super().save(path)
+        if self.trained:
+            np.save(os.path.join(path, "centroids.npy"), self.centroids)
+            np.save(os.path.join(path, "assign.npy"), self._assign[: len(self)])
+
+    @classmethod
+    def load(cls, path: str, embedding: Embeddings, mmap: bool = True, **kwargs: Any) -> "IVFVectorStore":
+        store = super().load(path, embedding, mmap, **kwargs)
+        centroids_path = os.path.join(path, "centroids.npy")
+        if os.path.exists(centroids_path):
+            store.centroids = np.load(centroids_path)
+            store.nlist = len(store.centroids)
+            store._assign = np.load(os.path.join(path, "assign.npy"))
+        return store
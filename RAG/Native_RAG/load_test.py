@@ -0,0 +1,141 @@
+"""
+RAGService 压测
+使用本地替身（HashingEmbeddings + InMemoryVectorStore + LocalChatModel），不访问任何外部接口；
+--http 时经由 HTTP 服务发起请求，每个并发 worker 保持一条 keep-alive 连接；
+--hybrid 时先校验向量库版本变化后关键词索引会重建，--http 时先校验格式错误的请求返回 400
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from langchain_core.vectorstores import InMemoryVectorStore
+
+from context_packer import ContextPacker
+from embeddings import HashingEmbeddings
+from hybrid import HybridRetriever
+from local_llm import LocalChatModel
+from semantic_cache import SemanticCache
+from service import RAGService, serve
+
+QUESTIONS = ["什么是RAG？", "RAG 的本质是什么？", "如何增强 System Prompt 的上下文？", "向量检索的作用"]
+
+
+def build_local_service(docs: int, llm_latency: float, concurrency: int,
+                        semantic_cache: bool, hybrid: str = None, context_tokens: int = 0) -> RAGService:
+    embeddings = HashingEmbeddings()
+    vectorstore = InMemoryVectorStore(embeddings)
+    texts = [open("./knowledge.txt", encoding="utf-8").read()]
+    texts += [f"第 {i} 篇文档：{random.choice(QUESTIONS)} 相关的说明。" for i in range(docs)]
+    vectorstore.add_texts(texts, metadatas=[{"doc": i} for i in range(len(texts))])
+    return RAGService(
+        embeddings,
+        vectorstore,
+        LocalChatModel(latency=llm_latency),
+        max_concurrency=concurrency,
+        cache=SemanticCache() if semantic_cache else None,
+        retriever=HybridRetriever.from_vectorstore(vectorstore, method=hybrid) if hybrid else None,
+        k=8 if context_tokens else 3,
+        packer=ContextPacker(max_tokens=context_tokens) if context_tokens else None,
+    )
+
+
+async def check_lexical_reload(method: str):
+    """版本变化前新入库的片段只有向量一路可见，变化后关键词一路也应召回"""
+    embeddings = HashingEmbeddings()
+    vectorstore = InMemoryVectorStore(embeddings)
+    vectorstore.add_texts(["第一篇文档"], ids=["a"])
+    version = [1]
+    retriever = HybridRetriever.from_vectorstore(
+        vectorstore, method=method, candidates=1, index_version=lambda: version[0]
+    )
+    vectorstore.add_texts(["型号 XK-2048 的说明"], ids=["b"])
+    query = "XK-2048"
+    vector = embeddings.embed_query(query)
+    version[0] = 2
+    docs = await retriever.asearch(query, vector, k=2)
+    assert "b" in retriever._lexical[1], "版本变化后关键词索引未重建"
+    assert any(doc.id == "b" for doc in docs), docs
+
+
+async def check_bad_requests(host: str, port: int):
+    """请求行或 Content-Length 无法解析时应返回 400 并关闭连接，服务继续可用"""
+    for raw in (b"GARBAGE\r\n\r\n", b"POST /query HTTP/1.1\r\nContent-Length: abc\r\n\r\n"):
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write(raw)
+        await writer.drain()
+        status_line = await reader.readline()
+        assert status_line.startswith(b"HTTP/1.1 400"), status_line
+        await asyncio.wait_for(reader.read(), 5)  # 服务端回复后关闭连接
+        writer.close()
+
+
+async def http_worker(host: str, port: int, queries, latencies):
+    reader, writer = await asyncio.open_connection(host, port)
+    for query in queries:
+        body = json.dumps({"query": query}, ensure_ascii=False).encode("utf-8")
+        start = time.perf_counter()
+        writer.write(
+            f"POST /query HTTP/1.1\r\nHost: {host}\r\nContent-Length: {len(body)}\r\n\r\n".encode()
+            + body
+        )
+        await writer.drain()
+        await reader.readline()
+        length = 0
+        while (line := await reader.readline()) != b"\r\n":
+            if line.lower().startswith(b"content-length:"):
+                length = int(line.split(b":")[1])
+        await reader.readexactly(length)
+        latencies.append(time.perf_counter() - start)
+    writer.close()
+
+
+async def run(args):
+    if args.hybrid:
+        await check_lexical_reload(args.hybrid)
+    service = build_local_service(
+        args.docs, args.llm_latency, args.concurrency, args.semantic_cache, args.hybrid,
+        args.context_tokens,
+    )
+    queries = [random.choice(QUESTIONS) for _ in range(args.requests)]
+    latencies = []
+    start = time.perf_counter()
+    if args.http:
+        server = asyncio.create_task(serve(service, "127.0.0.1", args.port))
+        await asyncio.sleep(0.2)
+        await check_bad_requests("127.0.0.1", args.port)
+        shards = [queries[i :: args.concurrency] for i in range(args.concurrency)]
+        await asyncio.gather(*(http_worker("127.0.0.1", args.port, s, latencies) for s in shards))
+        server.cancel()
+    else:
+        results = await service.answer_many(queries)
+        latencies = [r["timings_ms"]["total"] / 1000 for r in results]
+        packed = [r["context_tokens"] for r in results if r.get("context_tokens") is not None]
+        if packed:
+            print(f"context tokens: mean {sum(packed) / len(packed):.0f}, max {max(packed)}")
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    print(f"{args.requests} requests, concurrency {args.concurrency}, {elapsed:.2f}s")
+    print(f"throughput: {args.requests / elapsed:.1f} req/s")
+    print(f"client latency p50 {latencies[len(latencies) // 2] * 1000:.1f} ms, "
+          f"p95 {latencies[int(len(latencies) * 0.95)] * 1000:.1f} ms")
+    for stage, summary in service.stats.summary().items():
+        print(f"  {stage:>9}: mean {summary['mean_ms']:.2f} ms, p95 {summary['p95_ms']:.2f} ms")
+    if service.cache is not None:
+        print(f"semantic cache: {service.cache.stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--docs", type=int, default=1000, help="额外生成的文档数")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="模拟 LLM 延迟（秒）")
+    parser.add_argument("--http", action="store_true")
+    parser.add_argument("--semantic-cache", action="store_true", help="启用语义答案缓存")
+    parser.add_argument("--hybrid", choices=["rrf", "weighted"], help="启用混合检索及其融合方式")
+    parser.add_argument("--context-tokens", type=int, default=0, help="上下文 token 预算，0 表示不启用 packer")
+    parser.add_argument("--port", type=int, default=8765)
+    asyncio.run(run(parser.parse_args()))
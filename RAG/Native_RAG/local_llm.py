@@ -0,0 +1,38 @@
+"""
+本地聊天模型替身
+不请求任何接口，按设定的延迟返回固定格式的回答，供压测和离线调试使用
+"""
+import asyncio
+import time
+from typing import Any, List, Optional
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+
+class LocalChatModel(BaseChatModel):
+    """模拟 LLM：延迟 latency 秒后回答，回答中包含提示词长度便于核对上下文"""
+
+    latency: float = 0.05
+
+    @property
+    def _llm_type(self) -> str:
+        return "local-chat-model"
+
+    def _reply(self, messages: List[BaseMessage]) -> ChatResult:
+        prompt_chars = sum(len(str(m.content)) for m in messages)
+        message = AIMessage(content=f"[local] 已根据 {prompt_chars} 字的提示生成回答")
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(
+        self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any
+    ) -> ChatResult:
+        time.sleep(self.latency)
+        return self._reply(messages)
+
+    async def _agenerate(
+        self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any
+    ) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return self._reply(messages)
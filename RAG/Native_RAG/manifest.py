@@ -0,0 +1,159 @@
+"""
+增量入库清单
+记录每个文件的内容哈希和它产生的片段 ID（片段 ID 由来源 + 片段内容哈希得到），
+再次入库时：文件未变则整体复用；文件有变化则只 embedding 新出现的片段；
+消失的片段从向量库删除
+"""
+import hashlib
+import json
+import os
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.documents import Document
+
+from ingest import IngestStats, ingest, iter_files, split_files
+
+MANIFEST_VERSION = 1
+
+
+def file_hash(path: str) -> str:
+    """流式计算文件内容的 sha256"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(1 << 20):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def content_id(source: str, text: str) -> str:
+    """片段 ID：同一文件中内容不变的片段，无论位置是否移动，ID 都不变"""
+    return hashlib.sha256(f"{source}\0{text}".encode("utf-8")).hexdigest()[:32]
+
+
+class Manifest:
+    """
+    {"version": 1, "fingerprint": ..., "files": {path: {"sha256": ..., "chunks": [id, ...]}}}
+    fingerprint 描述切分参数和 embedding 模型，变化时旧清单整体作废
+    """
+
+    def __init__(self, path: str, fingerprint: str):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.files: Dict[str, Dict] = {}
+        self.stale_ids: List[str] = []  # 作废清单中的片段，仍需从向量库删除
+        if not os.path.exists(path):
+            return
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") == MANIFEST_VERSION and data.get("fingerprint") == fingerprint:
+            self.files = data["files"]
+        else:
+            self.stale_ids = [cid for entry in data["files"].values() for cid in entry["chunks"]]
+
+    def save(self, files: Dict[str, Dict]):
+        """原子写入新清单"""
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"version": MANIFEST_VERSION, "fingerprint": self.fingerprint, "files": files},
+                f,
+                ensure_ascii=False,
+            )
+        os.replace(tmp_path, self.path)
+        self.files = files
+
+
+class IncrementalPlan:
+    """对比清单，产出需要 embedding 的片段，并收集复用、删除和元信息更新"""
+
+    def __init__(self, manifest: Manifest, splitter, stats: IngestStats, processes: int = 1):
+        self.manifest = manifest
+        self.splitter = splitter
+        self.stats = stats
+        self.processes = processes  # 并行切分的进程数
+        self._changed: Dict[str, Tuple[str, Optional[Dict]]] = {}  # 待切分文件 -> (哈希, 旧清单条目)
+        self.files: Dict[str, Dict] = {}  # 本次入库后的新清单
+        self.moved: Dict[str, Dict] = {}  # 复用但位置变化的片段 ID -> 新 metadata
+
+    def changed_files(self, paths: Sequence[str]) -> Iterator[str]:
+        """遍历文件，内容未变化的文件直接沿用旧清单，只产出需要重新切分的文件"""
+        for path in iter_files(paths):
+            self.stats.files += 1
+            digest = file_hash(path)
+            old = self.manifest.files.get(path)
+            if old and old["sha256"] == digest:
+                self.files[path] = old
+                self.stats.reused += len(old["chunks"])
+                continue
+            self._changed[path] = (digest, old)
+            yield path
+
+    def new_chunks(self, paths: Sequence[str]) -> Iterator[Document]:
+        """只产出清单中不存在的片段"""
+        for path, texts in split_files(self.changed_files(paths), self.splitter, self.processes):
+            digest, old = self._changed.pop(path)
+            old_positions = {cid: i for i, cid in enumerate(old["chunks"])} if old else {}
+            ids, seen = [], {}
+            for index, text in enumerate(texts):
+                cid = content_id(path, text)
+                # 同一文件内重复的片段追加序号，保证 ID 唯一
+                seen[cid] = seen.get(cid, 0) + 1
+                if seen[cid] > 1:
+                    cid = f"{cid}-{seen[cid]}"
+                ids.append(cid)
+                metadata = {"source": path, "chunk_index": index}
+                if cid in old_positions:
+                    self.stats.reused += 1
+                    if old_positions[cid] != index:
+                        self.moved[cid] = metadata
+                    continue
+                yield Document(id=cid, page_content=text, metadata=metadata)
+            self.files[path] = {"sha256": digest, "chunks": ids}
+
+    def keep_unvisited(self, paths: Sequence[str]):
+        """
+        旧清单中本次没有遍历到的文件沿用旧条目：不在 paths 范围内的文件（只入库了部分目录），
+        以及仍然存在的文件（如不匹配 pattern）；只有在范围内且已被删除的文件，其片段才会被删除
+        """
+        roots = [os.path.abspath(p) for p in paths]
+        for path, entry in self.manifest.files.items():
+            if path in self.files:
+                continue
+            absolute = os.path.abspath(path)
+            in_scope = any(absolute == root or absolute.startswith(os.path.join(root, "")) for root in roots)
+            if not in_scope or os.path.exists(path):
+                self.files[path] = entry
+
+    def deleted_ids(self) -> List[str]:
+        """旧清单中有、新清单中没有的片段"""
+        current = {cid for entry in self.files.values() for cid in entry["chunks"]}
+        old = [cid for entry in self.manifest.files.values() for cid in entry["chunks"]]
+        return [cid for cid in old + self.manifest.stale_ids if cid not in current]
+
+
+def incremental_ingest(
+    paths: Sequence[str],
+    splitter,
+    embeddings,
+    sink,
+    manifest: Manifest,
+    batch_size: int = 64,
+    concurrency: int = 4,
+    processes: int = 1,
+) -> IngestStats:
+    """
+    增量入库：embedding 新片段、更新移动片段的 metadata、删除消失的片段，最后写入清单
+    paths 范围之外的文件保持不变，可以分多次按目录入库
+    """
+    stats = IngestStats()
+    plan = IncrementalPlan(manifest, splitter, stats, processes)
+    ingest(plan.new_chunks(paths), embeddings, sink, batch_size, concurrency, stats)
+    plan.keep_unvisited(paths)
+    if plan.moved:
+        sink.update_metadata(list(plan.moved), list(plan.moved.values()))
+    deleted = plan.deleted_ids()
+    if deleted:
+        sink.delete(deleted)
+    stats.deleted = len(deleted)
+    manifest.save(plan.files)
+    return stats
@@ -1,32 +1,85 @@
-from langchain_community.document_loaders import TextLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+import argparse
+
 from langchain_openai import OpenAIEmbeddings
 from langchain_chroma import Chroma
 
-# load document
-loader = TextLoader("./knowledge.txt")
-documents = loader.load()
-
-# split documents into chunks
-text_splitter = RecursiveCharacterTextSplitter(
-    chunk_size = 500,
-    chunk_overlap = 20,
-)
-splits = text_splitter.split_documents(documents)
+from embedding_cache import CachedEmbeddings
+from embeddings import HashingEmbeddings
+from fast_splitter import CJK_SEPARATORS, FastRecursiveSplitter
+from ingest import ChromaSink
+from ivf_store import IVFVectorStore
+from manifest import Manifest, incremental_ingest
+from numpy_store import NumpyVectorStore
 
-# embed chunks
-embeddings = OpenAIEmbeddings(
-    base_url="https://api.siliconflow.cn/v1",
-    model="Qwen/Qwen3-Embedding-0.6B",
-)
+CHUNK_SIZE = 500
+CHUNK_OVERLAP = 20
+EMBEDDING_MODEL = "Qwen/Qwen3-Embedding-0.6B"
+EMBEDDING_CACHE = "./embedding_cache.sqlite"  # 与 online.py 共用
+STORE_PATHS = {"chroma": "./vector_store", "numpy": "./vector_store_np", "ivf": "./vector_store_ivf"}
+LOCAL_STORES = {"numpy": NumpyVectorStore, "ivf": IVFVectorStore}
 
-# store chunks
-vector_store = Chroma.from_documents(
-    documents=splits,
-    embedding=embeddings,
-    persist_directory="./vector_store",
-)
-print("successfully stored chunks")
+# 以 __main__ 方式运行，--processes 启动子进程时不会重复执行入库
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="流式切分、embedding 并写入向量库")
+    parser.add_argument("paths", nargs="*", default=["./knowledge.txt"], help="文件或目录")
+    parser.add_argument("--batch-size", type=int, default=64, help="每次 embedding 请求的片段数")
+    parser.add_argument("--concurrency", type=int, default=4, help="并发 embedding 请求数")
+    parser.add_argument("--processes", type=int, default=1, help="并行切分文件的进程数")
+    parser.add_argument("--cjk", action="store_true", help="额外按中文句末标点切分（片段边界会变化，需重新 embedding）")
+    parser.add_argument("--store", choices=STORE_PATHS, default="chroma", help="向量库后端")
+    parser.add_argument("--local-embeddings", action="store_true", help="使用本地哈希 embedding（测试用）")
+    args = parser.parse_args()
 
+    # split documents into chunks
+    # 与 RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=20) 切分结果一致，速度更快
+    text_splitter = FastRecursiveSplitter(
+        chunk_size = CHUNK_SIZE,
+        chunk_overlap = CHUNK_OVERLAP,
+        **({"separators": CJK_SEPARATORS, "keep_separator": "end"} if args.cjk else {}),
+    )
 
+    # embed chunks
+    model_name = "local-hashing" if args.local_embeddings else EMBEDDING_MODEL
+    if args.local_embeddings:
+        base_embeddings = HashingEmbeddings()
+    else:
+        base_embeddings = OpenAIEmbeddings(
+            base_url="https://api.siliconflow.cn/v1",
+            model=EMBEDDING_MODEL,
+        )
+    embeddings = CachedEmbeddings(base_embeddings, EMBEDDING_CACHE, model=model_name)
 
+    # store chunks
+    store_path = STORE_PATHS[args.store]
+    if args.store in LOCAL_STORES:
+        # 增量写入：ivf 已训练时新片段直接分配到最近的簇，片段数达到 train_size 时自动训练
+        vector_store = LOCAL_STORES[args.store].load(store_path, embeddings, mmap=False)
+        sink = vector_store
+    else:
+        vector_store = Chroma(
+            embedding_function=embeddings,
+            persist_directory=store_path,
+        )
+        sink = ChromaSink(vector_store)
+    # 清单记录已入库片段的内容哈希，未变化的片段不再重复 embedding
+    manifest = Manifest(
+        f"{store_path}.manifest.json",
+        fingerprint=f"{model_name}|{CHUNK_SIZE}|{CHUNK_OVERLAP}" + ("|cjk" if args.cjk else ""),
+    )
+    stats = incremental_ingest(
+        args.paths,
+        text_splitter,
+        embeddings,
+        sink,
+        manifest,
+        batch_size=args.batch_size,
+        concurrency=args.concurrency,
+        processes=args.processes,
+    )
+    if args.store in LOCAL_STORES:
+        vector_store.save(store_path)
+    print(
+        f"successfully indexed {stats.files} files: "
+        f"{stats.reused} chunks reused, {stats.chunks} re-embedded, {stats.deleted} deleted"
+    )
+    print(f"embedding cache hit rate: {embeddings.hit_rate:.1%}")
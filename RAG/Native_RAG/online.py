@@ -1,43 +1,101 @@
+import argparse
+import asyncio
+import os
+from typing import Optional
+
 from langchain.embeddings import OpenAIEmbeddings
 from langchain.vectorstores import Chroma
 from langchain_openai import ChatOpenAI
-from langchain.prompts import PromptTemplate
-from langchain.schema import HumanMessage
 
-embeddings = OpenAIEmbeddings(
-    base_url="https://api.siliconflow.cn/v1",
-    model="Qwen/Qwen3-Embedding-0.6B",
-)
-vectorstore = Chroma(persist_directory="./vector_store", embedding_function=embeddings)
+from context_packer import ContextPacker
+from embedding_cache import CachedEmbeddings
+from hybrid import HybridRetriever
+from ivf_store import IVFVectorStore
+from numpy_store import NumpyVectorStore
+from semantic_cache import SemanticCache
+from service import RAGService, serve
 
-query = "什么是RAG？"
+EMBEDDING_MODEL = "Qwen/Qwen3-Embedding-0.6B"
+# 与 offline.py 一致
+STORE_PATHS = {"chroma": "./vector_store", "numpy": "./vector_store_np", "ivf": "./vector_store_ivf"}
 
-documents = vectorstore.similarity_search(query, k=3)
 
-context = "\n".join([doc.page_content for doc in documents])
+def manifest_version(store_path: str):
+    """以入库清单的修改时间作为向量库版本（offline.py 每次入库都会重写），重新入库后语义缓存失效"""
+    manifest = f"{store_path}.manifest.json"
+    return lambda: os.path.getmtime(manifest) if os.path.exists(manifest) else None
 
-prompt = PromptTemplate(
-    template="""
-    你是一个专业的问答助手。请根据以下参考文档回答用户的问题。
-    如果参考文档中没有相关信息，请诚实地说不知道，不要编造答案。
 
-    参考文档：{context}
+def positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"必须是正整数: {value}")
+    return number
 
-    用户问题：{query}
 
-    回答：
-    """,
-    input_variables=["context", "query"]
-)
-chain = prompt | ChatOpenAI(
-    model="THUDM/glm-4-9b-chat",
-    temperature=0,
-    max_retries=3,
-    base_url="https://api.siliconflow.cn/v1",
-    api_key=API_KEY,
-)
+def build_service(store: str = "chroma", nprobe: int = 8, hybrid: Optional[str] = None,
+                  context_tokens: int = 1500) -> RAGService:
+    """创建一次 embedding / 向量库 / LLM 客户端，之后所有问题共用"""
+    # 与 offline.py 共用 embedding 缓存，热门问题不再重复请求 embedding 接口
+    embeddings = CachedEmbeddings(
+        OpenAIEmbeddings(
+            base_url="https://api.siliconflow.cn/v1",
+            model=EMBEDDING_MODEL,
+        ),
+        "./embedding_cache.sqlite",
+        model=EMBEDDING_MODEL,
+    )
+    if store == "numpy":
+        vectorstore = NumpyVectorStore.load(STORE_PATHS[store], embeddings, mmap=True)
+    elif store == "ivf":
+        # nprobe 越大召回率越高、延迟越大
+        vectorstore = IVFVectorStore.load(STORE_PATHS[store], embeddings, mmap=True, nprobe=nprobe)
+    else:
+        vectorstore = Chroma(persist_directory=STORE_PATHS[store], embedding_function=embeddings)
+    llm = ChatOpenAI(
+        model="THUDM/glm-4-9b-chat",
+        temperature=0,
+        max_retries=3,
+        base_url="https://api.siliconflow.cn/v1",
+        api_key=os.getenv("API_KEY"),
+    )
+    index_version = manifest_version(STORE_PATHS[store])
+    return RAGService(
+        embeddings,
+        vectorstore,
+        llm,
+        # 启用 packer 时多取一些候选，由 token 预算决定最终放入多少；context_tokens=0 时沿用 k=3 直接拼接
+        k=8 if context_tokens else 3,
+        cache=SemanticCache(threshold=0.95, max_entries=10_000, ttl=3600),
+        index_version=index_version,
+        # 关键词 + 向量混合检索，型号、编号类问题不再只依赖向量召回；重新入库后关键词索引随之重建
+        retriever=(
+            HybridRetriever.from_vectorstore(vectorstore, method=hybrid, index_version=index_version)
+            if hybrid else None
+        ),
+        packer=ContextPacker(max_tokens=context_tokens) if context_tokens else None,
+    )
 
-result = chain.invoke({"context": context, "query": query})
-print(result.content)
 
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="RAG 问答：单次提问或常驻服务")
+    parser.add_argument("query", nargs="?", default="什么是RAG？")
+    parser.add_argument("--serve", action="store_true", help="以 HTTP 服务方式常驻运行")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--store", choices=STORE_PATHS, default="chroma", help="向量库后端")
+    parser.add_argument("--nprobe", type=positive_int, default=8, help="ivf 每次查询搜索的簇数（>= 1）")
+    parser.add_argument("--hybrid", choices=["rrf", "weighted"], help="启用混合检索及其融合方式")
+    parser.add_argument("--context-tokens", type=int, default=1500, help="上下文 token 预算，0 表示不限制")
+    args = parser.parse_args()
 
+    service = build_service(args.store, args.nprobe, args.hybrid, args.context_tokens)
+    if args.serve:
+        asyncio.run(serve(service, args.host, args.port))
+    else:
+        result = asyncio.run(service.answer(args.query))
+        print(result["answer"])
+        print(f"latency (ms): {result['timings_ms']}")
+        if not result["cached"] and result["context_tokens"] is not None:
+            print(f"context tokens: {result['context_tokens']} / {args.context_tokens}")
+        print(f"embedding cache hit rate: {service.embeddings.hit_rate:.1%}")
@@ -0,0 +1,149 @@
+"""
+语义答案缓存
+对问题向量做余弦相似度查找，命中（相似度 >= threshold）时直接返回之前的回答和检索来源，
+跳过检索和 LLM 调用；条目按数量（LRU）和存活时间淘汰，向量库重建索引后整体失效
+未命中但与正在生成回答的问题相似时，调用方可以等待那次生成（pending / begin / end），
+相同问题同时到达时只生成一次
+"""
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+@dataclass
+class CacheEntry:
+    query: str
+    answer: str
+    sources: List[Dict]
+    latency: float  # 生成该回答的检索 + LLM 耗时（秒，不含排队），命中时计入节省的时间
+    created_at: float
+    last_used: float
+
+
+class SemanticCache:
+    """向量存放在一个连续的 float32 矩阵中，查找为一次矩阵-向量乘法"""
+
+    def __init__(
+        self,
+        threshold: float = 0.95,
+        max_entries: int = 10_000,
+        ttl: Optional[float] = 3600,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl  # 秒，None 表示不过期
+        self._clock = clock
+        self._vectors: Optional[np.ndarray] = None  # (容量, dim)，前 len(entries) 行有效，按需倍增
+        self._entries: List[CacheEntry] = []
+        self._pending: List[Tuple[np.ndarray, Any]] = []  # 正在生成回答的问题：(向量, 等待对象)
+        self._version: Any = None
+        self.hits = 0
+        self.misses = 0  # 实际生成回答的次数
+        self.coalesced = 0  # 等待相似问题的生成、没有重复生成的次数
+        self.evictions = 0
+        self.invalidations = 0
+        self.latency_saved = 0.0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _check_version(self, version: Any):
+        """向量库版本变化（重新入库）后，旧回答依据的文档可能已经改变"""
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+                self._entries.clear()
+            self._pending.clear()  # 旧版本上正在生成的回答不再共享
+            self._version = version
+
+    def _remove(self, i: int):
+        """删除第 i 个条目：用最后一个条目填补空位，保持矩阵连续"""
+        last = len(self._entries) - 1
+        if i != last:
+            self._vectors[i] = self._vectors[last]
+            self._entries[i] = self._entries[last]
+        self._entries.pop()
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        v = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(v)
+        return v / norm if norm else v
+
+    def lookup(self, vector, version: Any = None) -> Optional[CacheEntry]:
+        """返回相似度最高且超过阈值的条目，未命中返回 None（未命中在 begin 时计数）"""
+        self._check_version(version)
+        now = self._clock()
+        while self._entries:
+            scores = self._vectors[: len(self._entries)] @ self._normalize(vector)
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                break
+            entry = self._entries[best]
+            if self.ttl is not None and now - entry.created_at > self.ttl:
+                self._remove(best)  # 过期条目删除后继续找次优
+                self.evictions += 1
+                continue
+            entry.last_used = now
+            self.hits += 1
+            self.latency_saved += entry.latency
+            return entry
+        return None
+
+    def pending(self, vector) -> Optional[Any]:
+        """与正在生成回答的问题相似度超过阈值时返回其等待对象，调用方等待它而不是再生成一次"""
+        v = self._normalize(vector)
+        for pending_vector, waiter in self._pending:
+            if float(pending_vector @ v) >= self.threshold:
+                self.coalesced += 1
+                return waiter
+        return None
+
+    def begin(self, vector, waiter: Any):
+        """登记一次回答生成，waiter 由调用方在生成结束后完成"""
+        self.misses += 1
+        self._pending.append((self._normalize(vector), waiter))
+
+    def end(self, waiter: Any):
+        self._pending = [p for p in self._pending if p[1] is not waiter]
+
+    def _grow(self, dim: int):
+        """矩阵已满时容量翻倍（不超过 max_entries），避免启动时按 max_entries 预分配"""
+        size = len(self._entries)
+        if self._vectors is not None and size < self._vectors.shape[0]:
+            return
+        vectors = np.empty((min(self.max_entries, max(64, 2 * size)), dim), dtype=np.float32)
+        if self._vectors is not None:
+            vectors[:size] = self._vectors[:size]
+        self._vectors = vectors
+
+    def add(self, vector, query: str, answer: str, sources: List[Dict], latency: float,
+            version: Any = None) -> CacheEntry:
+        self._check_version(version)
+        v = self._normalize(vector)
+        if len(self._entries) >= self.max_entries:
+            oldest = min(range(len(self._entries)), key=lambda i: self._entries[i].last_used)
+            self._remove(oldest)
+            self.evictions += 1
+        self._grow(v.shape[0])
+        now = self._clock()
+        entry = CacheEntry(query, answer, sources, latency, now, now)
+        self._vectors[len(self._entries)] = v
+        self._entries.append(entry)
+        return entry
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "latency_saved_ms": round(self.latency_saved * 1000, 2),
+        }
@@ -0,0 +1,241 @@
+"""
+常驻 RAG 问答服务
+向量库、embedding 客户端和 LLM 客户端只在启动时创建一次，之后所有请求共用
+（包括它们内部的 HTTP 连接池）；请求通过 asyncio 并发处理，
+并分阶段（embed / retrieve / generate）统计延迟。
+
+HTTP 接口（JSON）：
+    POST /query   {"query": "什么是RAG？"}
+    GET  /stats   各阶段延迟统计（启用语义缓存时包含命中率和节省的时间）
+"""
+import asyncio
+import json
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from langchain_core.prompts import PromptTemplate
+
+from context_packer import ContextPacker
+from semantic_cache import SemanticCache
+
+RAG_PROMPT = PromptTemplate(
+    template="""
+    你是一个专业的问答助手。请根据以下参考文档回答用户的问题。
+    如果参考文档中没有相关信息，请诚实地说不知道，不要编造答案。
+
+    参考文档：{context}
+
+    用户问题：{query}
+
+    回答：
+    """,
+    input_variables=["context", "query"]
+)
+
+STAGES = ("embed", "cache", "retrieve", "generate", "total")
+
+
+class LatencyStats:
+    """保留每个阶段最近 window 次的耗时，输出均值和分位数（毫秒）"""
+
+    def __init__(self, window: int = 10_000):
+        self._samples: Dict[str, Deque[float]] = {s: deque(maxlen=window) for s in STAGES}
+        self.requests = 0
+
+    def record(self, timings: Dict[str, float]):
+        self.requests += 1
+        for stage, seconds in timings.items():
+            self._samples[stage].append(seconds)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        result = {}
+        for stage, samples in self._samples.items():
+            if not samples:
+                continue
+            ordered = sorted(samples)
+            pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+            result[stage] = {
+                "count": len(ordered),
+                "mean_ms": sum(ordered) / len(ordered) * 1000,
+                "p50_ms": pick(0.5),
+                "p95_ms": pick(0.95),
+                "p99_ms": pick(0.99),
+            }
+        return result
+
+
+class RAGService:
+    """
+    检索增强问答，embeddings / vectorstore / llm 由调用方注入，可替换为本地替身
+    传入 cache 时启用语义答案缓存；index_version 返回向量库当前版本，变化时缓存失效；
+    传入 retriever（如 hybrid.HybridRetriever）时用它代替单纯的向量检索；
+    传入 packer 时按 token 预算挑选、去重、合并检索到的片段，否则直接拼接全部 k 个片段
+    """
+
+    def __init__(self, embeddings, vectorstore, llm, prompt=RAG_PROMPT, k: int = 3,
+                 max_concurrency: int = 64, cache: Optional[SemanticCache] = None,
+                 index_version: Callable[[], Any] = lambda: None, retriever=None,
+                 packer: Optional[ContextPacker] = None):
+        self.embeddings = embeddings
+        self.vectorstore = vectorstore
+        self.chain = prompt | llm
+        self.k = k
+        self.cache = cache
+        self.index_version = index_version
+        self.retriever = retriever
+        self.packer = packer
+        self.stats = LatencyStats()
+        self._semaphore = asyncio.Semaphore(max_concurrency)  # 限制同时访问上游接口的请求数
+
+    async def answer(self, query: str) -> Dict:
+        waiter = None
+        async with self._semaphore:
+            timings = {}
+            start = time.perf_counter()
+            vector = await self.embeddings.aembed_query(query)
+            timings["embed"] = time.perf_counter() - start
+
+            if self.cache is None:
+                return await self._generate(query, vector, timings, start)
+            mark = time.perf_counter()
+            version = self.index_version()
+            entry = self.cache.lookup(vector, version)
+            if entry is None:
+                waiter = self.cache.pending(vector)
+            timings["cache"] = time.perf_counter() - mark
+            if entry is None and waiter is None:
+                return await self._generate_once(query, vector, version, timings, start)
+
+        if waiter is not None:
+            # 相似问题正在生成回答：在并发名额之外等待它，不重复检索和调用 LLM
+            entry = await asyncio.shield(waiter)
+        timings["total"] = time.perf_counter() - start
+        self.stats.record(timings)
+        return {
+            "answer": entry.answer,
+            "sources": entry.sources,
+            "cached": True,
+            "timings_ms": {stage: round(t * 1000, 2) for stage, t in timings.items()},
+        }
+
+    async def _generate_once(self, query: str, vector, version: Any, timings: Dict[str, float],
+                             start: float) -> Dict:
+        """生成回答并写入缓存；生成期间到达的相似问题等待 waiter 得到同一个缓存条目"""
+        waiter = asyncio.get_running_loop().create_future()
+        self.cache.begin(vector, waiter)
+        try:
+            response = await self._generate(query, vector, timings, start)
+            entry = self.cache.add(
+                vector, query, response["answer"], response["sources"],
+                timings["retrieve"] + timings["generate"], version,
+            )
+            waiter.set_result(entry)
+            return response
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                waiter.cancel()
+            else:
+                waiter.set_exception(e)
+                waiter.exception()  # 没有等待者时不报 "exception was never retrieved"
+            raise
+        finally:
+            self.cache.end(waiter)
+
+    async def _generate(self, query: str, vector, timings: Dict[str, float], start: float) -> Dict:
+        mark = time.perf_counter()
+        if self.retriever is not None:
+            documents = await self.retriever.asearch(query, vector, self.k)
+        else:
+            documents = await self.vectorstore.asimilarity_search_by_vector(vector, k=self.k)
+        timings["retrieve"] = time.perf_counter() - mark
+
+        mark = time.perf_counter()
+        if self.packer is not None:
+            packed = self.packer.pack(documents)
+            context, documents, context_tokens = packed.text, packed.documents, packed.tokens
+        else:
+            context = "\n".join([doc.page_content for doc in documents])
+            context_tokens = None
+        result = await self.chain.ainvoke({"context": context, "query": query})
+        timings["generate"] = time.perf_counter() - mark
+        timings["total"] = time.perf_counter() - start
+
+        self.stats.record(timings)
+        return {
+            "answer": result.content,
+            "sources": [doc.metadata for doc in documents],
+            "cached": False,
+            "context_tokens": context_tokens,  # 未启用 packer 时为 None
+            "timings_ms": {stage: round(t * 1000, 2) for stage, t in timings.items()},
+        }
+
+    async def answer_many(self, queries: List[str]) -> List[Dict]:
+        return await asyncio.gather(*(self.answer(q) for q in queries))
+
+
+async def _read_request(reader: asyncio.StreamReader, request_line: bytes):
+    """解析请求行、请求头和请求体；格式错误时抛出 ValueError"""
+    method, path, _ = request_line.decode("latin-1").split(" ", 2)
+    headers = {}
+    while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get("content-length", 0))
+    if length < 0:
+        raise ValueError(f"Content-Length 不能为负数: {length}")
+    return method, path, headers, await reader.readexactly(length)
+
+
+async def _handle_connection(service: RAGService, reader: asyncio.StreamReader,
+                             writer: asyncio.StreamWriter):
+    """
+    极简 HTTP/1.1 处理：支持 keep-alive，一个连接上依次处理多个请求
+    请求行或 Content-Length 无法解析时返回 400 并关闭连接（无法确定下一个请求从哪里开始）
+    """
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            status, payload = 200, None
+            headers = None  # 请求本身解析失败时保持 None，回复 400 后关闭连接
+            try:
+                method, path, headers, body = await _read_request(reader, request_line)
+                if method == "POST" and path == "/query":
+                    payload = await service.answer(json.loads(body)["query"])
+                elif method == "GET" and path == "/stats":
+                    payload = {"requests": service.stats.requests, "stages": service.stats.summary()}
+                    if service.cache is not None:
+                        payload["semantic_cache"] = service.cache.stats()
+                else:
+                    status, payload = 404, {"error": f"未知接口: {method} {path}"}
+            except asyncio.IncompleteReadError:
+                raise  # 请求体未读完对端就断开了
+            except (KeyError, ValueError) as e:
+                status, payload = 400, {"error": f"请求格式错误: {e}"}
+            except Exception as e:  # 上游接口异常不应中断服务
+                status, payload = 500, {"error": str(e)}
+
+            data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            writer.write(
+                f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                f"Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(data)}\r\n\r\n".encode("latin-1") + data
+            )
+            await writer.drain()
+            if headers is None or headers.get("connection", "").lower() == "close":
+                break
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(service: RAGService, host: str = "127.0.0.1", port: int = 8000):
+    server = await asyncio.start_server(
+        lambda r, w: _handle_connection(service, r, w), host, port
+    )
+    print(f"RAG service listening on http://{host}:{port}")
+    async with server:
+        await server.serve_forever()
@@ -0,0 +1,5 @@
+"""
+各项目共用的模块（RAG/Agentic_RAG、RAG/Native_RAG、Agent/mcp）
+各项目的脚本在自己的目录下运行，导入前先把仓库根目录加入 sys.path：
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+"""
@@ -0,0 +1,167 @@
+"""
+关键词检索与排名融合，Agentic_RAG（query_knowledge_base）与 Native_RAG（online 混合检索）共用
+- tokenize: 英文按词、中文按字符二元组分词
+- InvertedIndex + BM25Scorer: 可增删片段的倒排索引与 BM25 打分（kb_file.MmapIndex 实现同样的只读接口）
+- reciprocal_rank_fusion / weighted_fusion: 多路检索结果的融合
+"""
+import heapq
+import math
+import re
+from collections import Counter
+from typing import Callable, Dict, Hashable, Iterator, List, Optional, Sequence, Tuple
+
+Ranking = List[Tuple[float, Hashable]]  # 按分数降序的 (score, key)，与 BM25Scorer.top_k 一致
+
+# 英文/数字按词切分，中文连续片段单独切出
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+|[\u4e00-\u9fff]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """分词 - 英文按词，中文按字符二元组 (bigram)"""
+    tokens = []
+    for run in _TOKEN_PATTERN.findall(text.lower()):
+        if run.isascii() or len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i : i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+class InvertedIndex:
+    """倒排索引 - 词项 -> {片段: 词频}，同时维护文档长度"""
+
+    def __init__(self, tokenizer: Callable[[str], List[str]] = tokenize):
+        self.tokenizer = tokenizer  # 可替换为 jieba 等分词器
+        self.postings: Dict[str, Dict[Hashable, int]] = {}
+        self.doc_lengths: Dict[Hashable, int] = {}
+        self.total_length = 0
+        self.version = 0  # 每次增删片段递增，用于失效派生数据（如 IDF）
+
+    def add(self, key: Hashable, content: str):
+        """索引一个片段"""
+        tokens = self.tokenizer(content)
+        for term, freq in Counter(tokens).items():
+            self.postings.setdefault(term, {})[key] = freq
+        self.doc_lengths[key] = len(tokens)
+        self.total_length += len(tokens)
+        self.version += 1
+
+    def remove(self, key: Hashable, content: str):
+        """从索引中移除一个片段（content 须为当初索引时的内容）"""
+        for term in set(self.tokenizer(content)):
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            posting.pop(key, None)
+            if not posting:
+                del self.postings[term]
+        self.total_length -= self.doc_lengths.pop(key, 0)
+        self.version += 1
+
+    # 以下为打分器使用的只读接口，kb_file.MmapIndex 实现同样的接口
+
+    @property
+    def doc_count(self) -> int:
+        return len(self.doc_lengths)
+
+    def df(self, term: str) -> int:
+        """包含该词项的片段数"""
+        return len(self.postings.get(term, ()))
+
+    def scan(self, term: str) -> Iterator[Tuple[Hashable, int, int]]:
+        """遍历词项的倒排表，产出 (片段, 词频, 片段长度)"""
+        doc_lengths = self.doc_lengths
+        for key, tf in self.postings.get(term, {}).items():
+            yield key, tf, doc_lengths[key]
+
+
+class BM25Scorer:
+    """BM25 打分 - IDF 按索引版本缓存，top-k 用有界堆选取"""
+
+    def __init__(self, index, k1: float = 1.5, b: float = 0.75):
+        self.index = index
+        self.k1 = k1
+        self.b = b
+        self._idf: Dict[str, float] = {}
+        self._idf_version = -1
+
+    def idf(self, term: str) -> float:
+        """词项 IDF，缓存到索引下一次变化为止"""
+        if self._idf_version != self.index.version:
+            self._idf.clear()
+            self._idf_version = self.index.version
+        idf = self._idf.get(term)
+        if idf is None:
+            n = self.index.doc_count
+            df = self.index.df(term)
+            idf = self._idf[term] = math.log(1 + (n - df + 0.5) / (df + 0.5))
+        return idf
+
+    def score(self, query: str) -> Dict[Hashable, float]:
+        """只遍历查询词项的倒排表，累加每个片段的 BM25 分数"""
+        return self.score_many([query])[0]
+
+    def score_many(self, queries: List[str]) -> List[Dict[Hashable, float]]:
+        """批量打分 - 多个查询共享的词项只遍历一次倒排表"""
+        index = self.index
+        scores: List[Dict[Hashable, float]] = [{} for _ in queries]
+        if not index.doc_count:
+            return scores
+        # 词项 -> 包含该词项的查询下标
+        term_queries: Dict[str, List[int]] = {}
+        for i, query in enumerate(queries):
+            for term in set(index.tokenizer(query)):
+                term_queries.setdefault(term, []).append(i)
+
+        avgdl = index.total_length / index.doc_count or 1.0
+        k1, b = self.k1, self.b
+        for term, query_ids in term_queries.items():
+            if not index.df(term):
+                continue
+            idf = self.idf(term)
+            targets = [scores[i] for i in query_ids]
+            for key, tf, doc_length in index.scan(term):
+                norm = k1 * (1 - b + b * doc_length / avgdl)
+                weight = idf * tf * (k1 + 1) / (tf + norm)
+                for target in targets:
+                    target[key] = target.get(key, 0.0) + weight
+        return scores
+
+    def top_k(self, query: str, k: int) -> List[Tuple[float, Hashable]]:
+        """返回分数最高的 k 个片段，O(n log k)"""
+        return self.top_k_many([query], k)[0]
+
+    def top_k_many(
+        self, queries: List[str], k: int
+    ) -> List[List[Tuple[float, Hashable]]]:
+        """批量版 top_k，按查询顺序返回"""
+        return [
+            heapq.nlargest(k, ((s, key) for key, s in scores.items()))
+            for scores in self.score_many(queries)
+        ]
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Ranking], weights: Optional[Sequence[float]] = None, rrf_k: int = 60
+) -> Ranking:
+    fused: Dict[Hashable, float] = {}
+    for ranking, weight in zip(rankings, weights or [1.0] * len(rankings)):
+        for rank, (_, key) in enumerate(ranking, 1):
+            fused[key] = fused.get(key, 0.0) + weight / (rrf_k + rank)
+    return sorted(((score, key) for key, score in fused.items()), key=lambda item: -item[0])
+
+
+def weighted_fusion(rankings: Sequence[Ranking], weights: Optional[Sequence[float]] = None) -> Ranking:
+    fused: Dict[Hashable, float] = {}
+    for ranking, weight in zip(rankings, weights or [1.0] * len(rankings)):
+        if not ranking:
+            continue
+        high, low = ranking[0][0], ranking[-1][0]
+        span = high - low
+        for score, key in ranking:
+            normalized = (score - low) / span if span else 1.0
+            fused[key] = fused.get(key, 0.0) + weight * normalized
+    return sorted(((score, key) for key, score in fused.items()), key=lambda item: -item[0])
+
+
+FUSIONS = {"rrf": reciprocal_rank_fusion, "weighted": weighted_fusion}
@@ -0,0 +1,104 @@
+"""
+工具结果序列化，Agentic_RAG 的 LangChain 工具与 Agent/mcp 的 MCP 工具共用
+默认输出紧凑 JSON（无缩进、无多余空格），安装了 orjson 时用它编码，否则回退到标准库；
+可按工具配置最大字节数，超出时截断，避免把过大的结果塞进 LLM 的上下文；
+各工具的上限由各项目自己维护，调用 dump_tool_result 时传入
+"""
+import json
+from typing import Any, Mapping, Optional
+
+try:
+    import orjson
+except ImportError:  # 可选依赖
+    orjson = None
+
+_TRUNCATION_MARK = "…"
+
+
+def encode(obj: Any, compact: bool = True) -> bytes:
+    """编码为 UTF-8 JSON 字节"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=0 if compact else orjson.OPT_INDENT_2)
+        except TypeError:
+            pass  # orjson 不支持的类型交给标准库处理
+    if compact:
+        text = json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+    else:
+        text = json.dumps(obj, ensure_ascii=False, indent=2)
+    return text.encode("utf-8")
+
+
+def decode(data: bytes) -> Any:
+    """解析 UTF-8 JSON 字节"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _shorten_strings(obj: Any, max_chars: int) -> Any:
+    """递归截断超过 max_chars 的字符串"""
+    if isinstance(obj, str):
+        return obj if len(obj) <= max_chars else obj[:max_chars] + _TRUNCATION_MARK
+    if isinstance(obj, list):
+        return [_shorten_strings(v, max_chars) for v in obj]
+    if isinstance(obj, dict):
+        return {k: _shorten_strings(v, max_chars) for k, v in obj.items()}
+    return obj
+
+
+def _truncate(obj: Any, max_bytes: int, compact: bool) -> bytes:
+    """
+    截断到 max_bytes 以内，结果仍是合法 JSON：
+    列表保留能放下的前若干项并追加 {"truncated": true, "omitted": n}，
+    估算能放下多少项时预先扣除这个标记的长度；
+    第一项本身就放不下时，保留缩短了长字符串的第一项；
+    仍放不下时再逐步缩短其中的长字符串
+    """
+    if isinstance(obj, list):
+        # omitted 不会超过 len(obj)，按它估算标记长度；+1 为标记前的逗号
+        budget = max_bytes - len(encode({"truncated": True, "omitted": len(obj)}, compact)) - 1
+        kept, size = [], 2
+        for item in obj:
+            size += len(encode(item, compact)) + 1
+            if size > budget:
+                break
+            kept.append(item)
+        if not kept and obj:
+            rest = [{"truncated": True, "omitted": len(obj) - 1}] if len(obj) > 1 else []
+            max_chars = max_bytes
+            while max_chars > 1:
+                data = encode([_shorten_strings(obj[0], max_chars)] + rest, compact)
+                if len(data) <= max_bytes:
+                    return data
+                max_chars //= 2
+        if len(kept) < len(obj):
+            obj = kept + [{"truncated": True, "omitted": len(obj) - len(kept)}]
+        data = encode(obj, compact)
+        if len(data) <= max_bytes:
+            return data
+
+    max_chars = max_bytes
+    while max_chars > 1:
+        data = encode(_shorten_strings(obj, max_chars), compact)
+        if len(data) <= max_bytes:
+            return data
+        max_chars //= 2
+    return encode({"truncated": True}, compact)
+
+
+def dumps(
+    obj: Any, compact: bool = True, max_bytes: Optional[int] = None
+) -> str:
+    """序列化为 JSON 字符串，max_bytes 为 None 时不截断"""
+    data = encode(obj, compact)
+    if max_bytes is not None and len(data) > max_bytes:
+        data = _truncate(obj, max_bytes, compact)
+    return data.decode("utf-8")
+
+
+def dump_tool_result(
+    tool_name: str, obj: Any, limits: Mapping[str, int], compact: bool = True
+) -> str:
+    """按 limits 中该工具的大小上限序列化工具结果，未配置的工具不限制"""
+    return dumps(obj, compact, limits.get(tool_name))